@@ -10,7 +10,30 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # requirements.txt にあるがアプリでは使わないパッケージ (streamlit とその依存) を除く
+    excludes=[
+        'streamlit',
+        'altair',
+        'pyarrow',
+        'pydeck',
+        'narwhals',
+        'jsonschema',
+        'jsonschema_specifications',
+        'git',
+        'gitdb',
+        'smmap',
+        'tornado',
+        'blinker',
+        'cachetools',
+        'tenacity',
+        'toml',
+        'rich',
+        'pygments',
+        'markdown_it',
+        'IPython',
+        'matplotlib',
+        'tkinter',
+    ],
     noarchive=False,
     optimize=0,
 )
@@ -0,0 +1,247 @@
+# 解がない日の原因 (満たせない制約と関係する従業員) を調べます。
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List
+
+import numpy as np
+import pulp
+from pulp import LpMinimize, LpProblem, LpStatusInfeasible, LpStatusUnbounded
+
+from MILP.solver_backend import create_backend
+
+if TYPE_CHECKING:
+    from MILP.milp_maker import MILPMaker
+
+logger = logging.getLogger("shift_scheduler")
+
+# 既約な矛盾する制約の集合 (IIS) を求めるのにかける時間の上限 (秒)
+IIS_TIME_LIMIT = 30.0
+# メディカルが1日に担当できる役職の数
+MEDICAL_CAPACITY = 4
+# フルタイムの従業員が必要な役職と, その制約の名前
+FULLTIME_ROLES = {
+    "受付": "FulltimeRoleAssignment_Reception",
+    "胃カメラ": "FulltimeRoleAssignment_Gastroscopy",
+}
+
+
+def _holds_at_zero(constraint: pulp.LpConstraint) -> bool:
+    # 全ての変数が 0 のときに制約を満たすか
+    if constraint.sense == pulp.LpConstraintEQ:
+        return constraint.constant == 0
+    if constraint.sense == pulp.LpConstraintLE:
+        return constraint.constant <= 0
+    return constraint.constant >= 0
+
+
+@dataclass
+class Conflict:
+    """満たせない制約 (制約の名前, 説明, 関係する従業員)"""
+
+    constraint: str
+    message: str
+    staff: List[str] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        staff = ", ".join(self.staff) if self.staff else "なし"
+        return f"{self.constraint}: {self.message} (対象: {staff})"
+
+
+class InfeasibilityDiagnoser:
+    """
+    MILPMaker のモデルで解がない日の原因を調べる。
+    precheck はモデルを解く前に, 役職ごとの割り当て可能な人数と必要人数,
+    フルタイムの従業員の出勤を配列から数えて確かめる。
+    find_iis は precheck で原因がわからない場合に, 制約を1つずつ外して解き直し,
+    外すと解が存在するようになる制約だけを残す (出勤可能性と役職適性による
+    変数の上限は固定として扱う)。
+    """
+
+    def __init__(self, maker: "MILPMaker"):
+        self.maker = maker
+
+    def _eligible(self, day: str) -> np.ndarray:
+        # その日に出勤でき, 役職に割り当て可能な (従業員, 役職) の行列
+        m = self.maker
+        return m.compatible & m.available[:, m.day_ids[day]][:, None]
+
+    def _names(self, mask: np.ndarray) -> List[str]:
+        return [self.maker.employees[i] for i in np.flatnonzero(mask)]
+
+    def precheck(self, day: str) -> List[Conflict]:
+        """解く前にわかる, 満たせない制約を返す (見つからない場合は空のリスト)"""
+        m = self.maker
+        required = m.required[m.days_of_week(day)]
+        eligible = self._eligible(day)
+        real = ~m.is_pseudo
+        medical = np.array([e == "メディカル" for e in m.employees])
+        conflicts = []
+
+        # 役職ごとに, 割り当て可能な人数が必要人数に足りるか
+        short_roles = []
+        for j, r in enumerate(m.roles):
+            if eligible[:, j][m.is_shortage].any():
+                # 不足は何人分でも割り当てられる
+                continue
+            capacity = np.count_nonzero(eligible[:, j] & real)
+            capacity += MEDICAL_CAPACITY * np.count_nonzero(eligible[:, j] & medical)
+            if capacity < required[j]:
+                conflicts.append(
+                    Conflict(
+                        f"RoleAssignment_{r}",
+                        f"{r} の必要人数 {required[j]} 人に対し, "
+                        f"割り当て可能な人は {capacity} 人です",
+                        self._names(eligible[:, j] & real),
+                    )
+                )
+            short_roles.append(j)
+
+        # 不足で埋められない役職をまとめて, 1人1役職で足りるか
+        if not conflicts and short_roles:
+            pool = eligible[:, short_roles].any(axis=1)
+            capacity = np.count_nonzero(pool & real)
+            capacity += MEDICAL_CAPACITY * np.count_nonzero(pool & medical)
+            demand = int(required[short_roles].sum())
+            if capacity < demand:
+                names = [m.roles[j] for j in short_roles]
+                conflicts.append(
+                    Conflict(
+                        "RoleAssignment (合計)",
+                        f"{', '.join(names)} の必要人数の合計 {demand} 人に対し, "
+                        f"1人1役職で割り当て可能な人は {capacity} 人です",
+                        self._names(pool & real),
+                    )
+                )
+
+        # フルタイムの従業員が必要な役職に, 出勤できるフルタイムの従業員がいるか
+        fulltime_pool = np.zeros(len(m.employees), dtype=bool)
+        for role, name in FULLTIME_ROLES.items():
+            j = m.role_ids.get(role)
+            if j is None:
+                conflicts.append(Conflict(name, f"役職 {role} がありません"))
+                continue
+            candidates = eligible[:, j] & m.is_fulltime & real
+            fulltime_pool |= candidates
+            if required[j] == 0:
+                conflicts.append(
+                    Conflict(
+                        name,
+                        f"{role} の必要人数が 0 人ですが, フルタイムの従業員が"
+                        "1人以上必要です",
+                    )
+                )
+            elif not candidates.any():
+                conflicts.append(
+                    Conflict(
+                        name,
+                        f"{role} に割り当て可能なフルタイムの従業員が出勤できません",
+                        self._names(
+                            m.is_fulltime & real & m.available[:, m.day_ids[day]]
+                        ),
+                    )
+                )
+        if not conflicts and np.count_nonzero(fulltime_pool) < len(FULLTIME_ROLES):
+            conflicts.append(
+                Conflict(
+                    ", ".join(FULLTIME_ROLES.values()),
+                    f"{', '.join(FULLTIME_ROLES)} にそれぞれ別のフルタイムの従業員が"
+                    "必要ですが, 割り当て可能な人が足りません",
+                    self._names(fulltime_pool),
+                )
+            )
+        return conflicts
+
+    def find_iis(self, day: str) -> List[Conflict]:
+        """
+        その日のモデル (_apply_day を適用済み) の制約から, 既約な矛盾する制約の集合を求める。
+        IIS_TIME_LIMIT を超えた場合は, それまでに絞り込んだ (既約とは限らない) 集合を返す。
+        """
+        m = self.maker
+        start = time.perf_counter()
+        backend = create_backend(m.solver.name)
+        # presolve で固定した上下限は制約から導いたものなので, 出勤可能性だけに戻す
+        m._set_availability_bounds(day)
+        problem = LpProblem(f"Diagnosis_Day_{day}", LpMinimize)
+
+        # 変数が全て上限 0 の行 (出勤できない従業員の1人1役職など) は常に満たせるため除く
+        fixed = {v for v in m.variables if v.upBound == 0}
+        for name, constraint in m.problem.constraints.items():
+            if all(v in fixed for v in constraint.keys()) and _holds_at_zero(
+                constraint
+            ):
+                continue
+            problem.addConstraint(constraint.copy(), name)
+        # 目的関数に全ての変数を入れておく (制約を外したときに, どの行にも現れない
+        # 変数が残ると CBC に渡す MPS ファイルが壊れるため)
+        problem += pulp.lpSum(problem.variables())
+
+        def infeasible() -> bool:
+            if not problem.constraints:
+                return False
+            try:
+                result = backend.solve(problem)
+            except pulp.PulpSolverError as e:
+                # 判定できない場合は, 制約を残す側に倒す
+                logger.debug(f"Day {day}: IIS の計算中にソルバーが失敗しました: {e}")
+                return False
+            return result in (LpStatusInfeasible, LpStatusUnbounded)
+
+        if not infeasible():
+            # 制約を全て含めても解がある場合 (時間切れなど) は原因を特定できない
+            return []
+
+        # 1人1役職の制約はまとめて外せるか先に試す
+        single = [n for n in problem.constraints if n.startswith("SingleRole")]
+        removed = {n: problem.constraints.pop(n) for n in single}
+        if not infeasible():
+            for name, constraint in removed.items():
+                problem.addConstraint(constraint, name)
+
+        # 外しても解がない制約は IIS に含まれない
+        complete = True
+        for name in list(problem.constraints):
+            if time.perf_counter() - start > IIS_TIME_LIMIT:
+                complete = False
+                break
+            constraint = problem.constraints.pop(name)
+            if not infeasible():
+                problem.addConstraint(constraint, name)
+        if not complete:
+            logger.warning(
+                f"Day {day}: IIS の計算を {IIS_TIME_LIMIT:.0f} 秒で打ち切りました。"
+            )
+        logger.debug(
+            f"Day {day}: IIS {len(problem.constraints)} rows "
+            f"({time.perf_counter() - start:.2f}s)"
+        )
+        return [self._describe(day, name) for name in problem.constraints]
+
+    def _describe(self, day: str, name: str) -> Conflict:
+        # IIS の制約の名前を, 説明と関係する従業員に変換する
+        m = self.maker
+        eligible = self._eligible(day)
+        required = m.required[m.days_of_week(day)]
+        real = ~m.is_pseudo
+        for role, fulltime_name in FULLTIME_ROLES.items():
+            if name == fulltime_name and role in m.role_ids:
+                j = m.role_ids[role]
+                return Conflict(
+                    name,
+                    f"{role} にフルタイムの従業員が1人以上必要です",
+                    self._names(eligible[:, j] & m.is_fulltime & real),
+                )
+        if name.startswith("RoleAssignment_"):
+            role = name.removeprefix("RoleAssignment_")
+            j = m.role_ids[role]
+            return Conflict(
+                name,
+                f"{role} に {required[j]} 人が必要です",
+                self._names(eligible[:, j] & real),
+            )
+        if name.startswith("SingleRoleAssignment_"):
+            employee = name.removeprefix("SingleRoleAssignment_")
+            return Conflict(
+                name, f"{employee} は1日に1つの役職のみ担当します", [employee]
+            )
+        return Conflict(name, "矛盾する制約です")
@@ -1,195 +1,721 @@
 import logging
 import random
+import time
 from collections import defaultdict
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import pulp
-from pulp import PULP_CBC_CMD, LpMaximize, LpProblem, LpVariable, lpSum
+from pulp import (
+    LpMaximize,
+    LpProblem,
+    LpStatusInfeasible,
+    LpStatusNotSolved,
+    LpStatusUnbounded,
+    LpVariable,
+    lpSum,
+)
+
+from MILP.infeasibility import Conflict, InfeasibilityDiagnoser
+from MILP.presolve import Reduction, presolve
+from MILP.solver_backend import create_backend
+from utils.profiler import SolveProfiler
+from utils.progress import SolveProgress
 
 logger = logging.getLogger("shift_scheduler")
 
+# 予算を使い切った後でも, その日の最初の試行に与える時間 (秒)
+MIN_TRIAL_SECONDS = 1.0
+
+
+class Schedule(dict):
+    """
+    1日分のスケジュール {役職: [従業員, ...]}。
+    anytime が True の場合, 制限時間または目標ギャップで打ち切った暫定の結果で,
+    最適性は証明されていない。
+    diagnosis は解がない日 (全て "未割当") の, 満たせない制約のリスト。
+    """
+
+    def __init__(
+        self,
+        *args,
+        anytime: bool = False,
+        diagnosis: Optional[List[Conflict]] = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.anytime = anytime
+        self.diagnosis = diagnosis
+
+    @property
+    def unassigned(self) -> bool:
+        """解がなく, 全ての役職が "未割当" かどうか"""
+        return all(workers == ["未割当"] for workers in self.values())
+
 
 class MILPMaker:
     def __init__(
-        self, availability, role_compatibility, fulltime, weights, num_required
+        self,
+        availability,
+        role_compatibility,
+        fulltime,
+        weights,
+        num_required,
+        sparse: bool = True,
+        trial_mode: str = "enumerate",
+        optimal_only: bool = True,
+        solver: str = "auto",
+        profile: bool = False,
+        time_limit: Optional[float] = None,
+        gap: Optional[float] = None,
+        warm_start: bool = False,
+        diagnose: bool = True,
+        presolve: bool = True,
     ):
-        # 従業員と役職の初期化
+        # 従業員・役職・日に整数の ID (リストの添字) を割り当て,
+        # 入力の辞書を ID で引く NumPy の配列に変換する
         self.employees = list(availability.keys())
         self.roles = list(role_compatibility[self.employees[0]].keys())
-        self.availability = availability
-        self.role_compatibility = role_compatibility
-        self.fulltime = fulltime
-        self.weights = weights
-        self.num_required = num_required
+        self.days = list(availability[self.employees[0]].keys())
+        self.employee_ids = {e: i for i, e in enumerate(self.employees)}
+        self.role_ids = {r: j for j, r in enumerate(self.roles)}
+        self.day_ids = {d: k for k, d in enumerate(self.days)}
+        # (従業員, 日) の出勤可能性
+        self.available = np.array(
+            [[bool(availability[e][d]) for d in self.days] for e in self.employees],
+            dtype=bool,
+        ).reshape(len(self.employees), len(self.days))
+        # (従業員, 役職) の役職適性
+        self.compatible = np.array(
+            [
+                [bool(role_compatibility[e][r]) for r in self.roles]
+                for e in self.employees
+            ],
+            dtype=bool,
+        ).reshape(len(self.employees), len(self.roles))
+        self.is_fulltime = np.array([bool(fulltime[e]) for e in self.employees])
+        self.weights = np.array([weights[e] for e in self.employees], dtype=float)
+        # 曜日ごとの各役職の必要人数
+        self.required = {
+            weekday: np.array([counts[r] for r in self.roles], dtype=int)
+            for weekday, counts in num_required.items()
+        }
+        # 疑似従業員 (不足・メディカル) と, そのうち "不足" のもの
+        self.is_pseudo = np.array([self.is_pseudo_employee(e) for e in self.employees])
+        self.is_shortage = np.array(["不足" in e for e in self.employees])
+        # sparse=True のときは割り当て不可能な (従業員, 役職) の変数を作らない
+        self.sparse = sparse
+        # 試行の方法
+        #   "enumerate": 前の試行の解を除外する制約を追加し, 異なる解を列挙する
+        #   "seed": 同じモデルを randomSeed だけ変えて解き直す
+        if trial_mode not in ("enumerate", "seed"):
+            raise ValueError(f"Invalid trial mode: {trial_mode}")
+        self.trial_mode = trial_mode
+        # enumerate のとき, 最適値と同じ目的関数値の解だけを列挙する
+        self.optimal_only = optimal_only
+        # ソルバーのバックエンド (HiGHS / CBC)
+        self.solver = create_backend(solver)
+        logger.debug(f"Solver backend: {self.solver.name}")
+        # profile=True のとき, 日・試行ごとの時間とソルバーの統計を記録する
+        self.profiler = SolveProfiler() if profile else None
+        # 1日あたりの制限時間 (秒, 全試行の合計) と目標の相対ギャップ
+        # 制限に達した場合は暫定解を返す (Schedule.anytime が True になる)
+        self.time_limit = time_limit
+        self.gap = gap
+        # warm_start=True のとき, 各日の最初の試行に初期解 (MIP start) を渡す
+        # 前回の実行のその日の解, なければ解いた日のうち最も似た日の解を使う
+        self.warm_start = warm_start
+        # 解いた日の最初の試行の解 {日: 変数ごとの人数}
+        self._solved_values: Dict[str, np.ndarray] = {}
+        # diagnose=True のとき, 解く前に必要人数などを確かめ, 解がない日は原因を調べる
+        self.diagnoser = InfeasibilityDiagnoser(self) if diagnose else None
+        # presolve=True のとき, 解く前に配列の計算だけで決まる変数を固定し, 上限を絞る
+        self.presolve = presolve
+        # 最後に _apply_day を適用した日の presolve の結果
+        self.reduction: Optional[Reduction] = None
 
         logger.debug(f"Initialized MILPMaker with employees: {self.employees}")
         logger.debug(f"Roles: {self.roles}")
-        logger.debug(f"Availability: {self.availability}")
-        logger.debug(f"Role compatibility: {self.role_compatibility}")
-        logger.debug(f"Fulltime employees: {self.fulltime}")
+        logger.debug(f"Availability: {self.available.astype(int)}")
+        logger.debug(f"Role compatibility: {self.compatible.astype(int)}")
+        logger.debug(f"Fulltime employees: {self.is_fulltime.astype(int)}")
         logger.debug(f"Weights: {self.weights}")
-        logger.debug(f"Number of required employees: {self.num_required}")
+        logger.debug(f"Number of required employees: {self.required}")
+
+        # 日によらない部分のモデルを一度だけ作成し, 各日・各試行で使い回す
+        self.problem = self._create_base_problem()
+        self._log_model_stats()
 
     def solve_for_day(
-        self, day: str, num_trials: int = 1
-    ) -> List[Dict[str, List[str]]]:
+        self,
+        day: str,
+        num_trials: int = 1,
+        seed: Optional[int] = None,
+        progress: Optional[SolveProgress] = None,
+        deadline: Optional[float] = None,
+        previous: Optional[Dict[str, List[str]]] = None,
+    ) -> List[Schedule]:
+        """
+        その日のスケジュールを num_trials 回まで解く。
+        deadline (time.time() の値) を指定した場合, 実行全体の予算としてその時刻までに
+        打ち切る。予算を使い切っていても最初の試行には MIN_TRIAL_SECONDS を与える。
+        previous には前回の実行のその日のスケジュールを渡す (warm_start=True のとき,
+        初期解として使う)。
+        """
 
-        # 問題を作成
-        problem = self._create_base_problem(day)
+        # 明らかに解がない日はモデルを解かずに, 原因を返す
+        if self.diagnoser is not None:
+            conflicts = self.diagnoser.precheck(day)
+            if conflicts:
+                self._log_conflicts(day, "pre-solve check", conflicts)
+                return [self._unassigned(diagnosis=conflicts)]
+
+        # その日の条件をテンプレートに反映
+        start = time.perf_counter()
+        problem = self._apply_day(day)
+        build_time = time.perf_counter() - start
+        day_deadline = time.time() + self.time_limit if self.time_limit else None
 
         # LP の出力
         # logger.debug(problem)
 
         schedules = []
+        # seed を指定すると各試行の randomSeed が再現可能になる
+        rng = random.Random(seed)
+        # この日のために追加した制約 (解の除外・目的関数の下限) の名前
+        cut_names = []
+        # 最初の試行に渡す初期解
+        warm_start, warm_source = None, None
+        if self.warm_start:
+            warm_start, warm_source = self._find_warm_start(day, previous)
+
+        try:
+            for i in range(num_trials):
+                if progress is not None:
+                    if i > 0 and progress.cancelled:
+                        # 中止された場合, それまでの試行の解を返す
+                        break
+                    progress.trial_started(day, i)
+
+                time_limit = self._trial_time_limit(day_deadline, deadline, i == 0)
+                if time_limit is not None and time_limit <= 0:
+                    logger.warning(
+                        f"Day {day}: time budget exhausted after {i} trial(s)."
+                    )
+                    break
+
+                logger.info(f"Solving Day {day}[{i}] ...")
+                seed = rng.randint(0, 100000)
+                logger.debug(f"Seed: {seed}")
+                start = time.perf_counter()
+                result = self.solver.solve(
+                    problem,
+                    seed=seed,
+                    time_limit=time_limit,
+                    gap=self.gap,
+                    warm_start=warm_start if i == 0 else None,
+                )
+                solve_time = time.perf_counter() - start
+                # 時間切れで解がない場合も暫定の結果として扱う
+                anytime = result == LpStatusNotSolved or (
+                    result == 1 and not self.solver.is_proven_optimal(problem, self.gap)
+                )
 
-        for i in range(num_trials):
-
-            logger.info(f"Solving Day {day}[{i}] ...")
-            seed = random.randint(0, 100000)
-            logger.debug(f"Seed: {seed}")
-            result = problem.solve(
-                PULP_CBC_CMD(msg=False, options=[f"randomSeed={seed}"])
-            )
-
-            if result == 1:
-                # 解を抽出
-                schedule = self._extract_solution(problem, day)
-            else:
-                logger.error(f"Day {day} {i}: No solution found.")
-                schedule = {role: ["未割当"] for role in self.roles}
+                start = time.perf_counter()
+                schedule = None
+                if result == 1:
+                    # 解を抽出
+                    schedule = Schedule(
+                        self._extract_solution(problem, day), anytime=anytime
+                    )
+                    if anytime:
+                        logger.warning(
+                            f"Day {day} {i}: stopped at the time/gap limit "
+                            f"(gap {self.solver.last_stats['gap']}). "
+                            "Returning the best solution found."
+                        )
+                elif i == 0 or (
+                    self.trial_mode != "enumerate" and result != LpStatusNotSolved
+                ):
+                    logger.error(f"Day {day} {i}: No solution found.")
+                    schedule = self._unassigned(anytime=anytime)
+                extract_time = time.perf_counter() - start
+
+                if (
+                    i == 0
+                    and self.diagnoser is not None
+                    and result in (LpStatusInfeasible, LpStatusUnbounded)
+                ):
+                    # 解く前の確認で原因がわからなかった場合, 矛盾する制約を求める
+                    schedule.diagnosis = self.diagnoser.find_iis(day)
+                    self._log_conflicts(day, "IIS", schedule.diagnosis)
+
+                if self.profiler is not None:
+                    # モデルの作成時間は最初の試行に計上する
+                    self._record_trial(
+                        day,
+                        i,
+                        build_time if i == 0 else 0.0,
+                        solve_time,
+                        extract_time,
+                        result,
+                        anytime,
+                        warm_source if i == 0 else None,
+                        warm_start is not None if i == 0 else None,
+                    )
 
-            schedules.append(schedule)
+                if schedule is None:
+                    if result == LpStatusNotSolved:
+                        logger.warning(
+                            f"Day {day}: time limit reached after {i} trial(s)."
+                        )
+                    else:
+                        # 除外制約により実行可能な解を列挙し尽くした
+                        logger.info(f"Day {day}: found all {i} distinct solution(s).")
+                    break
+
+                schedules.append(schedule)
+                if result in (LpStatusInfeasible, LpStatusUnbounded):
+                    # 解がない日は何度解いても解がないため, 残りの試行は行わない
+                    break
+                if i == 0 and result == 1:
+                    self._solved_values[day] = self._values()
+
+                if result == 1 and self.trial_mode == "enumerate":
+                    if i == 0 and self.optimal_only:
+                        cut_names.append(self._add_objective_floor(problem, day))
+                    cut_names.append(self._add_no_good_cut(problem, day, i))
+        finally:
+            # テンプレートを次の日に使い回すため, 追加した制約を取り除く
+            for name in cut_names:
+                problem.constraints.pop(name)
 
         return schedules
 
-    def _is_binary(self, var: LpVariable) -> bool:
-        # 下限と上限が 0 と 1 である場合は、Binary となると判定する
-        return var.lowBound == 0 and var.upBound == 1
+    def _unassigned(self, **kwargs) -> Schedule:
+        return Schedule({role: ["未割当"] for role in self.roles}, **kwargs)
+
+    def _log_conflicts(self, day: str, method: str, conflicts: List[Conflict]):
+        if not conflicts:
+            logger.error(f"Day {day}: 解がない原因を特定できませんでした ({method})。")
+            return
+        logger.error(f"Day {day}: 解がありません。満たせない制約 ({method}):")
+        for conflict in conflicts:
+            logger.error(f"  {conflict}")
+
+    def _record_trial(
+        self,
+        day: str,
+        trial: int,
+        build_time: float,
+        solve_time: float,
+        extract_time: float,
+        result: int,
+        anytime: bool,
+        warm_source: Optional[str],
+        warm_accepted: Optional[bool],
+    ):
+        self.profiler.record(
+            day=day,
+            trial=trial,
+            build_s=build_time,
+            solve_s=solve_time,
+            extract_s=extract_time,
+            variables=len(self.variables),
+            rows=len(self.problem.constraints),
+            free_variables=(
+                self.reduction.num_free if self.reduction is not None else None
+            ),
+            solver=self.solver.name,
+            status=pulp.LpStatus[result],
+            anytime=anytime,
+            warm_start=warm_source,
+            warm_start_accepted=warm_accepted,
+            objective=pulp.value(self.problem.objective) if result == 1 else None,
+            **self.solver.last_stats,
+        )
 
-    def _create_base_problem(self, day: int) -> LpProblem:
+    def _find_warm_start(
+        self, day: str, previous: Optional[Dict[str, List[str]]]
+    ) -> Tuple[Optional[Dict[LpVariable, float]], Optional[str]]:
+        """
+        その日の初期解と, その出どころ ("previous_run" または "similar_day:<日>") を返す。
+        候補の解をその日の出勤可能性と必要人数に合わせて修正し,
+        全ての制約を満たす場合だけ採用する (満たさない場合は初期解は None)。
+        """
+        if previous is not None:
+            values = self._schedule_to_values(previous)
+            source = "previous_run"
+        else:
+            similar = self._most_similar_day(day)
+            if similar is None:
+                return None, None
+            values = self._solved_values[similar].copy()
+            source = f"similar_day:{similar}"
+
+        start = self._repair_start(day, values)
+        accepted = start is not None and self._is_feasible_start(start)
+        logger.info(
+            f"Day {day}: warm start from {source} "
+            f"{'accepted' if accepted else 'rejected (infeasible)'}."
+        )
+        return (start if accepted else None), source
+
+    def _schedule_to_values(self, schedule: Dict[str, List[str]]) -> np.ndarray:
+        # スケジュール {役職: [従業員, ...]} を変数ごとの人数に変換する
+        # (モデルにない従業員・役職の組は無視する)
+        values = np.zeros(len(self.variables), dtype=int)
+        for r, employees in schedule.items():
+            j = self.role_ids.get(r)
+            if j is None:
+                continue
+            for e in employees:
+                i = self.employee_ids.get(e)
+                if i is not None and self.var_index[i, j] >= 0:
+                    values[self.var_index[i, j]] += 1
+        return values
 
+    def _most_similar_day(self, day: str) -> Optional[str]:
+        """
+        解いた日のうち, 曜日 (必要人数) が同じで, 出勤可能な従業員が最も重なる日を返す。
+        """
+        if not self._solved_values:
+            return None
+        weekday = self.days_of_week(day)
+        available = self.available[:, self.day_ids[day]]
+
+        def similarity(other: str):
+            other_available = self.available[:, self.day_ids[other]]
+            union = np.count_nonzero(available | other_available)
+            overlap = np.count_nonzero(available & other_available)
+            jaccard = overlap / union if union else 1.0
+            return (self.days_of_week(other) == weekday, jaccard)
+
+        return max(self._solved_values, key=similarity)
+
+    def _repair_start(
+        self, day: str, values: np.ndarray
+    ) -> Optional[Dict[LpVariable, float]]:
+        """
+        候補の解から, 出勤できない従業員と割り当て不可能な組を除き,
+        各役職の人数を必要人数に合わせる (多い場合は重みの小さい人から外し,
+        足りない場合は空いている重みの大きい人, いなければ "不足" の疑似従業員で埋める)。
+        """
+        required = self.required[self.days_of_week(day)]
+        # 出勤可能性 (presolve を使う場合は固定した変数も) を変数の上下限から引く
+        lower, upper = self._bound_arrays()
+        available = upper > 0
+        values = np.clip(values, lower, upper).astype(int)
+        weights = self.weights[self.var_employee]
+        real = ~self.is_pseudo[self.var_employee]
+        for j in range(len(self.roles)):
+            in_role = np.flatnonzero((self.var_role == j) & (values > 0))
+            surplus = values[in_role].sum() - required[j]
+            for k in in_role[np.argsort(weights[in_role], kind="stable")]:
+                if surplus <= 0:
+                    break
+                removed = min(values[k], surplus)
+                values[k] -= removed
+                surplus -= removed
+            if surplus >= 0:
+                continue
+            busy = np.zeros(len(self.employees), dtype=bool)
+            busy[self.var_employee[values > 0]] = True
+            candidates = np.flatnonzero(
+                (self.var_role == j) & available & real & ~busy[self.var_employee]
+            )
+            candidates = candidates[np.argsort(-weights[candidates], kind="stable")]
+            for k in candidates[:-surplus]:
+                values[k] += 1
+                surplus += 1
+            if surplus < 0:
+                shortage = np.flatnonzero(
+                    (self.var_role == j)
+                    & available
+                    & self.is_shortage[self.var_employee]
+                )
+                if len(shortage) == 0:
+                    return None
+                values[shortage[0]] += -surplus
+        return {self.variables[k]: int(values[k]) for k in np.flatnonzero(values)}
+
+    def _is_feasible_start(self, start: Dict[LpVariable, float]) -> bool:
+        # 変数の上下限 (出勤不可の日は上限が 0) と全ての制約を満たすか確認する
+        for var, value in start.items():
+            if var.upBound is not None and value > var.upBound:
+                return False
+        for var in self.variables:
+            if var.lowBound and start.get(var, 0) < var.lowBound:
+                return False
+        for constraint in self.problem.constraints.values():
+            lhs = constraint.constant + sum(
+                coef * start.get(var, 0) for var, coef in constraint.items()
+            )
+            if constraint.sense == pulp.LpConstraintEQ and abs(lhs) > 1e-9:
+                return False
+            if constraint.sense == pulp.LpConstraintLE and lhs > 1e-9:
+                return False
+            if constraint.sense == pulp.LpConstraintGE and lhs < -1e-9:
+                return False
+        return True
+
+    def _trial_time_limit(
+        self,
+        day_deadline: Optional[float],
+        deadline: Optional[float],
+        first_trial: bool,
+    ) -> Optional[float]:
+        """その試行に与える時間 (秒) を返す (制限がない場合は None)"""
+        now = time.time()
+        limits = []
+        if day_deadline is not None:
+            limits.append(day_deadline - now)
+        if deadline is not None:
+            remaining = deadline - now
+            if first_trial:
+                # 実行全体の予算を使い切っていても, 最初の試行は必ず解く
+                remaining = max(remaining, MIN_TRIAL_SECONDS)
+            limits.append(remaining)
+        return min(limits) if limits else None
+
+    def _add_no_good_cut(self, problem: LpProblem, day: str, trial: int) -> str:
+        """
+        現在の解を再び得られないようにする制約を追加し, その名前を返す。
+        簡単のため,binaryのものだけを考慮する
+        """
+        # その日に 0 か 1 を取る変数 (出勤可能な実在の従業員の変数) だけを考慮する
+        binary = self._binary_mask(day)
+        assigned = self._values() == 1
+        ones = [self.variables[k] for k in np.flatnonzero(binary & assigned)]
+        zeros = [self.variables[k] for k in np.flatnonzero(binary & ~assigned)]
+
+        # 少なくとも1つの binary 変数の値が変わることを要求する
+        name = f"NoGoodCut_Day_{day}_{trial}"
+        problem += (lpSum(ones) - lpSum(zeros) <= len(ones) - 1, name)
+        return name
+
+    def _add_objective_floor(self, problem: LpProblem, day: str) -> str:
+        # 最適値を下回る解は列挙しない
+        best = pulp.value(problem.objective)
+        name = f"ObjectiveFloor_Day_{day}"
+        problem += (problem.objective >= best - 1e-6 * max(1.0, abs(best)), name)
+        return name
+
+    def _binary_mask(self, day: str) -> np.ndarray:
+        # 実在の従業員の変数は binary で, 出勤不可の日は上限が 0 になる
+        employee = self.var_employee
+        return ~self.is_pseudo[employee] & self.available[employee, self.day_ids[day]]
+
+    def _values(self) -> np.ndarray:
+        # 現在の解の変数ごとの値 (整数に丸める)
+        return np.rint(
+            np.fromiter((v.varValue or 0 for v in self.variables), dtype=float)
+        ).astype(int)
+
+    def _create_base_problem(self) -> LpProblem:
+        """
+        日によらないモデル (変数, 役職適性, 1人1役職, フルタイム, 目的関数) を作成する。
+        出勤可能性と必要人数は _apply_day で日ごとに書き換える。
+        変数は (従業員 ID, 役職 ID) の順に並べ, var_employee / var_role で ID を引く。
+        """
         # 線形計画問題を作成
         # 最大化問題
-        problem = LpProblem(f"ShiftAssignment_Day_{day}", LpMaximize)
+        problem = LpProblem("ShiftAssignment", LpMaximize)
         logger.debug(f"Creating problem: {problem.name}")
 
-        # 変数を定義
-        x = {}
-        for e in self.employees:
-            for r in self.roles:
-                if (e == "メディカル") or ("不足" in e):
-                    # integer
-                    x[(e, r)] = LpVariable(f"{e}_{r}", lowBound=0, cat=pulp.LpInteger)
-                else:
-                    # binary
-                    x[(e, r)] = LpVariable(f"{e}_{r}", cat=pulp.LpBinary)
+        # 変数を定義 (sparse=True のときは割り当て可能な組だけ)
+        if self.sparse:
+            pairs = np.argwhere(self.compatible)
+        else:
+            pairs = np.argwhere(np.ones_like(self.compatible))
+        self.var_employee = pairs[:, 0]
+        self.var_role = pairs[:, 1]
+        # (従業員 ID, 役職 ID) -> 変数の添字 (変数がない組は -1)
+        self.var_index = np.full(self.compatible.shape, -1, dtype=np.int64)
+        self.var_index[self.var_employee, self.var_role] = np.arange(len(pairs))
+        # 不足・メディカルは integer, それ以外は binary
+        # 変数名は ID から作る (従業員名と役職名をつなぐと, "p_x" と "x_y" の
+        # ように別の組が同じ名前になりうる)
+        self.variables = [
+            (
+                LpVariable(f"x_{i}_{j}", lowBound=0, cat=pulp.LpInteger)
+                if self.is_pseudo[i]
+                else LpVariable(f"x_{i}_{j}", cat=pulp.LpBinary)
+            )
+            for i, j in pairs.tolist()
+        ]
+        # 出勤不可の日に 0 に固定した上限を元に戻すため, 元の上限を保持する
+        self._default_upper_bounds = [v.upBound for v in self.variables]
 
         # 各種制約と目的関数を追加
-        self._add_role_constraints(problem, x, day)
-        self._add_availability_constraints(problem, x, day)
-        self._add_role_compatibility_constraints(problem, x)
-        self._add_single_role_constraints(problem, x)
-        self._add_fulltime_constraints(problem, x)
-        self._add_objective_function(problem, x)
+        self._add_role_constraints(problem)
+        if not self.sparse:
+            self._add_role_compatibility_constraints(problem)
+        self._add_single_role_constraints(problem)
+        self._add_fulltime_constraints(problem)
+        self._add_objective_function(problem)
 
         return problem
 
-    def _to_half_width_parentheses(self, day: str) -> str:
+    def _apply_day(self, day: str) -> LpProblem:
+        # テンプレートの右辺と変数の上限だけをその日の値に書き換える
+        self.problem.name = f"ShiftAssignment_Day_{day}"
+        self._set_role_requirements(day)
+        if self.presolve:
+            self.reduction = presolve(self, day)
+            self._set_bounds(self.reduction.lower, self.reduction.upper)
+            logger.debug(f"Day {day}: presolve: {self.reduction.summary()}")
+            logger.debug(f"Day {day}: fixed roles: {self.reduction.fixed}")
+        else:
+            self.reduction = None
+            self._set_availability_bounds(day)
+        logger.debug(
+            f"Day {day}: {self._count_unavailable(day) * len(self.roles)} "
+            "availability rows folded into variable bounds"
+        )
+        return self.problem
+
+    def _count_unavailable(self, day: str) -> int:
+        return int(np.count_nonzero(~self.available[:, self.day_ids[day]]))
+
+    def _log_model_stats(self):
+        # 割り当て不可能な組を全て "x == 0" の行で表す場合との規模を比較して出力
+        num_pairs = self.compatible.size
+        num_incompatible = int(np.count_nonzero(~self.compatible))
+        max_unavailable = int(np.max(np.count_nonzero(~self.available, axis=0)))
+        num_rows = len(self.problem.constraints)
+        legacy_rows = num_rows + (num_incompatible if self.sparse else 0)
+        logger.info(
+            "Model stats: "
+            f"variables {num_pairs} -> {len(self.variables)}, "
+            f"rows {legacy_rows} (+ up to {max_unavailable * len(self.roles)}"
+            f" availability rows/day) -> {num_rows} (sparse={self.sparse})"
+        )
+
+    @staticmethod
+    def is_pseudo_employee(employee: str) -> bool:
+        # 不足・メディカルは実在の従業員ではなく, 何人分でも割り当てられる
+        return (employee == "メディカル") or ("不足" in employee)
+
+    @staticmethod
+    def _to_half_width_parentheses(day: str) -> str:
         # 全角() を半角() に変換
         day = day.replace("（", "(").replace("）", ")")
         return day
 
-    def assert_days_of_week(self, days_of_week: str):
+    @staticmethod
+    def assert_days_of_week(days_of_week: str):
         # 曜日が正しいかどうかを確認
         days_of_week_list = ["月", "火", "水", "木", "金", "土", "日"]
         if days_of_week not in days_of_week_list:
             logger.error(f"Invalid day of the week: {days_of_week}")
             raise ValueError("Invalid day of the week.")
 
-    def _add_role_constraints(self, problem: LpProblem, x: Dict, day: int):
+    @staticmethod
+    def days_of_week(day: str) -> str:
         # 曜日を取得 12(火) -> 火曜
         # 全角（数字）を半角（数字）に変換
-        day = self._to_half_width_parentheses(day)
+        day = MILPMaker._to_half_width_parentheses(day)
         days_of_week = day.split("(")[1].split(")")[0]
 
-        self.assert_days_of_week(days_of_week)
+        MILPMaker.assert_days_of_week(days_of_week)
+        return days_of_week
 
-        # 各役職の必要人数の制約を追加
-        required_count = self.num_required[days_of_week]
-        for r in self.roles:
+    def _variables_where(self, mask: np.ndarray) -> List[LpVariable]:
+        return [self.variables[k] for k in np.flatnonzero(mask)]
+
+    def _add_role_constraints(self, problem: LpProblem):
+        # 各役職の必要人数の制約を追加 (右辺は _set_role_requirements で設定)
+        for j, r in enumerate(self.roles):
             problem += (
-                lpSum(x[(e, r)] for e in self.employees) == required_count[r],
-                f"RoleAssignment_Day_{day}_{r}",
+                lpSum(self._variables_where(self.var_role == j)) == 0,
+                f"RoleAssignment_{r}",
             )
 
-    def _add_availability_constraints(self, problem: LpProblem, x: Dict, day: int):
-        # 従業員の出勤可能性に基づく制約を追加
-        for e in self.employees:
-            for r in self.roles:
-                if not self.availability[e][day]:
-                    problem += (
-                        x[(e, r)] == 0,
-                        f"Availability_Day_{day}_{e}_{r}",
-                    )
+    def _set_role_requirements(self, day: str):
+        # 曜日ごとの必要人数を右辺に設定
+        required_count = self.required[self.days_of_week(day)]
+        for j, r in enumerate(self.roles):
+            self.problem.constraints[f"RoleAssignment_{r}"].changeRHS(
+                int(required_count[j])
+            )
 
-    def _add_role_compatibility_constraints(self, problem: LpProblem, x: Dict):
+    def _set_availability_bounds(self, day: str):
+        # 従業員の出勤可能性に基づき, 出勤できない日は変数の上限を 0 にする
+        available = self.available[self.var_employee, self.day_ids[day]]
+        for var, upper, ok in zip(
+            self.variables, self._default_upper_bounds, available.tolist()
+        ):
+            var.lowBound = 0
+            var.upBound = upper if ok else 0
+
+    def _set_bounds(self, lower: np.ndarray, upper: np.ndarray):
+        # presolve で求めた上下限を変数に設定する
+        for var, low, up in zip(self.variables, lower.tolist(), upper.tolist()):
+            var.lowBound = int(low)
+            var.upBound = int(up)
+
+    def _bound_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        # 現在の変数の上下限 (上限がない場合は np.inf)
+        lower = np.fromiter((v.lowBound or 0 for v in self.variables), dtype=float)
+        upper = np.fromiter(
+            (np.inf if v.upBound is None else v.upBound for v in self.variables),
+            dtype=float,
+        )
+        return lower, upper
+
+    def _add_role_compatibility_constraints(self, problem: LpProblem):
         # 各従業員の役職適性に基づく制約を追加
-        for e in self.employees:
-            for r in self.roles:
-                if not self.role_compatibility[e][r]:
-                    problem += (
-                        x[(e, r)] == 0,
-                        f"RoleCompatibility_{e}_{r}",
-                    )
+        for k in np.flatnonzero(~self.compatible[self.var_employee, self.var_role]):
+            e = self.employees[self.var_employee[k]]
+            r = self.roles[self.var_role[k]]
+            problem += (self.variables[k] == 0, f"RoleCompatibility_{e}_{r}")
 
-    def _add_single_role_constraints(self, problem: LpProblem, x: Dict):
+    def _add_single_role_constraints(self, problem: LpProblem):
         # 各従業員が1日に1つの役職のみ担当する制約を追加
-        for e in self.employees:
-            if "不足" in e:
+        # 変数は従業員 ID の順に並んでいるため, 各従業員の変数は連続した範囲になる
+        bounds = np.searchsorted(self.var_employee, np.arange(len(self.employees) + 1))
+        for i, e in enumerate(self.employees):
+            if self.is_shortage[i]:
                 continue
-            elif e == "メディカル":
-                # メディカルは4つまで担当可能
-                problem += (
-                    lpSum(x[(e, r)] for r in self.roles) <= 4,
-                    f"SingleRoleAssignment_{e}",
-                )
-            else:
-                problem += (
-                    lpSum(x[(e, r)] for r in self.roles) <= 1,
-                    f"SingleRoleAssignment_{e}",
-                )
+            first, last = bounds[i], bounds[i + 1]
+            variables = self.variables[first:last]
+            # メディカルは4つまで担当可能
+            limit = 4 if e == "メディカル" else 1
+            problem += (lpSum(variables) <= limit, f"SingleRoleAssignment_{e}")
 
-    def _add_fulltime_constraints(self, problem: LpProblem, x: Dict):
+    def _add_fulltime_constraints(self, problem: LpProblem):
         # フルタイム従業員が特定の役職を担当する制約を追加
-        problem += (
-            lpSum(x[(e, "受付")] for e in self.employees if self.fulltime[e]) >= 1,
-            "FulltimeRoleAssignment_Reception",
-        )
-        problem += (
-            lpSum(x[(e, "胃カメラ")] for e in self.employees if self.fulltime[e]) >= 1,
-            "FulltimeRoleAssignment_Gastroscopy",
-        )
-
-    def _add_objective_function(self, problem: LpProblem, x: Dict):
+        for role, name in (
+            ("受付", "FulltimeRoleAssignment_Reception"),
+            ("胃カメラ", "FulltimeRoleAssignment_Gastroscopy"),
+        ):
+            in_role = self.var_role == self.role_ids.get(role, -1)
+            fulltime = self.is_fulltime[self.var_employee]
+            problem += (lpSum(self._variables_where(in_role & fulltime)) >= 1, name)
+
+    def _add_objective_function(self, problem: LpProblem):
         # weights に基づいて, 目的関数を設定
         problem += (
-            lpSum(
-                self.weights[e] * x[(e, r)] for e in self.employees for r in self.roles
+            pulp.LpAffineExpression(
+                zip(self.variables, self.weights[self.var_employee].tolist())
             ),
             "Objective",
         )
 
-    def _extract_solution(self, problem: LpProblem, day: int) -> Dict[str, List[str]]:
+    def _extract_solution(self, problem: LpProblem, day: str) -> Dict[str, List[str]]:
         """
-        現在の解を抽出し、再び同じ解が得られないようにする制約を追加。
-        簡単のため,binaryのものだけを考慮する
+        現在の解を抽出する。
+        変数の添字から従業員 ID・役職 ID を引き, 名前に戻す。
+        同じ解を除外する制約は _add_no_good_cut で追加する。
         """
         # 解を抽出し、スケジュールとして返す
         schedule = defaultdict(list)
 
-        for var in problem.variables():
-            employee, role = var.name.split("_")
-            for i in range(int(var.varValue)):
-                schedule[role].append(employee)
+        values = self._values()
+        for k in np.flatnonzero(values > 0):
+            employee = self.employees[self.var_employee[k]]
+            role = self.roles[self.var_role[k]]
+            schedule[role].extend([employee] * int(values[k]))
 
         return schedule
@@ -0,0 +1,420 @@
+import logging
+import math
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence
+
+import pulp
+from pulp import LpMaximize, LpProblem, LpVariable, lpSum
+
+from MILP.infeasibility import Conflict
+from MILP.milp_maker import MIN_TRIAL_SECONDS, MILPMaker, Schedule
+from MILP.solver_backend import create_backend
+from utils.profiler import SolveProfiler
+
+logger = logging.getLogger("shift_scheduler")
+
+HORIZONS = ("full", "weekly")
+
+
+class MonthlyMILPMaker:
+    """
+    複数日をまとめて1つの MILP として解くクラス。
+
+    日ごとの制約 (必要人数, 1人1役職, フルタイム) は MILPMaker と同じで,
+    加えて日をまたぐ制約を扱える。
+      - max_shifts: 1人あたりの出勤日数の上限 (不足・メディカルは除く)
+      - fairness_weight: fairness_roles の担当回数の最大と最小の差に掛ける罰金
+    horizon="weekly" の場合は月曜ごとに区切った週を順に解き (ローリングホライズン),
+    それまでの週の出勤日数と担当回数を引き継ぐ。出勤日数の上限は残りの週に割り振り,
+    解がない週は前の週と合わせて解き直す。
+    diagnose=True の場合, 1日だけでも解がない日はモデルから除いて "未割当" にし,
+    その原因を Schedule.diagnosis に記録する。
+    """
+
+    def __init__(
+        self,
+        availability,
+        role_compatibility,
+        fulltime,
+        weights,
+        num_required,
+        max_shifts: Optional[int] = None,
+        fairness_weight: float = 0.0,
+        fairness_roles: Sequence[str] = ("胃カメラ",),
+        horizon: str = "full",
+        solver: str = "auto",
+        profile: bool = False,
+        gap: Optional[float] = None,
+        diagnose: bool = True,
+    ):
+        self.employees = list(availability.keys())
+        self.roles = list(role_compatibility[self.employees[0]].keys())
+        self.availability = availability
+        self.role_compatibility = role_compatibility
+        self.fulltime = fulltime
+        self.weights = weights
+        self.num_required = num_required
+
+        self.max_shifts = max_shifts
+        self.fairness_weight = fairness_weight
+        self.fairness_roles = [r for r in fairness_roles if r in self.roles]
+        if horizon not in HORIZONS:
+            raise ValueError(f"Invalid horizon: {horizon}")
+        self.horizon = horizon
+        self.solver = create_backend(solver)
+        # profile=True のとき, 期間ごとの時間とソルバーの統計を記録する
+        self.profiler = SolveProfiler() if profile else None
+        # 目標の相対ギャップ (制限時間は solve の deadline で指定する)
+        self.gap = gap
+        # diagnose=True のとき, 解く前に日ごとに必要人数などを確かめ,
+        # 解がない日はその日だけを "未割当" にして原因を記録する
+        self.diagnose = diagnose
+        self._day_maker = None
+
+        # 公平性の対象: その役職を担当できる実在の従業員
+        self.fairness_members = {
+            r: [
+                e
+                for e in self.employees
+                if not MILPMaker.is_pseudo_employee(e) and self.role_compatibility[e][r]
+            ]
+            for r in self.fairness_roles
+        }
+
+    def solve(
+        self, days: List[str], deadline: Optional[float] = None
+    ) -> Dict[str, Schedule]:
+        """
+        days のスケジュールをまとめて解き, {日: スケジュール} を返す。
+        deadline (time.time() の値) を指定した場合, その時刻までに打ち切った暫定解を返す。
+        """
+        # これまでに解いた期間の出勤日数と担当回数
+        used_shifts = defaultdict(int)
+        duty_counts = {r: defaultdict(int) for r in self.fairness_roles}
+        # 期間ごとの, 解き始める前の出勤日数と担当回数 (解き直すときに戻す)
+        states = []
+
+        schedules = {}
+        if self.diagnose:
+            days = self._exclude_infeasible_days(days, schedules)
+        blocks = [block for block in self._split_days(days) if block]
+        # 1日ずつ解いて, 単独で解があることを確かめた日
+        checked = set()
+        b = 0
+        while b < len(blocks):
+            block = blocks[b]
+            if len(states) == b:
+                states.append(self._copy_counts(used_shifts, duty_counts))
+            logger.info(f"Solving {block[0]} - {block[-1]} ({len(block)} days) ...")
+            start = time.perf_counter()
+            # この期間と, それ以降に解く期間の日
+            remaining = [day for later in blocks[b:] for day in later]
+            problem, x = self._create_problem(
+                block, used_shifts, duty_counts, remaining
+            )
+            built = time.perf_counter()
+            time_limit = None
+            if deadline is not None:
+                time_limit = max(deadline - time.time(), MIN_TRIAL_SECONDS)
+            result = self.solver.solve(problem, time_limit=time_limit, gap=self.gap)
+            solved = time.perf_counter()
+            anytime = result == pulp.LpStatusNotSolved or (
+                result == 1 and not self.solver.is_proven_optimal(problem, self.gap)
+            )
+
+            if result == pulp.LpStatusInfeasible and self.diagnose:
+                # 1日だけでも解がない日があれば, その日を除いて解き直す
+                infeasible = self._find_infeasible_days(
+                    [day for day in block if day not in checked], deadline
+                )
+                checked.update(block)
+                if infeasible:
+                    self._record_block(
+                        block, problem, anytime, built - start, solved - built, 0.0
+                    )
+                    schedules.update(infeasible)
+                    blocks[b] = [day for day in block if day not in infeasible]
+                    if not blocks[b]:
+                        blocks.pop(b)
+                        states.pop()
+                    continue
+
+            if result == pulp.LpStatusInfeasible and b > 0:
+                # 前の期間で出勤日数の上限を使いすぎた可能性があるため,
+                # 前の期間と合わせて解き直す
+                logger.warning(
+                    f"{block[0]} - {block[-1]}: No solution found. "
+                    f"Re-solving from {blocks[b - 1][0]}."
+                )
+                self._record_block(
+                    block, problem, anytime, built - start, solved - built, 0.0
+                )
+                blocks[b - 1].extend(blocks.pop(b))
+                states.pop()
+                b -= 1
+                used_shifts, duty_counts = self._copy_counts(*states[b])
+                continue
+
+            if result != 1:
+                logger.error(f"{block[0]} - {block[-1]}: No solution found.")
+                diagnosis = None
+                if result == pulp.LpStatusInfeasible and self.diagnose:
+                    # 各日は単独で解があるため, 日をまたぐ制約が原因
+                    diagnosis = self._diagnose_block(block)
+                for day in block:
+                    schedules[day] = Schedule(
+                        {role: ["未割当"] for role in self.roles},
+                        anytime=anytime,
+                        diagnosis=diagnosis,
+                    )
+                self._record_block(
+                    block, problem, anytime, built - start, solved - built, 0.0
+                )
+                b += 1
+                continue
+
+            if anytime:
+                logger.warning(
+                    f"{block[0]} - {block[-1]}: stopped at the time/gap limit. "
+                    "Returning the best solution found."
+                )
+            block_schedules = {
+                day: Schedule(schedule, anytime=anytime)
+                for day, schedule in self._extract_solution(x, block).items()
+            }
+            self._record_block(
+                block,
+                problem,
+                anytime,
+                built - start,
+                solved - built,
+                time.perf_counter() - solved,
+            )
+            for (e, r, day), var in x.items():
+                count = round(var.varValue or 0)
+                if count and not MILPMaker.is_pseudo_employee(e):
+                    used_shifts[e] += count
+                    if r in duty_counts:
+                        duty_counts[r][e] += count
+            schedules.update(block_schedules)
+            b += 1
+
+        for r, counts in duty_counts.items():
+            logger.info(
+                f"{r}: "
+                + ", ".join(f"{e} {counts[e]}" for e in self.fairness_members[r])
+            )
+        return schedules
+
+    def _get_day_maker(self) -> MILPMaker:
+        # 1日ずつの確認に使う MILPMaker (必要になったときに作成する)
+        if self._day_maker is None:
+            self._day_maker = MILPMaker(
+                self.availability,
+                self.role_compatibility,
+                self.fulltime,
+                self.weights,
+                self.num_required,
+                solver=self.solver.name,
+                diagnose=True,
+            )
+        return self._day_maker
+
+    def _unassigned(self, diagnosis: List[Conflict]) -> Schedule:
+        return Schedule({role: ["未割当"] for role in self.roles}, diagnosis=diagnosis)
+
+    def _exclude_infeasible_days(
+        self, days: List[str], schedules: Dict[str, Schedule]
+    ) -> List[str]:
+        # 解く前の確認で解がないとわかる日を "未割当" にし, 残りの日を返す
+        maker = self._get_day_maker()
+        feasible = []
+        for day in days:
+            conflicts = maker.diagnoser.precheck(day)
+            if conflicts:
+                maker._log_conflicts(day, "pre-solve check", conflicts)
+                schedules[day] = self._unassigned(conflicts)
+            else:
+                feasible.append(day)
+        return feasible
+
+    def _find_infeasible_days(
+        self, days: List[str], deadline: Optional[float]
+    ) -> Dict[str, Schedule]:
+        # 1日ずつ解き, 単独でも解がない日の "未割当" のスケジュールを返す
+        maker = self._get_day_maker()
+        infeasible = {}
+        for day in days:
+            schedule = maker.solve_for_day(day, deadline=deadline)[0]
+            if schedule.diagnosis is not None:
+                infeasible[day] = self._unassigned(schedule.diagnosis)
+        return infeasible
+
+    def _diagnose_block(self, block: List[str]) -> List[Conflict]:
+        if self.max_shifts is None:
+            conflicts = []
+        else:
+            conflicts = [
+                Conflict(
+                    "MaxShifts",
+                    f"1人あたりの出勤日数の上限 {self.max_shifts} 日では, "
+                    f"{block[0]} - {block[-1]} の必要人数を満たせません",
+                    [e for e in self.employees if not MILPMaker.is_pseudo_employee(e)],
+                )
+            ]
+        maker = self._get_day_maker()
+        maker._log_conflicts(f"{block[0]} - {block[-1]}", "monthly", conflicts)
+        return conflicts
+
+    @staticmethod
+    def _copy_counts(used_shifts, duty_counts):
+        return (
+            defaultdict(int, used_shifts),
+            {r: defaultdict(int, counts) for r, counts in duty_counts.items()},
+        )
+
+    def _record_block(
+        self, block, problem, anytime, build_time, solve_time, extract_time
+    ):
+        if self.profiler is None:
+            return
+        self.profiler.record(
+            day=f"{block[0]} - {block[-1]}",
+            trial=0,
+            build_s=build_time,
+            solve_s=solve_time,
+            extract_s=extract_time,
+            variables=len(problem.variables()),
+            rows=len(problem.constraints),
+            solver=self.solver.name,
+            status=pulp.LpStatus[problem.status],
+            anytime=anytime,
+            objective=pulp.value(problem.objective) if problem.status == 1 else None,
+            **self.solver.last_stats,
+        )
+
+    def _split_days(self, days: List[str]) -> List[List[str]]:
+        if self.horizon == "full":
+            return [list(days)]
+        # 月曜日 (または最初の日) から始まる週ごとに区切る
+        blocks = []
+        for day in days:
+            if not blocks or MILPMaker.days_of_week(day) == "月":
+                blocks.append([])
+            blocks[-1].append(day)
+        return blocks
+
+    def _create_problem(self, days, used_shifts, duty_counts, remaining_days):
+        problem = LpProblem(f"MonthlyShiftAssignment_{days[0]}", LpMaximize)
+
+        # 変数を定義 (出勤可能で, 割り当て可能な組だけ)
+        # 名前に従業員名を使うと "_" を含む名前で衝突するため番号を使う
+        x = {}
+        for k, day in enumerate(days):
+            for i, e in enumerate(self.employees):
+                if not self.availability[e][day]:
+                    continue
+                for j, r in enumerate(self.roles):
+                    if not self.role_compatibility[e][r]:
+                        continue
+                    if MILPMaker.is_pseudo_employee(e):
+                        x[(e, r, day)] = LpVariable(
+                            f"x_{i}_{j}_{k}", lowBound=0, cat=pulp.LpInteger
+                        )
+                    else:
+                        x[(e, r, day)] = LpVariable(f"x_{i}_{j}_{k}", cat=pulp.LpBinary)
+
+        for k, day in enumerate(days):
+            self._add_daily_constraints(problem, x, day, k)
+        self._add_shift_cap_constraints(problem, x, days, used_shifts, remaining_days)
+        penalty = self._add_fairness_terms(problem, x, days, duty_counts)
+
+        problem += (
+            lpSum(self.weights[e] * var for (e, _, _), var in x.items()) - penalty,
+            "Objective",
+        )
+        logger.debug(
+            f"Monthly model: {len(x)} variables, {len(problem.constraints)} rows"
+        )
+        return problem, x
+
+    def _add_daily_constraints(self, problem: LpProblem, x: Dict, day: str, k: int):
+        # 各役職の必要人数
+        required_count = self.num_required[MILPMaker.days_of_week(day)]
+        for j, r in enumerate(self.roles):
+            problem += (
+                lpSum(x[(e, r, day)] for e in self.employees if (e, r, day) in x)
+                == required_count[r],
+                f"RoleAssignment_{k}_{j}",
+            )
+
+        # 各従業員が1日に1つの役職のみ担当する (メディカルは4つまで)
+        for i, e in enumerate(self.employees):
+            if "不足" in e:
+                continue
+            problem += (
+                lpSum(x[(e, r, day)] for r in self.roles if (e, r, day) in x)
+                <= (4 if e == "メディカル" else 1),
+                f"SingleRoleAssignment_{k}_{i}",
+            )
+
+        # フルタイム従業員が受付と胃カメラを担当する
+        for name, r in (("Reception", "受付"), ("Gastroscopy", "胃カメラ")):
+            problem += (
+                lpSum(
+                    x[(e, r, day)]
+                    for e in self.employees
+                    if self.fulltime[e] and (e, r, day) in x
+                )
+                >= 1,
+                f"FulltimeRoleAssignment_{name}_{k}",
+            )
+
+    def _add_shift_cap_constraints(self, problem, x, days, used_shifts, remaining_days):
+        """
+        出勤日数の上限を加える。
+        weekly のときは, 残りの上限を出勤可能な日数の比で残りの期間に割り振る
+        (最初の週で上限を使い切り, 後の週に割り当てられる人がいなくならないよう)。
+        """
+        if self.max_shifts is None:
+            return
+        shifts = defaultdict(list)
+        for (e, _, _), var in x.items():
+            shifts[e].append(var)
+        for i, e in enumerate(self.employees):
+            if MILPMaker.is_pseudo_employee(e) or not shifts[e]:
+                continue
+            cap = max(0, self.max_shifts - used_shifts[e])
+            available = sum(bool(self.availability[e][day]) for day in remaining_days)
+            if available:
+                in_block = sum(bool(self.availability[e][day]) for day in days)
+                cap = min(cap, math.ceil(cap * in_block / available))
+            problem += (lpSum(shifts[e]) <= cap, f"MaxShifts_{i}")
+
+    def _add_fairness_terms(self, problem, x, days, duty_counts):
+        # 担当回数の最大 - 最小 を罰金として返す
+        if not self.fairness_weight:
+            return 0
+        penalty = []
+        for j, r in enumerate(self.fairness_roles):
+            members = self.fairness_members[r]
+            if len(members) < 2:
+                continue
+            high = LpVariable(f"duty_max_{j}", lowBound=0)
+            low = LpVariable(f"duty_min_{j}", lowBound=0)
+            for i, e in enumerate(members):
+                count = duty_counts[r][e] + lpSum(
+                    x[(e, r, day)] for day in days if (e, r, day) in x
+                )
+                problem += (count <= high, f"DutyMax_{j}_{i}")
+                problem += (count >= low, f"DutyMin_{j}_{i}")
+            penalty.append(self.fairness_weight * (high - low))
+        return lpSum(penalty)
+
+    def _extract_solution(self, x: Dict, days: List[str]) -> Dict:
+        schedules = {day: defaultdict(list) for day in days}
+        for (e, r, day), var in x.items():
+            for _ in range(round(var.varValue or 0)):
+                schedules[day][r].append(e)
+        return schedules
@@ -0,0 +1,102 @@
+# 日ごとのモデルを解く前に, 配列の計算だけで決まる変数を固定し, 上限を絞ります。
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List
+
+import numpy as np
+
+from MILP.infeasibility import MEDICAL_CAPACITY
+
+if TYPE_CHECKING:
+    from MILP.milp_maker import MILPMaker
+
+
+@dataclass
+class Reduction:
+    """
+    presolve の結果。
+    lower / upper は変数 (MILPMaker.variables の順) ごとの下限・上限。
+    """
+
+    day: str
+    lower: np.ndarray
+    upper: np.ndarray
+    # 割り当て可能な役職がない (出勤できない, または必要人数が 0 の役職だけの) 従業員
+    dropped: List[str] = field(default_factory=list)
+    # 割り当て可能な人数と必要人数が等しいため, 全員を割り当てた役職 {役職: [従業員]}
+    fixed: Dict[str, List[str]] = field(default_factory=dict)
+    # 疑似従業員の上限 {従業員: {役職: 人数}}
+    capped: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+    @property
+    def num_free(self) -> int:
+        """値が決まっていない変数の数"""
+        return int(np.count_nonzero(self.upper > self.lower))
+
+    @property
+    def num_fixed(self) -> int:
+        """値が決まった変数 (0 に固定したものを含む) の数"""
+        return len(self.upper) - self.num_free
+
+    def summary(self) -> str:
+        fixed = sum(len(employees) for employees in self.fixed.values())
+        return (
+            f"{len(self.dropped)} employees dropped, "
+            f"{fixed} assignments fixed in {len(self.fixed)} roles, "
+            f"{self.num_free} / {len(self.upper)} variables free"
+        )
+
+
+def presolve(maker: "MILPMaker", day: str) -> Reduction:
+    """
+    その日の出勤可能性・役職適性・必要人数から, 変数の上下限を求める。
+    - 割り当て可能な役職がない従業員の変数は全て 0 に固定する
+    - 疑似従業員を含まず, 割り当て可能な人数が必要人数と等しい役職は,
+      その全員を割り当てる (その人の他の役職の変数は 0 に固定し, 他の役職も確かめ直す)
+    - 疑似従業員の変数の上限を, その役職の必要人数 (メディカルは 4 人まで) にする
+    固定した内容は制約から導かれるものだけなので, 最適解の集合は変わらない。
+    """
+    m = maker
+    required = m.required[m.days_of_week(day)]
+    available = m.available[:, m.day_ids[day]]
+    real = ~m.is_pseudo
+    # その日に割り当てられる (従業員, 役職) の組
+    eligible = m.compatible & available[:, None] & (required > 0)[None, :]
+
+    # 割り当て可能な人数と必要人数が等しい役職を, 変化がなくなるまで固定する
+    fixed_role = np.full(len(m.employees), -1)
+    done = np.zeros(len(m.roles), dtype=bool)
+    changed = True
+    while changed:
+        changed = False
+        for j in np.flatnonzero(~done):
+            if (eligible[:, j] & m.is_pseudo).any():
+                # 疑似従業員は何人分でも割り当てられる
+                done[j] = True
+                continue
+            pool = eligible[:, j] & real
+            if np.count_nonzero(pool) != required[j]:
+                continue
+            fixed_role[pool] = j
+            # 固定した人は他の役職に割り当てられない
+            eligible[pool] = False
+            eligible[pool, j] = True
+            done[j] = True
+            changed = True
+
+    var_e, var_r = m.var_employee, m.var_role
+    on = eligible[var_e, var_r]
+    caps = np.where(m.is_shortage, np.inf, MEDICAL_CAPACITY)[var_e]
+    upper = np.where(m.is_pseudo[var_e], np.minimum(required[var_r], caps), 1.0) * on
+    lower = (fixed_role[var_e] == var_r).astype(float)
+
+    reduction = Reduction(day, lower, upper)
+    reduction.dropped = [
+        m.employees[i] for i in np.flatnonzero(~eligible.any(axis=1) & real)
+    ]
+    for i in np.flatnonzero(fixed_role >= 0):
+        role = m.roles[fixed_role[i]]
+        reduction.fixed.setdefault(role, []).append(m.employees[i])
+    for k in np.flatnonzero(m.is_pseudo[var_e] & on):
+        employee, role = m.employees[var_e[k]], m.roles[var_r[k]]
+        reduction.capped.setdefault(employee, {})[role] = int(upper[k])
+    return reduction
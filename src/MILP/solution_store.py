@@ -0,0 +1,105 @@
+# 前回の実行で解いたスケジュールを日ごとに保存し, 入力が同じ日に再利用します。
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from MILP.milp_maker import MILPMaker
+
+logger = logging.getLogger("shift_scheduler")
+
+# 保存形式を変えたときに上げる
+STORE_VERSION = 1
+
+
+def _digest(value) -> str:
+    text = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def common_fingerprint(data: Dict, options: Dict) -> str:
+    """全ての日に共通する入力 (役職適性, 社員リスト, 重み, 解き方) のハッシュ"""
+    return _digest(
+        {
+            "capabilities": data["capabilities"],
+            "fulltime": data["fulltime"],
+            "weights": data["weights"],
+            "options": options,
+        }
+    )
+
+
+def day_fingerprint(data: Dict, day: str, common: str) -> str:
+    """
+    その日のモデルを決める入力のハッシュ。
+    出勤可能性の列, その曜日の必要人数と, 全日に共通する入力から計算する。
+    """
+    return _digest(
+        {
+            "availability": [
+                [employee, availability.get(day)]
+                for employee, availability in data["availabilities"].items()
+            ],
+            "required": data["num_required"][MILPMaker.days_of_week(day)],
+            "common": common,
+        }
+    )
+
+
+class SolutionStore:
+    """
+    日ごとの入力のハッシュと解いたスケジュールを JSON ファイルに保存する。
+    ハッシュが一致する日は前回のスケジュールをそのまま使える。
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._days: Dict[str, Dict] = {}
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"前回の解を読み込めませんでした: {e}")
+            return
+        if stored.get("version") != STORE_VERSION:
+            logger.info("前回の解の保存形式が異なるため, 使用しません。")
+            return
+        self._days = stored.get("days", {})
+
+    def get(self, day: str, fingerprint: str) -> Optional[List[Dict[str, List[str]]]]:
+        entry = self._days.get(day)
+        if entry is None or entry["fingerprint"] != fingerprint:
+            return None
+        return entry["schedules"]
+
+    def previous(self, day: str) -> Optional[Dict[str, List[str]]]:
+        """入力が変わっていても, 前回のその日の最初のスケジュールを返す (初期解に使う)"""
+        entry = self._days.get(day)
+        if entry is None or not entry["schedules"]:
+            return None
+        return entry["schedules"][0]
+
+    def put(self, day: str, fingerprint: str, schedules: List[Dict[str, List[str]]]):
+        self._days[day] = {
+            "fingerprint": fingerprint,
+            "schedules": [dict(schedule) for schedule in schedules],
+        }
+
+    def save(self, days: Optional[List[str]] = None):
+        """保存する (days を指定した場合は, それ以外の日を削除する)"""
+        if days is not None:
+            self._days = {day: self._days[day] for day in days if day in self._days}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": STORE_VERSION, "days": self._days}, f, ensure_ascii=False
+            )
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,371 @@
+import logging
+import math
+import os
+import re
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pulp import (
+    PULP_CBC_CMD,
+    LpConstraintEQ,
+    LpConstraintGE,
+    LpConstraintLE,
+    LpInteger,
+    LpMaximize,
+    LpProblem,
+    LpSolutionInfeasible,
+    LpSolutionIntegerFeasible,
+    LpSolutionNoSolutionFound,
+    LpSolutionOptimal,
+    LpSolutionUnbounded,
+    LpStatusInfeasible,
+    LpStatusNotSolved,
+    LpStatusOptimal,
+    LpStatusUnbounded,
+    LpVariable,
+)
+
+logger = logging.getLogger("shift_scheduler")
+
+SOLVER_NAMES = ("auto", "highs", "cbc")
+
+# HiGHS の mip_rel_gap の既定値 (gap を指定しない solve で元に戻す)
+HIGHS_DEFAULT_MIP_REL_GAP = 1e-4
+
+# CBC のログの最後に出力される結果と統計
+_CBC_RESULT = re.compile(r"^Result - (.*)$", re.M)
+_CBC_GAP = re.compile(r"^Gap:\s+(\S+)", re.M)
+_CBC_NODES = re.compile(r"^Enumerated nodes:\s+(\d+)", re.M)
+
+
+class SolverBackend:
+    """
+    LpProblem を解くソルバーの共通インターフェース。
+    solve は pulp と同じステータスを返し, 解を各変数の varValue に書き戻す。
+    time_limit (秒) と gap (相対ギャップ) を指定した場合, 制限に達した時点の
+    暫定解を返す。暫定解の場合もステータスは LpStatusOptimal で,
+    problem.sol_status が LpSolutionIntegerFeasible になる (pulp と同じ)。
+    warm_start ({変数: 値}) を指定した場合, 初期解 (MIP start) としてソルバーに渡す。
+    含まれない変数の値は 0 とする。
+    last_stats には直前の solve の統計 (探索ノード数, 相対ギャップ) を入れる。
+    取得できない項目は None とする。
+    """
+
+    name = ""
+
+    def __init__(self):
+        self.last_stats: Dict[str, Optional[float]] = {"nodes": None, "gap": None}
+
+    def solve(
+        self,
+        problem: LpProblem,
+        seed: Optional[int] = None,
+        time_limit: Optional[float] = None,
+        gap: Optional[float] = None,
+        warm_start: Optional[Dict[LpVariable, float]] = None,
+    ) -> int:
+        raise NotImplementedError
+
+    def is_proven_optimal(
+        self, problem: LpProblem, gap: Optional[float] = None
+    ) -> bool:
+        """
+        直前の solve の解が最適と証明されたかどうかを返す。
+        制限で打ち切った場合, sol_status は LpSolutionIntegerFeasible になる。
+        目標ギャップを指定した場合は, ギャップが 0 と分かるときだけ最適とみなす。
+        """
+        if problem.sol_status != LpSolutionOptimal:
+            return False
+        if gap:
+            last_gap = self.last_stats["gap"]
+            return last_gap is not None and last_gap <= 1e-9
+        return True
+
+
+class CbcBackend(SolverBackend):
+    """PuLP 同梱の CBC を solve ごとに別プロセスで実行するバックエンド"""
+
+    name = "cbc"
+
+    def solve(
+        self,
+        problem: LpProblem,
+        seed: Optional[int] = None,
+        time_limit: Optional[float] = None,
+        gap: Optional[float] = None,
+        warm_start: Optional[Dict[LpVariable, float]] = None,
+    ) -> int:
+        options = [] if seed is None else [f"randomSeed={seed}"]
+        if warm_start is not None:
+            # pulp は solve 前の varValue を初期解として CBC に渡す
+            for var in problem.variables():
+                var.varValue = warm_start.get(var, 0)
+        # 目標ギャップで打ち切っても CBC は Optimal を返すため,
+        # ギャップと探索ノード数はログから読み取る
+        fd, log_path = tempfile.mkstemp(suffix="-cbc.log")
+        os.close(fd)
+        try:
+            status = problem.solve(
+                PULP_CBC_CMD(
+                    msg=False,
+                    options=options,
+                    timeLimit=time_limit,
+                    gapRel=gap,
+                    warmStart=warm_start is not None,
+                    logPath=log_path,
+                )
+            )
+            with open(log_path, encoding="utf-8", errors="replace") as f:
+                self.last_stats = self._parse_log(f.read())
+        finally:
+            os.remove(log_path)
+        return status
+
+    @staticmethod
+    def _parse_log(log: str) -> Dict[str, Optional[float]]:
+        """
+        CBC のログから統計を取り出す。
+        最適性を証明した場合は Gap の行がないため, ギャップを 0 とする。
+        """
+        result = _CBC_RESULT.search(log)
+        gap = _CBC_GAP.search(log)
+        nodes = _CBC_NODES.search(log)
+        if gap is not None:
+            gap = abs(float(gap.group(1)))
+        elif result is not None and result.group(1) == "Optimal solution found":
+            gap = 0.0
+        return {"nodes": int(nodes.group(1)) if nodes else None, "gap": gap}
+
+
+class HighsBackend(SolverBackend):
+    """
+    HiGHS (highspy) をプロセス内で使うバックエンド。
+    モデルは最初の solve で一度だけ HiGHS に渡し, 以降は変数の上下限,
+    制約の右辺, 追加・削除された制約だけを反映する。
+    前回の解を初期解として渡すため, 試行を重ねるほど探索が速くなる。
+
+    既存の制約の係数と目的関数は変更されないことを前提とする。
+    """
+
+    name = "highs"
+
+    def __init__(self):
+        super().__init__()
+        # highspy は任意の依存なので, 使うときだけインポートする
+        import highspy
+
+        self._highspy = highspy
+        self._highs: Optional["highspy.Highs"] = None
+        self._problem: Optional[LpProblem] = None
+        self._variables = []
+        self._col_index: Dict[LpVariable, int] = {}
+        self._row_names: List[str] = []
+        self._last_solution: Optional[np.ndarray] = None
+
+    def solve(
+        self,
+        problem: LpProblem,
+        seed: Optional[int] = None,
+        time_limit: Optional[float] = None,
+        gap: Optional[float] = None,
+        warm_start: Optional[Dict[LpVariable, float]] = None,
+    ) -> int:
+        if self._problem is not problem:
+            self._build(problem)
+        else:
+            self._sync(problem)
+
+        h = self._highs
+        if seed is not None:
+            h.setOptionValue("random_seed", seed)
+        # 制限はモデルに残るため, 指定しない場合は既定値に戻す
+        h.setOptionValue(
+            "time_limit",
+            float(time_limit) if time_limit is not None else self._highspy.kHighsInf,
+        )
+        h.setOptionValue(
+            "mip_rel_gap", float(gap) if gap is not None else HIGHS_DEFAULT_MIP_REL_GAP
+        )
+        initial = self._last_solution
+        if warm_start is not None:
+            initial = np.zeros(len(self._variables), dtype=np.double)
+            for var, value in warm_start.items():
+                initial[self._col_index[var]] = value
+        if initial is not None:
+            # 指定された初期解, なければ前回の解を渡す (実行不可能な場合は HiGHS が無視する)
+            start = self._highspy.HighsSolution()
+            start.col_value = initial.tolist()
+            start.value_valid = True
+            h.setSolution(start)
+
+        h.run()
+        info = h.getInfo()
+        # 解がない場合, ギャップは inf や nan になる
+        gap = info.mip_gap if math.isfinite(info.mip_gap) else None
+        self.last_stats = {"nodes": info.mip_node_count, "gap": gap}
+        status, sol_status = self._to_pulp_status(h.getModelStatus(), info)
+        problem.status = status
+        problem.sol_status = sol_status
+
+        if status == LpStatusOptimal:
+            values = np.asarray(h.getSolution().col_value)
+            self._last_solution = values
+            for var, value in zip(self._variables, values):
+                var.varValue = value
+        return status
+
+    def _to_pulp_status(self, model_status, info) -> Tuple[int, int]:
+        """HiGHS のモデルの状態を pulp の (status, sol_status) に変換する"""
+        status = self._highspy.HighsModelStatus
+        if model_status == status.kOptimal:
+            return LpStatusOptimal, LpSolutionOptimal
+        if model_status == status.kInfeasible:
+            return LpStatusInfeasible, LpSolutionInfeasible
+        if model_status in (status.kUnbounded, status.kUnboundedOrInfeasible):
+            return LpStatusUnbounded, LpSolutionUnbounded
+        feasible = self._highspy.SolutionStatus.kSolutionStatusFeasible
+        if int(info.primal_solution_status) == int(feasible):
+            # 時間などの制限で打ち切ったが, 実行可能な暫定解がある
+            return LpStatusOptimal, LpSolutionIntegerFeasible
+        return LpStatusNotSolved, LpSolutionNoSolutionFound
+
+    def _bounds(self, variables):
+        inf = self._highspy.kHighsInf
+        lower = [-inf if v.lowBound is None else v.lowBound for v in variables]
+        upper = [inf if v.upBound is None else v.upBound for v in variables]
+        return np.array(lower, dtype=np.double), np.array(upper, dtype=np.double)
+
+    def _row_bounds(self, constraint):
+        inf = self._highspy.kHighsInf
+        rhs = -constraint.constant
+        if constraint.sense == LpConstraintEQ:
+            return rhs, rhs
+        if constraint.sense == LpConstraintLE:
+            return -inf, rhs
+        if constraint.sense == LpConstraintGE:
+            return rhs, inf
+        raise ValueError(f"Unknown constraint sense: {constraint.sense}")
+
+    def _build(self, problem: LpProblem):
+        # LpProblem 全体を HiGHS のモデルとして作り直す
+        h = self._highspy.Highs()
+        h.setOptionValue("output_flag", False)
+
+        self._problem = problem
+        self._variables = problem.variables()
+        # 列は変数そのもので引く (名前は重複しうるため使わない)
+        self._col_index = {v: j for j, v in enumerate(self._variables)}
+        self._row_names = []
+        self._last_solution = None
+
+        num_cols = len(self._variables)
+        lower, upper = self._bounds(self._variables)
+        costs = np.zeros(num_cols, dtype=np.double)
+        for var, coef in problem.objective.items():
+            costs[self._col_index[var]] = coef
+        h.addCols(
+            num_cols, costs, lower, upper, 0, np.array([]), np.array([]), np.array([])
+        )
+        integer_cols = [j for j, v in enumerate(self._variables) if v.cat == LpInteger]
+        if integer_cols:
+            h.changeColsIntegrality(
+                len(integer_cols),
+                np.array(integer_cols, dtype=np.int32),
+                np.full(
+                    len(integer_cols),
+                    self._highspy.HighsVarType.kInteger,
+                    dtype=np.uint8,
+                ),
+            )
+        if problem.objective.constant:
+            h.changeObjectiveOffset(problem.objective.constant)
+        if problem.sense == LpMaximize:
+            h.changeObjectiveSense(self._highspy.ObjSense.kMaximize)
+
+        self._highs = h
+        self._add_rows(list(problem.constraints.items()))
+
+    def _add_rows(self, named_constraints):
+        if not named_constraints:
+            return
+        lower, upper, starts, indices, values = [], [], [], [], []
+        for name, constraint in named_constraints:
+            lb, ub = self._row_bounds(constraint)
+            lower.append(lb)
+            upper.append(ub)
+            starts.append(len(indices))
+            for var, coef in constraint.items():
+                indices.append(self._col_index[var])
+                values.append(coef)
+            self._row_names.append(name)
+        self._highs.addRows(
+            len(named_constraints),
+            np.array(lower, dtype=np.double),
+            np.array(upper, dtype=np.double),
+            len(indices),
+            np.array(starts, dtype=np.int32),
+            np.array(indices, dtype=np.int32),
+            np.array(values, dtype=np.double),
+        )
+
+    def _sync(self, problem: LpProblem):
+        # 変数の上下限を反映
+        h = self._highs
+        lower, upper = self._bounds(self._variables)
+        h.changeColsBounds(
+            len(self._variables),
+            np.arange(len(self._variables), dtype=np.int32),
+            lower,
+            upper,
+        )
+
+        # 削除された制約を HiGHS からも削除
+        constraints = problem.constraints
+        removed = [i for i, n in enumerate(self._row_names) if n not in constraints]
+        if removed:
+            h.deleteRows(len(removed), np.array(removed, dtype=np.int32))
+            removed_set = set(removed)
+            self._row_names = [
+                n for i, n in enumerate(self._row_names) if i not in removed_set
+            ]
+
+        # 追加された制約を HiGHS に追加
+        known = set(self._row_names)
+        try:
+            self._add_rows([(n, c) for n, c in constraints.items() if n not in known])
+        except KeyError:
+            # 未知の変数を含む制約が追加された場合はモデルを作り直す
+            logger.debug("Unknown variable in new constraint. Rebuilding the model.")
+            self._build(problem)
+            return
+
+        # 制約の右辺を反映
+        if self._row_names:
+            bounds = [self._row_bounds(constraints[n]) for n in self._row_names]
+            h.changeRowsBounds(
+                len(self._row_names),
+                np.arange(len(self._row_names), dtype=np.int32),
+                np.array([lb for lb, _ in bounds], dtype=np.double),
+                np.array([ub for _, ub in bounds], dtype=np.double),
+            )
+
+
+def create_backend(name: str = "auto") -> SolverBackend:
+    """
+    ソルバー名からバックエンドを作成する。
+    "auto" の場合は highspy があれば HiGHS を, なければ CBC を使う。
+    """
+    if name not in SOLVER_NAMES:
+        logger.error(f"Invalid solver: {name}")
+        raise ValueError(f"Invalid solver: {name}")
+
+    if name in ("auto", "highs"):
+        try:
+            return HighsBackend()
+        except ImportError:
+            if name == "highs":
+                logger.error("highspy is not installed.")
+                raise
+            logger.warning("highspy is not installed. Falling back to CBC.")
+    return CbcBackend()
@@ -0,0 +1,314 @@
+# 読み込んだ入力と解いたスケジュールを Parquet (Arrow) の形式で読み書きします。
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from MILP.infeasibility import Conflict
+from MILP.milp_maker import Schedule
+from WriteExcel.excel_writer import ANYTIME_MARK, DIAGNOSIS_SHEET
+
+logger = logging.getLogger("shift_scheduler")
+
+# 保存形式を変えたときに上げる
+FORMAT_VERSION = 1
+# 入力のディレクトリの, マスタのファイル名 (拡張子なし) と Excel のシート名
+MASTER_FILES = {
+    "capabilities": "割り当て",
+    "fulltime": "社員リスト",
+    "weights": "重み",
+    "num_required": "人数",
+}
+# 入力のディレクトリの, 希望シフトのシートを置くサブディレクトリ
+AVAILABILITY_DIR = "availabilities"
+
+DIAGNOSIS_TYPE = pa.list_(
+    pa.struct(
+        [
+            ("constraint", pa.string()),
+            ("message", pa.string()),
+            ("staff", pa.list_(pa.string())),
+        ]
+    )
+)
+SCHEDULE_SCHEMA = pa.schema(
+    [
+        ("day", pa.string()),
+        ("trial", pa.int32()),
+        ("anytime", pa.bool_()),
+        ("assignments", pa.map_(pa.string(), pa.list_(pa.string()))),
+        # 解がない日だけ, 満たせない制約のリスト (それ以外は null)
+        ("diagnosis", DIAGNOSIS_TYPE),
+    ]
+)
+
+
+def _metadata(**values) -> Dict[bytes, bytes]:
+    values["format_version"] = FORMAT_VERSION
+    return {
+        key.encode("utf-8"): json.dumps(value, ensure_ascii=False).encode("utf-8")
+        for key, value in values.items()
+    }
+
+
+def _read_metadata(schema: pa.Schema) -> Dict:
+    metadata = {
+        key.decode("utf-8"): json.loads(value)
+        for key, value in (schema.metadata or {}).items()
+        if not key.startswith(b"pandas")
+    }
+    if metadata.get("format_version") != FORMAT_VERSION:
+        raise ValueError(
+            f"保存形式のバージョンが異なります: {metadata.get('format_version')}"
+        )
+    return metadata
+
+
+def _read_table(path: Path) -> pa.Table:
+    # メモリマップで読み込む (列はファイルの内容をそのまま参照する)
+    return pq.read_table(path, memory_map=True)
+
+
+def _matrix_to_table(
+    nested: Dict[str, Dict], index_name: str, value_type: pa.DataType
+) -> pa.Table:
+    """{行: {列: 値}} を 行名の列 + 列ごとの列 の表に変換する (ない値は null)"""
+    columns: Dict[str, None] = {}
+    for row in nested.values():
+        columns.update(dict.fromkeys(row))
+    arrays = [pa.array(list(nested), pa.string())]
+    arrays += [
+        pa.array([row.get(column) for row in nested.values()], value_type)
+        for column in columns
+    ]
+    return pa.table(arrays, names=[index_name, *columns])
+
+
+def _table_to_matrix(table: pa.Table) -> Dict[str, Dict]:
+    """_matrix_to_table の逆 (null の値は含めない)"""
+    index, *columns = table.column_names
+    values = {column: table.column(column).to_pylist() for column in columns}
+    return {
+        name: {
+            column: values[column][i]
+            for column in columns
+            if values[column][i] is not None
+        }
+        for i, name in enumerate(table.column(index).to_pylist())
+    }
+
+
+def write_inputs(
+    path: str, master: Dict, availabilities: Dict[str, Dict[str, Dict[str, bool]]]
+):
+    """
+    マスタ (read_master_data の結果) と希望シフトのシートごとの出勤可能性
+    {シート名: {従業員: {日: bool}}} をディレクトリに書き出す。
+    """
+    directory = Path(path)
+    (directory / AVAILABILITY_DIR).mkdir(parents=True, exist_ok=True)
+    tables = {
+        "capabilities": _matrix_to_table(master["capabilities"], "name", pa.bool_()),
+        "fulltime": pa.table(
+            {
+                "name": pa.array(list(master["fulltime"]), pa.string()),
+                "is_fulltime": pa.array(list(master["fulltime"].values()), pa.bool_()),
+            }
+        ),
+        "weights": pa.table(
+            {
+                "name": pa.array(list(master["weights"]), pa.string()),
+                # 重みの型 (整数・小数) はそのまま残す
+                "weight": pa.array(list(master["weights"].values())),
+            }
+        ),
+        "num_required": _matrix_to_table(master["num_required"], "weekday", pa.int64()),
+    }
+    for name, table in tables.items():
+        table = table.replace_schema_metadata(_metadata())
+        pq.write_table(table, directory / f"{name}.parquet")
+    for sheet_name, nested in availabilities.items():
+        table = _matrix_to_table(nested, "name", pa.bool_())
+        table = table.replace_schema_metadata(_metadata(sheet_name=sheet_name))
+        pq.write_table(table, directory / AVAILABILITY_DIR / f"{sheet_name}.parquet")
+    logger.info(f"入力を書き出しました: {directory} ({len(availabilities)} シート)")
+
+
+def read_master(path: str) -> Dict:
+    """write_inputs で書き出したマスタを read_master_data と同じ形式で読み込む"""
+    directory = Path(path)
+    tables = {name: _read_table(directory / f"{name}.parquet") for name in MASTER_FILES}
+    for table in tables.values():
+        _read_metadata(table.schema)
+    fulltime, weights = tables["fulltime"], tables["weights"]
+    return {
+        "capabilities": _table_to_matrix(tables["capabilities"]),
+        "fulltime": dict(
+            zip(
+                fulltime.column("name").to_pylist(),
+                fulltime.column("is_fulltime").to_pylist(),
+            )
+        ),
+        "weights": dict(
+            zip(
+                weights.column("name").to_pylist(), weights.column("weight").to_pylist()
+            )
+        ),
+        "num_required": _table_to_matrix(tables["num_required"]),
+    }
+
+
+def sheet_names(path: str) -> List[str]:
+    """write_inputs で書き出した希望シフトのシート名"""
+    return [
+        _read_metadata(pq.read_schema(p))["sheet_name"]
+        for p in sorted((Path(path) / AVAILABILITY_DIR).glob("*.parquet"))
+    ]
+
+
+def read_availabilities(path: str, sheet_name: str) -> Dict[str, Dict[str, bool]]:
+    table = _read_table(Path(path) / AVAILABILITY_DIR / f"{sheet_name}.parquet")
+    _read_metadata(table.schema)
+    return _table_to_matrix(table)
+
+
+def read_inputs(path: str, sheet_name: str, master: Optional[Dict] = None) -> Dict:
+    """
+    write_inputs で書き出した入力から, read_excel_data と同じ形式のデータを読み込む。
+    master を指定した場合, マスタは読み込まない。
+    """
+    if master is None:
+        master = read_master(path)
+    return {"availabilities": read_availabilities(path, sheet_name), **master}
+
+
+def write_inputs_to_excel(path: str, output_path: str):
+    """write_inputs で書き出した入力を, 元の形式のワークブックに書き出す"""
+
+    def ox(matrix: Dict[str, Dict[str, bool]]) -> pd.DataFrame:
+        df = pd.DataFrame.from_dict(matrix, orient="index")
+        return df.apply(lambda column: column.map({True: "o", False: "x"}))
+
+    master = read_master(path)
+    with pd.ExcelWriter(output_path, engine="xlsxwriter") as writer:
+        for sheet_name in sheet_names(path):
+            ox(read_availabilities(path, sheet_name)).to_excel(
+                writer, sheet_name=sheet_name
+            )
+        pd.DataFrame.from_dict(master["num_required"], orient="index").to_excel(
+            writer, sheet_name=MASTER_FILES["num_required"]
+        )
+        for name in ("weights", "fulltime"):
+            values = master[name]
+            if name == "fulltime":
+                values = {e: "o" if flag else "x" for e, flag in values.items()}
+            pd.Series(values).to_excel(
+                writer, sheet_name=MASTER_FILES[name], header=False
+            )
+        ox(master["capabilities"]).to_excel(
+            writer, sheet_name=MASTER_FILES["capabilities"]
+        )
+    logger.info(f"入力をワークブックに書き出しました: {output_path}")
+
+
+def write_schedules(
+    path: str,
+    schedule_list: Iterable[Tuple[str, Dict[str, List[str]]]],
+    sheet_name: str,
+    weights: Optional[Dict[str, float]] = None,
+    fulltime: Optional[Dict[str, bool]] = None,
+):
+    """
+    スケジュール [(日:試行, {役職: [従業員]})] を1行1スケジュールの表として書き出す。
+    weights / fulltime は Excel に戻すときのセル内の並び順と文字色に使う。
+    """
+    rows = {name: [] for name in SCHEDULE_SCHEMA.names}
+    roles: List[str] = []
+    for day_index, schedule in schedule_list:
+        day, _, trial = day_index.rpartition(":")
+        if not roles:
+            roles = list(schedule)
+        diagnosis = getattr(schedule, "diagnosis", None)
+        rows["day"].append(day)
+        rows["trial"].append(int(trial))
+        rows["anytime"].append(bool(getattr(schedule, "anytime", False)))
+        rows["assignments"].append(list(schedule.items()))
+        rows["diagnosis"].append(
+            None
+            if diagnosis is None
+            else [
+                {"constraint": c.constraint, "message": c.message, "staff": c.staff}
+                for c in diagnosis
+            ]
+        )
+    table = pa.table(rows, schema=SCHEDULE_SCHEMA).replace_schema_metadata(
+        _metadata(
+            sheet_name=sheet_name,
+            roles=roles,
+            weights=weights or {},
+            fulltime=fulltime or {},
+        )
+    )
+    pq.write_table(table, path)
+    logger.info(f"スケジュールを書き出しました: {path} ({table.num_rows} 行)")
+
+
+def read_schedules(path: str) -> Tuple[Dict, Iterator[Tuple[str, Schedule]]]:
+    """
+    write_schedules で書き出したスケジュールを読み込み,
+    (メタデータ {sheet_name, roles, weights, fulltime}, [(日:試行, Schedule)]) を返す。
+    """
+    table = _read_table(Path(path))
+    metadata = _read_metadata(table.schema)
+
+    def rows() -> Iterator[Tuple[str, Schedule]]:
+        for row in table.to_pylist():
+            diagnosis = row["diagnosis"]
+            yield f"{row['day']}:{row['trial']}", Schedule(
+                row["assignments"],
+                anytime=row["anytime"],
+                diagnosis=(
+                    None if diagnosis is None else [Conflict(**c) for c in diagnosis]
+                ),
+            )
+
+    return metadata, rows()
+
+
+def read_schedule_excel(path: str) -> Tuple[str, List[Tuple[str, Schedule]]]:
+    """
+    ExcelWriter で書き出したスケジュールのワークブックを読み込み,
+    (シート名, [(日:試行, Schedule)]) を返す。
+    セルの従業員は ", " で区切られているものとして分ける。
+    """
+    with pd.ExcelFile(path) as book:
+        sheet_name = book.sheet_names[0]
+        df = book.parse(sheet_name, index_col=0, dtype=object)
+        diagnoses: Dict[str, List[Conflict]] = {}
+        if DIAGNOSIS_SHEET in book.sheet_names:
+            sheet = book.parse(DIAGNOSIS_SHEET, dtype=object)
+            for day_index, constraint, message, staff in sheet.itertuples(index=False):
+                conflicts = diagnoses.setdefault(day_index, [])
+                # 原因を特定できなかった日は, 制約のない行だけがある
+                if not pd.isna(constraint):
+                    staff = [] if pd.isna(staff) else str(staff).split(", ")
+                    conflicts.append(Conflict(constraint, message, staff))
+
+    rows = []
+    for day_index, cells in df.iterrows():
+        anytime = day_index.endswith(ANYTIME_MARK)
+        day_index = day_index.removesuffix(ANYTIME_MARK)
+        schedule = Schedule(
+            {
+                role: [] if pd.isna(cell) else str(cell).split(", ")
+                for role, cell in cells.items()
+            },
+            anytime=anytime,
+            diagnosis=diagnoses.get(day_index),
+        )
+        rows.append((day_index, schedule))
+    return sheet_name, rows
@@ -1,69 +1,137 @@
 # エクセルからデータを読みます。
-from typing import Dict
+import functools
+import logging
+from typing import Dict, List, Optional
 
+import numpy as np
 import pandas as pd
 
+from ReadExcel.parse_cache import ParseCache
+
+logger = logging.getLogger("shift_scheduler")
+
+
+def _cached(kind: str):
+    """読み込み結果を ParseCache に保存し, 次回以降はキャッシュから返すデコレータ"""
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, sheet_name):
+            if self.cache is None:
+                return method(self, sheet_name)
+            key = self.cache.key(self.path, sheet_name, kind)
+            if key is not None:
+                value = self.cache.get(key)
+                if value is not None:
+                    logger.debug(f"Loaded {kind} of sheet '{sheet_name}' from cache")
+                    return value
+            value = method(self, sheet_name)
+            if key is not None:
+                self.cache.put(key, value)
+            return value
+
+        return wrapper
+
+    return decorator
+
 
 class ExcelReader:
-    def __init__(self, path):
+    def __init__(self, path, cache: Optional[ParseCache] = None):
         self.path = path
+        # 読み込み結果のキャッシュ (None の場合は使わない)
+        self.cache = cache
+        self._book: Optional[pd.ExcelFile] = None
+
+    def __enter__(self) -> "ExcelReader":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # ワークブックは最初に必要になったときに一度だけ開き, 全シートで共有する
+    def _workbook(self) -> pd.ExcelFile:
+        if self._book is None:
+            self._book = pd.ExcelFile(self.path)
+        return self._book
+
+    def close(self):
+        if self._book is not None:
+            self._book.close()
+            self._book = None
+
+    def sheet_names(self) -> List[str]:
+        return list(self._workbook().sheet_names)
 
     # 1列目をインデックスにしてデータフレームを読み込む
     def read(self, sheet_name: str) -> pd.DataFrame:
-        df = pd.read_excel(self.path, sheet_name=sheet_name, index_col=0)
+        df = self._workbook().parse(sheet_name, index_col=0)
         return df
 
-    def read_availabilities(self, sheet_name: str) -> Dict[str, Dict[str, bool]]:
+    @staticmethod
+    def _ox_to_bool(values: np.ndarray) -> np.ndarray:
+        # 大文字小文字を区別しない
+        # 空白を削除
+        return np.char.lower(np.char.strip(values.astype(str))) == "o"
+
+    def _read_ox_matrix(self, sheet_name: str) -> pd.DataFrame:
+        """
+        o/x のシートを真偽値の行列として読み込みます。
+        o は True, それ以外は False, 空欄は <NA> になります。
+        """
         df = self.read(sheet_name)
-        availability = dict(df.apply(lambda x: x.dropna().to_dict(), axis=1))
-        # ox を True/False に変換
-        availability = {
-            name: {
-                # 大文字小文字を区別しない
-                # 空白を削除
-                day: True if ox.strip().lower() == "o" else False
-                for day, ox in availability[name].items()
-            }
-            for name in availability
+        values = df.to_numpy(dtype=object)
+        matrix = pd.DataFrame(
+            self._ox_to_bool(values), index=df.index, columns=df.columns
+        ).astype("boolean")
+        return matrix.mask(pd.isna(values))
+
+    @staticmethod
+    def _to_nested_dict(matrix: pd.DataFrame) -> Dict[str, Dict[str, bool]]:
+        # 行列を {行: {列: bool}} に変換 (空欄のセルは含めない)
+        present = matrix.notna().to_numpy()
+        flags = matrix.fillna(False).to_numpy(dtype=bool)
+        columns = list(matrix.columns)
+        return {
+            name: {columns[j]: bool(flags[i, j]) for j in np.flatnonzero(present[i])}
+            for i, name in enumerate(matrix.index)
         }
-        return availability
+
+    @_cached("availability_matrix")
+    def read_availability_matrix(self, sheet_name: str) -> pd.DataFrame:
+        """出勤可能性を 従業員 × 日 の真偽値の行列として読み込みます。"""
+        return self._read_ox_matrix(sheet_name)
+
+    @_cached("capability_matrix")
+    def read_capability_matrix(self, sheet_name: str) -> pd.DataFrame:
+        """役職適性を 従業員 × 役職 の真偽値の行列として読み込みます。"""
+        return self._read_ox_matrix(sheet_name)
+
+    def read_availabilities(self, sheet_name: str) -> Dict[str, Dict[str, bool]]:
+        return self._to_nested_dict(self.read_availability_matrix(sheet_name))
 
     def read_capabilities(self, sheet_name: str) -> Dict[str, Dict[str, bool]]:
-        df = self.read(sheet_name)
-        capabilities = dict(df.apply(lambda x: x.dropna().to_dict(), axis=1))
-        # ox を True/False に変換
-        capabilities = {
-            name: {
-                # 大文字小文字を区別しない
-                # 空白を削除
-                role: True if ox.strip().lower() == "o" else False
-                for role, ox in capabilities[name].items()
-            }
-            for name in capabilities
-        }
-        return capabilities
+        return self._to_nested_dict(self.read_capability_matrix(sheet_name))
 
+    @_cached("fulltime")
     def read_fulltime(self, sheet_name) -> Dict[str, bool]:
-        df = pd.read_excel(self.path, sheet_name=sheet_name, header=None)
+        df = self._workbook().parse(sheet_name, header=None)
         df.columns = ["name", "is_fulltime"]
         # ox -> True/False
-        df["is_fulltime"] = df["is_fulltime"].apply(
-            # 大文字小文字を区別しない
-            # 空白を削除
-            lambda x: True if x.strip().lower() == "o" else False
-        )
+        df["is_fulltime"] = self._ox_to_bool(df["is_fulltime"].to_numpy(dtype=object))
         fulltime_dict = {
-            name: is_fulltime
+            name: bool(is_fulltime)
             for name, is_fulltime in zip(df["name"], df["is_fulltime"])
         }
         return fulltime_dict
 
+    @_cached("weights")
     def read_weights(self, sheet_name) -> Dict[str, float]:
-        df = pd.read_excel(self.path, sheet_name=sheet_name, header=None)
+        df = self._workbook().parse(sheet_name, header=None)
         df.columns = ["name", "weight"]
         weights_dict = {name: weight for name, weight in zip(df["name"], df["weight"])}
         return weights_dict
 
+    @_cached("number_of_needed_employees")
     def read_number_of_needed_employees(self, sheet_name) -> Dict[str, int]:
         df = self.read(sheet_name)
         # 1列目が曜日, 一行目が役職
@@ -0,0 +1,211 @@
+# ExcelReader の読み込み結果をディスクにキャッシュします。
+import hashlib
+import logging
+import os
+import pickle
+import posixpath
+import re
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from xml.etree import ElementTree
+
+logger = logging.getLogger("shift_scheduler")
+
+# 読み込み結果の形式を変えたときに上げる (古いキャッシュを使わないため)
+CACHE_VERSION = 1
+
+_NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+# セルの値が入っている部分
+_SHEET_DATA = re.compile(
+    rb"<(?:\w+:)?sheetData\b(?:[^>]*/>|.*?</(?:\w+:)?sheetData>)", re.S
+)
+# 共有文字列を参照するセル <c ... t="s"><v>番号</v>
+_SHARED_STRING_CELL = re.compile(rb'(<c\b[^>]*\bt="s"[^>]*>)\s*<v>(\d+)</v>')
+# セルの書式の番号 (styles.xml の作り直しで変わるため, 表示形式に置き換える)
+_STYLE_ATTRIBUTE = re.compile(rb'\ss="(\d+)"')
+
+
+def _shared_strings(book: zipfile.ZipFile) -> list:
+    try:
+        root = ElementTree.fromstring(book.read("xl/sharedStrings.xml"))
+    except KeyError:
+        return []
+    return [
+        "".join(t.text or "" for t in si.iter(f"{_NS_MAIN}t")).encode("utf-8")
+        for si in root.iter(f"{_NS_MAIN}si")
+    ]
+
+
+def _number_formats(book: zipfile.ZipFile) -> list:
+    """セルの書式の番号ごとの表示形式 (組み込みの形式は番号) を返す"""
+    try:
+        root = ElementTree.fromstring(book.read("xl/styles.xml"))
+    except KeyError:
+        return []
+    custom = {
+        fmt.get("numFmtId"): fmt.get("formatCode", "")
+        for fmt in root.iter(f"{_NS_MAIN}numFmt")
+    }
+    cell_xfs = root.find(f"{_NS_MAIN}cellXfs")
+    if cell_xfs is None:
+        return []
+    formats = []
+    for xf in cell_xfs.iter(f"{_NS_MAIN}xf"):
+        fmt_id = xf.get("numFmtId", "0")
+        formats.append(custom.get(fmt_id, f"builtin:{fmt_id}").encode("utf-8"))
+    return formats
+
+
+def _sheet_content(xml: bytes, shared: list, formats: list) -> bytes:
+    """
+    シートの XML から値に関係する部分だけを取り出す。
+    選択セルや書式だけの変更ではハッシュが変わらないようにする。
+    ただし表示形式 (日付か数値か) は読み込んだ値の型を変えるため, 書式の番号を
+    表示形式に置き換えて残す。
+    """
+    match = _SHEET_DATA.search(xml)
+    data = match.group(0) if match else xml
+
+    def resolve(cell):
+        return cell.group(1) + b"<v>" + shared[int(cell.group(2))] + b"</v>"
+
+    def number_format(style):
+        return b' numFmt="' + formats[int(style.group(1))] + b'"'
+
+    # 文字列セルは sharedStrings.xml の番号で保存されている。
+    # 番号は他のシートの編集でも変わるため, 文字列に置き換える
+    data = _SHARED_STRING_CELL.sub(resolve, data)
+    # 書式の番号のないセルは 0 番の書式を使う
+    default = formats[0] if formats else b""
+    return b"default:" + default + b"\n" + _STYLE_ATTRIBUTE.sub(number_format, data)
+
+
+def _sheet_parts(book: zipfile.ZipFile) -> Dict[str, str]:
+    """xlsx 内のシート名とシートの XML ファイルの対応を返す"""
+    rels = ElementTree.fromstring(book.read("xl/_rels/workbook.xml.rels"))
+    targets = {
+        rel.get("Id"): rel.get("Target")
+        for rel in rels.iter(f"{_NS_PKG_REL}Relationship")
+    }
+    workbook = ElementTree.fromstring(book.read("xl/workbook.xml"))
+    parts = {}
+    for sheet in workbook.iter(f"{_NS_MAIN}sheet"):
+        target = targets[sheet.get(f"{_NS_REL}id")]
+        # Target は xl/ からの相対パス, または / から始まる絶対パス
+        if target.startswith("/"):
+            part = target.lstrip("/")
+        else:
+            part = posixpath.normpath(posixpath.join("xl", target))
+        parts[sheet.get("name")] = part
+    return parts
+
+
+class ParseCache:
+    """
+    シートの内容のハッシュをキーに, 読み込み結果を pickle で保存するキャッシュ。
+
+    キーはシートごとに計算するので, 希望シフトのシートだけを編集した場合でも
+    割り当て・社員リストなどのシートはキャッシュから読み込める。
+    キャッシュの合計サイズが max_bytes を超えると, 最後に使われてから
+    最も時間が経ったものから削除する。
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 64 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # ファイルごとの (更新時刻, サイズ, {シート名: ハッシュ})
+        self._digests: Dict[str, Tuple[int, int, Dict[Optional[str], str]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _file_digests(self, excel_path: str) -> Dict[Optional[str], str]:
+        key = os.path.abspath(excel_path)
+        stat = os.stat(excel_path)
+        cached = self._digests.get(key)
+        # ファイルが更新されていなければ前回計算したハッシュを使う
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+
+        digests = {}
+        try:
+            with zipfile.ZipFile(excel_path) as book:
+                shared = _shared_strings(book)
+                formats = _number_formats(book)
+                for name, part in _sheet_parts(book).items():
+                    content = _sheet_content(book.read(part), shared, formats)
+                    digests[name] = hashlib.sha256(content).hexdigest()
+        except (zipfile.BadZipFile, KeyError, IndexError, ElementTree.ParseError):
+            # xlsx として解釈できない場合はファイル全体のハッシュを使う
+            logger.debug(f"Falling back to the whole-file hash: {excel_path}")
+            with open(excel_path, "rb") as f:
+                digests = {None: hashlib.sha256(f.read()).hexdigest()}
+
+        self._digests[key] = (stat.st_mtime_ns, stat.st_size, digests)
+        return digests
+
+    def key(self, excel_path: str, sheet_name: str, kind: str) -> Optional[str]:
+        """読み込み結果のキャッシュキーを返す (シートが見つからない場合は None)"""
+        digests = self._file_digests(excel_path)
+        # キー None はファイル全体のハッシュ
+        digest = digests.get(sheet_name, digests.get(None))
+        if digest is None:
+            return None
+        source = f"{CACHE_VERSION}:{kind}:{sheet_name}:{digest}"
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pkl"
+
+    def get(self, key: str) -> Any:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError) as e:
+            logger.warning(f"Discarding broken cache entry {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+        # 最終使用時刻を更新 (削除の順番に使う)
+        os.utime(path)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any):
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        entries = [(p.stat(), p) for p in self.cache_dir.glob("*.pkl")]
+        total = sum(stat.st_size for stat, _ in entries)
+        for stat, path in sorted(entries, key=lambda entry: entry[0].st_mtime):
+            if total <= self.max_bytes:
+                break
+            logger.debug(f"Evicting cache entry {path.name}")
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+
+    def invalidate(self, excel_path: Optional[str] = None):
+        """
+        ファイルのハッシュを計算し直すようにする。
+        excel_path を省略した場合はキャッシュを全て削除する。
+        """
+        if excel_path is not None:
+            self._digests.pop(os.path.abspath(excel_path), None)
+            return
+        self._digests.clear()
+        for path in self.cache_dir.glob("*.pkl"):
+            path.unlink(missing_ok=True)
@@ -1,15 +1,27 @@
+import itertools
 import logging
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Tuple
 
 import xlsxwriter
+from xlsxwriter.format import Format
 
 logger = logging.getLogger("shift_scheduler")
 
+# 制限時間・目標ギャップで打ち切った暫定解 (最適性未証明) の行に付ける印
+ANYTIME_MARK = "（暫定）"
+# 解がない日の原因 (満たせない制約と従業員) を書き込むシート名
+DIAGNOSIS_SHEET = "診断"
+
 
 class ExcelWriter:
     def __init__(
-        self, path: str, sheet_name: str, weights: Dict[str, float], fulltime: List[str]
+        self,
+        path: str,
+        sheet_name: str,
+        weights: Dict[str, float],
+        fulltime: List[str],
+        constant_memory: bool = True,
     ):
         """
         ExcelWriterを初期化します。
@@ -17,18 +29,24 @@ class ExcelWriter:
         Args:
             path (str): 保存するExcelファイルのパス。
             sheet_name (str): シート名。
+            constant_memory (bool): 行を書き込むたびにディスクへ書き出し,
+                メモリ使用量を行数によらず一定に保つ (行の順番にしか書き込めない)。
         """
         self.path = path
         self.sheet_name = sheet_name
         self.weights = weights
         self.fulltime = fulltime
+        self.constant_memory = constant_memory
+        # 文字色ごとのフォーマット (ワークブックごとに1つずつ作成して使い回す)
+        self._formats: Dict[str, Format] = {}
 
-    def write_schedule(self, schedule_list: List[Tuple[str, Dict[str, List[str]]]]):
+    def write_schedule(self, schedule_list: Iterable[Tuple[str, Dict[str, List[str]]]]):
         """
         スケジュールをExcelファイルに書き込みます。
 
         Args:
-            schedule_list (List[Tuple[str, Dict[str, List[str]]]]): スケジュールのリスト。
+            schedule_list (Iterable[Tuple[str, Dict[str, List[str]]]]): スケジュールの
+                リストまたはジェネレータ。1行ずつ受け取りながら書き込む。
                 フォーマット: [(day_index, {role: [worker1, worker2, ...]})]
         """
         # if not self._confirm_overwrite():
@@ -77,10 +95,7 @@ class ExcelWriter:
             col_idx (int): 列インデックス。
             workers (List[str]): 従業員のリスト。
         """
-        # セルのフォーマットを設定
-        red_fmt = workbook.add_format({"color": "red"})
-        green_fmt = workbook.add_format({"color": "green"})
-        black_fmt = workbook.add_format({"color": "black"})
+        black_fmt = self._font_format(workbook, "black")
 
         # 重み順に並び替え
         workers = sorted(workers, key=lambda x: self.weights.get(x, 0), reverse=True)
@@ -88,15 +103,8 @@ class ExcelWriter:
         # セルに書き込むためのリストを作成
         rich_text = []
         for idx, worker in enumerate(workers):
-            if "不足" in worker or "未割当" in worker:
-                rich_text.append(red_fmt)
-                rich_text.append(worker)
-            elif self.fulltime.get(worker, False):
-                rich_text.append(green_fmt)
-                rich_text.append(worker)
-            else:
-                rich_text.append(black_fmt)
-                rich_text.append(worker)
+            rich_text.append(self._font_format(workbook, self._worker_color(worker)))
+            rich_text.append(worker)
             # 最後の要素以外にはカンマとスペースを追加
             if idx < len(workers) - 1:
                 rich_text.append(black_fmt)
@@ -119,41 +127,90 @@ class ExcelWriter:
             workers (List[str]): 従業員のリスト。
         """
         worker = workers[0]
+        cell_format = self._font_format(workbook, self._worker_color(worker))
+        worksheet.write(row_idx, col_idx, worker, cell_format)
 
-        cell_format = workbook.add_format()
-
+    def _worker_color(self, worker: str) -> str:
+        """
+        従業員名の文字色を返します。
+        不足・未割当は赤, フルタイムは緑, それ以外は黒。
+        """
         if "不足" in worker or "未割当" in worker:
-            cell_format.set_font_color("red")
-        elif self.fulltime.get(worker, False):
-            cell_format.set_font_color("green")
-        else:
-            cell_format.set_font_color("black")
+            return "red"
+        if self.fulltime.get(worker, False):
+            return "green"
+        return "black"
 
-        worksheet.write(row_idx, col_idx, worker, cell_format)
+    def _font_format(self, workbook, color: str) -> Format:
+        """
+        文字色のフォーマットを返します。
+        セルごとに add_format すると同じスタイルが大量に登録され,
+        保存が遅くなり styles.xml も肥大化するため, 色ごとに1つだけ作成します。
+
+        Args:
+            workbook (xlsxwriter.Workbook): ワークブック。
+            color (str): 文字色。
+        """
+        cell_format = self._formats.get(color)
+        if cell_format is None:
+            cell_format = workbook.add_format({"color": color})
+            self._formats[color] = cell_format
+        return cell_format
 
     def _create_schedule_excel(
-        self, schedule_list: List[Tuple[str, Dict[str, List[str]]]]
+        self, schedule_list: Iterable[Tuple[str, Dict[str, List[str]]]]
     ):
         """
         指定されたスケジュールを使用してExcelファイルを作成し保存します。
 
         Args:
-            schedule_list (List[Tuple[str, Dict[str, List[str]]]]): スケジュールのリスト。
+            schedule_list (Iterable[Tuple[str, Dict[str, List[str]]]]): スケジュールの
+                リストまたはジェネレータ。
         """
         # ワークブックとワークシートを作成
-        workbook = xlsxwriter.Workbook(self.path)
+        workbook = xlsxwriter.Workbook(
+            self.path, {"constant_memory": self.constant_memory}
+        )
         worksheet = workbook.add_worksheet(self.sheet_name)
+        # フォーマットはワークブックごとに登録するため, 前回のものは使わない
+        self._formats = {}
+
+        # 役職の列は最初の行から決める (ジェネレータでも最初の1行だけを先に読む)
+        rows = iter(schedule_list)
+        first = next(rows, None)
+        roles = list(first[1].keys()) if first is not None else []
 
         # ヘッダーを書き込む
         worksheet.write(0, 0, "Day")
-        roles = list(schedule_list[0][1].keys())
-
         for col, role in enumerate(roles, start=1):
             worksheet.write(0, col, role)
 
         # スケジュールデータを書き込む
-        for row_idx, (day_index, roles_dict) in enumerate(schedule_list, start=1):
-            worksheet.write(row_idx, 0, day_index)  # 日付を記入
+        # constant_memory では書き終えた行は変更できないため, 行の順番に書き込む
+        if first is not None:
+            rows = itertools.chain([first], rows)
+        num_anytime = 0
+        # 解がない日の (日付, 満たせない制約のリスト)
+        diagnoses = []
+        for row_idx, (day_index, roles_dict) in enumerate(rows, start=1):
+            diagnosis = getattr(roles_dict, "diagnosis", None)
+            if diagnosis is not None:
+                # 解がない日は日付を赤くし, 原因を診断のシートに書き込む
+                diagnoses.append((day_index, diagnosis))
+                worksheet.write(
+                    row_idx, 0, day_index, self._font_format(workbook, "red")
+                )
+            elif getattr(roles_dict, "anytime", False):
+                # 暫定解は日付に印を付けて目立たせる
+                num_anytime += 1
+                worksheet.write(
+                    row_idx,
+                    0,
+                    f"{day_index}{ANYTIME_MARK}",
+                    self._font_format(workbook, "orange"),
+                )
+            else:
+                worksheet.write(row_idx, 0, day_index)  # 日付を記入
 
             for col_idx, role in enumerate(roles, start=1):
                 workers = roles_dict.get(role, [])
@@ -168,5 +225,36 @@ class ExcelWriter:
                 else:
                     pass
 
+        if num_anytime:
+            logger.warning(
+                f"{num_anytime} 行は制限時間・目標ギャップで打ち切った暫定解です"
+                f" (日付に{ANYTIME_MARK}を付けています)。"
+            )
+
+        if diagnoses:
+            self._write_diagnosis(workbook, diagnoses)
+
         # ファイルを保存
         workbook.close()
+
+    def _write_diagnosis(self, workbook: xlsxwriter.Workbook, diagnoses: List[Tuple]):
+        """解がない日ごとに, 満たせない制約とその説明, 関係する従業員を書き込みます。"""
+        worksheet = workbook.add_worksheet(DIAGNOSIS_SHEET)
+        for col, header in enumerate(["Day", "制約", "内容", "対象の従業員"]):
+            worksheet.write(0, col, header)
+        row_idx = 1
+        for day_index, conflicts in diagnoses:
+            if not conflicts:
+                worksheet.write(row_idx, 0, day_index)
+                worksheet.write(row_idx, 2, "原因を特定できませんでした")
+                row_idx += 1
+            for conflict in conflicts:
+                worksheet.write(row_idx, 0, day_index)
+                worksheet.write(row_idx, 1, conflict.constraint)
+                worksheet.write(row_idx, 2, conflict.message)
+                worksheet.write(row_idx, 3, ", ".join(conflict.staff))
+                row_idx += 1
+        logger.warning(
+            f"{len(diagnoses)} 行は解がありません"
+            f" (原因を「{DIAGNOSIS_SHEET}」シートに書き込みました)。"
+        )
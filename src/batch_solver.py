@@ -0,0 +1,420 @@
+# 複数のワークブック・シートのシフトを1つのプロセスからまとめて解きます。
+import argparse
+import csv
+import glob
+import logging
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from MILP.milp_maker import Schedule
+from MILP.solution_store import SolutionStore
+from MILP.solver_backend import SOLVER_NAMES
+from ReadExcel.excel_reader import ExcelReader
+from ReadExcel.parse_cache import ParseCache
+from schedule_solver import (
+    MASTER_SHEETS,
+    read_master_data,
+    solve_schedule,
+    write_schedule_to_excel,
+)
+from utils.logger import setup_logger, setup_worker_logger, start_queue_listener
+
+logger = logging.getLogger("shift_scheduler")
+
+
+@dataclass
+class BatchResult:
+    """1つのシートを解いた結果 (要約の表の1行)"""
+
+    excel_path: str
+    sheet_name: str
+    read_seconds: float = 0.0
+    # マスタの読み込み時間 (ワークブックの最初に解くシートにだけ記録する)
+    master_seconds: float = 0.0
+    solve_seconds: float = 0.0
+    days: int = 0
+    infeasible_days: List[str] = field(default_factory=list)
+    anytime_days: List[str] = field(default_factory=list)
+    output_path: Optional[str] = None
+    error: Optional[str] = None
+
+
+def setup_parser() -> argparse.ArgumentParser:
+    """引数パーサーを作成して設定する関数"""
+    parser = argparse.ArgumentParser(
+        description="複数のワークブック・シートのシフトスケジュールをまとめて作成します。"
+    )
+    parser.add_argument(
+        "workbooks",
+        help="Excelファイルのパス (glob のパターンも可)",
+        nargs="*",
+    )
+    parser.add_argument(
+        "--sheets",
+        help="解くシート名 (省略した場合はマスタ以外の全てのシート)",
+        nargs="+",
+        default=None,
+    )
+    parser.add_argument(
+        "-m",
+        "--manifest",
+        help="excel_path, sheet_name の列を持つ CSV ファイル",
+        default=None,
+    )
+    parser.add_argument("-n", "--num_trials", help="試行回数", type=int, default=1)
+    parser.add_argument("-l", "--loglevel", help="ログレベル", default="INFO")
+    parser.add_argument(
+        "-o",
+        "--output_dir",
+        help="出力ディレクトリ (ワークブックごとにサブディレクトリを作る)",
+        default="output",
+    )
+    parser.add_argument(
+        "-j", "--jobs", help="並列に解くシート数 (プロセス数)", type=int, default=1
+    )
+    parser.add_argument("--seed", help="乱数シード", type=int, default=0)
+    parser.add_argument(
+        "--trial_mode",
+        help="試行の方法 (enumerate: 異なる解を列挙, seed: 乱数シードのみ変更)",
+        choices=["enumerate", "seed"],
+        default="enumerate",
+    )
+    parser.add_argument(
+        "--solver",
+        help="ソルバー (auto: highspy があれば HiGHS, なければ CBC)",
+        choices=SOLVER_NAMES,
+        default="auto",
+    )
+    parser.add_argument(
+        "--time_limit", help="1日あたりの制限時間 (秒)", type=float, default=None
+    )
+    parser.add_argument(
+        "--gap", help="目標の相対ギャップ (例: 0.01)", type=float, default=None
+    )
+    parser.add_argument(
+        "--warm_start",
+        help="前回の解 (なければ似た日の解) を初期解としてソルバーに渡す",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--incremental",
+        help="入力が前回と同じ日は前回の解を再利用する",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        help="読み込み結果のキャッシュを保存するディレクトリ",
+        default=None,
+    )
+    parser.add_argument(
+        "--cache_max_mb", help="キャッシュの最大サイズ (MB)", type=int, default=64
+    )
+    return parser
+
+
+def read_manifest(path: str) -> List[Tuple[str, str]]:
+    """マニフェスト (excel_path, sheet_name の列を持つ CSV) を読み込む関数"""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return [
+            (row["excel_path"].strip(), row["sheet_name"].strip())
+            for row in csv.DictReader(f)
+            if row.get("excel_path")
+        ]
+
+
+def expand_workbooks(patterns: Iterable[str]) -> List[str]:
+    """glob のパターンを展開し, 重複を除いたワークブックのパスを返す関数"""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            logger.warning(f"一致するファイルがありません: {pattern}")
+        paths.extend(matches)
+    return list(dict.fromkeys(paths))
+
+
+def group_targets(
+    workbooks: List[str],
+    sheets: Optional[List[str]],
+    manifest: List[Tuple[str, str]],
+) -> Dict[str, Optional[List[str]]]:
+    """
+    ワークブックごとに解くシートをまとめる関数
+    シートが None のワークブックは, マスタ以外の全てのシートを解く。
+    """
+    targets: Dict[str, Optional[List[str]]] = {}
+    for path in workbooks:
+        targets[path] = list(sheets) if sheets else None
+    for path, sheet_name in manifest:
+        listed = targets.setdefault(path, [])
+        if listed is not None and sheet_name not in listed:
+            listed.append(sheet_name)
+    return targets
+
+
+def read_workbook(
+    excel_path: str, sheets: Optional[List[str]], cache: Optional[ParseCache]
+) -> Iterator[Tuple[str, Dict, float, float]]:
+    """
+    ワークブックを一度だけ開き, マスタを共有して各シートの
+    (シート名, データ, 読み込み時間, マスタの読み込み時間) を返すジェネレータ
+    マスタの読み込み時間は最初に返すシートにだけ入れ, 以降のシートは 0 にする。
+    excel_path がディレクトリの場合, convert_format.py で書き出した Parquet の入力を読み込む。
+    """
+    if Path(excel_path).is_dir():
+        yield from _read_parquet_inputs(excel_path, sheets)
+        return
+    with ExcelReader(excel_path, cache=cache) as reader:
+        start = time.perf_counter()
+        master = read_master_data(reader)
+        master_seconds = time.perf_counter() - start
+        # シートを指定しない場合, マスタ以外で希望シフトの形式のシートを全て解く
+        detect = sheets is None
+        if detect:
+            sheets = [s for s in reader.sheet_names() if s not in MASTER_SHEETS]
+        logger.info(f"{excel_path}: {len(sheets)} シートを解きます。")
+        for sheet_name in sheets:
+            start = time.perf_counter()
+            try:
+                availabilities = reader.read_availabilities(sheet_name)
+            except Exception:
+                if not detect:
+                    raise
+                availabilities = {}
+            seconds = time.perf_counter() - start
+            if detect and not _is_availability_sheet(availabilities, master):
+                logger.info(
+                    f"{excel_path} [{sheet_name}]: 希望シフトのシートではありません。"
+                )
+                continue
+            data = {"availabilities": availabilities, **master}
+            yield sheet_name, data, seconds, master_seconds
+            master_seconds = 0.0
+
+
+def _read_parquet_inputs(
+    path: str, sheets: Optional[List[str]]
+) -> Iterator[Tuple[str, Dict, float, float]]:
+    # pyarrow は任意の依存なので, 使うときだけインポートする
+    from Parquet.parquet_io import read_inputs, read_master, sheet_names
+
+    start = time.perf_counter()
+    master = read_master(path)
+    master_seconds = time.perf_counter() - start
+    sheets = sheet_names(path) if sheets is None else sheets
+    logger.info(f"{path}: {len(sheets)} シートを解きます。")
+    for sheet_name in sheets:
+        start = time.perf_counter()
+        data = read_inputs(path, sheet_name, master=master)
+        seconds = time.perf_counter() - start
+        yield sheet_name, data, seconds, master_seconds
+        master_seconds = 0.0
+
+
+def _is_availability_sheet(availabilities: Dict, master: Dict) -> bool:
+    # 希望シフトのシートは, 全ての行が割り当てのシートの従業員になっている
+    return bool(availabilities) and all(
+        isinstance(e, str) and e in master["capabilities"] for e in availabilities
+    )
+
+
+def _init_batch_worker(log_level: int, log_queue) -> None:
+    """ワーカープロセスの初期化関数"""
+    setup_worker_logger("shift_scheduler", log_level, log_queue)
+
+
+def _watch_rows(
+    rows: Iterable[Tuple[str, Schedule]], result: BatchResult
+) -> Iterator[Tuple[str, Schedule]]:
+    """書き込む行をそのまま返しつつ, 解けなかった日と暫定解の日を数えるジェネレータ"""
+    days = set()
+    for key, schedule in rows:
+        day = key.rsplit(":", 1)[0]
+        if day not in days:
+            days.add(day)
+            if schedule.unassigned:
+                result.infeasible_days.append(day)
+            if schedule.anytime:
+                result.anytime_days.append(day)
+        yield key, schedule
+    result.days = len(days)
+
+
+def solve_sheet(
+    excel_path: str,
+    sheet_name: str,
+    data: Dict,
+    read_seconds: float,
+    master_seconds: float,
+    options: Dict,
+) -> BatchResult:
+    """1つのシートを解いて書き込み, その結果を返す関数 (ワーカープロセスで実行する)"""
+    result = BatchResult(
+        excel_path,
+        sheet_name,
+        read_seconds=read_seconds,
+        master_seconds=master_seconds,
+    )
+    # 同じシート名のワークブックが複数あっても出力が重ならないようにする
+    output_dir = Path(options["output_dir"]) / Path(excel_path).stem
+    output_dir.mkdir(parents=True, exist_ok=True)
+    store = None
+    if options["incremental"]:
+        store = SolutionStore(output_dir / f"{sheet_name}_schedule.state.json")
+
+    start = time.perf_counter()
+    try:
+        rows = solve_schedule(
+            data,
+            options["num_trials"],
+            seed=options["seed"],
+            maker_options=options["maker_options"],
+            store=store,
+        )
+        output_path = write_schedule_to_excel(
+            excel_path, sheet_name, _watch_rows(rows, result), data, output_dir
+        )
+        result.output_path = str(output_path)
+    except Exception as e:
+        logger.exception(f"{excel_path} [{sheet_name}] の求解に失敗しました。")
+        result.error = f"{type(e).__name__}: {e}"
+    result.solve_seconds = time.perf_counter() - start
+    return result
+
+
+def _read_targets(
+    targets: Dict[str, Optional[List[str]]], cache: Optional[ParseCache]
+) -> Iterator:
+    """
+    各シートの (ワークブック, シート名, データ, 読み込み時間, マスタの読み込み時間)
+    を返すジェネレータ
+    読み込めなかったワークブックは, エラーを記録した BatchResult を返す。
+    """
+    for excel_path, sheets in targets.items():
+        try:
+            for item in read_workbook(excel_path, sheets, cache):
+                yield (excel_path, *item)
+        except Exception as e:
+            logger.exception(f"{excel_path} の読み込みに失敗しました。")
+            yield BatchResult(excel_path, "-", error=f"{type(e).__name__}: {e}")
+
+
+def run_batch(
+    targets: Dict[str, Optional[List[str]]],
+    options: Dict,
+    num_jobs: int = 1,
+    cache: Optional[ParseCache] = None,
+) -> List[BatchResult]:
+    """
+    全てのシートを解き, 結果を入力の順番で返す関数
+    読み込みはメインプロセスでワークブックごとに行い, 求解と書き込みを num_jobs
+    プロセスで並列に行う。
+    """
+    if num_jobs <= 1:
+        return [
+            item if isinstance(item, BatchResult) else solve_sheet(*item, options)
+            for item in _read_targets(targets, cache)
+        ]
+
+    log_queue = multiprocessing.Queue()
+    listener = start_queue_listener("shift_scheduler", log_queue)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=num_jobs,
+            initializer=_init_batch_worker,
+            initargs=(logger.getEffectiveLevel(), log_queue),
+        ) as executor:
+            # 読み込みながら投入し, 先に読み込んだシートから解き始める
+            slots = [
+                (
+                    item
+                    if isinstance(item, BatchResult)
+                    else executor.submit(solve_sheet, *item, options)
+                )
+                for item in _read_targets(targets, cache)
+            ]
+            return [
+                slot if isinstance(slot, BatchResult) else slot.result()
+                for slot in slots
+            ]
+    finally:
+        listener.stop()
+
+
+def format_summary(results: List[BatchResult]) -> str:
+    """シートごとの時間と解けなかった日の要約の表を返す関数"""
+    header = (
+        f"{'workbook':<24} {'sheet':<10} {'days':>5} {'read_s':>8} {'solve_s':>8}"
+        f" {'anytime':>7}  infeasible"
+    )
+    lines = [header, "-" * len(header)]
+    for r in results:
+        if r.master_seconds:
+            # マスタの読み込みはシートの行とは別の行にする
+            lines.append(
+                f"{Path(r.excel_path).name:<24} {'(マスタ)':<10} {'':>5}"
+                f" {r.master_seconds:>8.2f}"
+            )
+        if r.error is not None:
+            status = f"ERROR {r.error}"
+        else:
+            status = ", ".join(r.infeasible_days) or "-"
+        lines.append(
+            f"{Path(r.excel_path).name:<24} {r.sheet_name:<10} {r.days:>5}"
+            f" {r.read_seconds:>8.2f} {r.solve_seconds:>8.2f}"
+            f" {len(r.anytime_days):>7}  {status}"
+        )
+    lines.append("-" * len(header))
+    lines.append(
+        f"{len(results)} シート, 合計 "
+        f"読み込み {sum(r.read_seconds + r.master_seconds for r in results):.2f}s, "
+        f"求解・書き込み {sum(r.solve_seconds for r in results):.2f}s, "
+        f"解けなかった日 {sum(len(r.infeasible_days) for r in results)} 日, "
+        f"失敗 {sum(r.error is not None for r in results)} シート"
+    )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # Windows で実行ファイル化した場合にワーカープロセスを正しく起動するため
+    multiprocessing.freeze_support()
+
+    args = setup_parser().parse_args()
+    logger = setup_logger("shift_scheduler", args.loglevel)
+
+    manifest = read_manifest(args.manifest) if args.manifest else []
+    targets = group_targets(expand_workbooks(args.workbooks), args.sheets, manifest)
+    if not targets:
+        setup_parser().error("ワークブックまたは --manifest を指定してください。")
+
+    cache = None
+    if args.cache_dir:
+        cache = ParseCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+
+    start = time.perf_counter()
+    results = run_batch(
+        targets,
+        {
+            "output_dir": args.output_dir,
+            "num_trials": args.num_trials,
+            "seed": args.seed,
+            "incremental": args.incremental,
+            "maker_options": {
+                "trial_mode": args.trial_mode,
+                "solver": args.solver,
+                "time_limit": args.time_limit,
+                "gap": args.gap,
+                "warm_start": args.warm_start,
+            },
+        },
+        num_jobs=args.jobs,
+        cache=cache,
+    )
+    print(format_summary(results))
+    print(f"経過時間: {time.perf_counter() - start:.2f}s")
+    sys.exit(1 if any(r.error is not None for r in results) else 0)
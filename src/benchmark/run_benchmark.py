@@ -0,0 +1,203 @@
+# 合成したシフト表で, 読み込みから書き込みまでの各段階の時間を計測します。
+import argparse
+import datetime
+import json
+import logging
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+if str(Path(__file__).parents[1]) not in sys.path:
+    sys.path.append(str(Path(__file__).parents[1]))
+import pulp
+
+from benchmark.synthetic_roster import generate_workbook
+from MILP.milp_maker import MILPMaker
+from MILP.solver_backend import SOLVER_NAMES
+from schedule_solver import read_excel_data, solve_schedule, write_schedule_to_excel
+from utils.logger import setup_logger
+from utils.profiler import SolveProfiler
+
+logger = logging.getLogger("shift_scheduler")
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(
+    params: Dict, num_trials: int, num_jobs: int, solver: str, work_dir: str
+) -> Dict:
+    """
+    ベンチマークを実行し, 結果を辞書で返す。
+
+    Args:
+        params (Dict): generate_workbook に渡す引数。
+        num_trials (int): solve_schedule の試行回数。
+        num_jobs (int): solve_schedule の並列数。
+        solver (str): ソルバー名。
+        work_dir (str): 生成したシフト表と出力を置くディレクトリ。
+    """
+    excel_path = str(Path(work_dir) / "synthetic.xlsx")
+    sheet_name = params.get("sheet_name", "12月")
+
+    start = time.perf_counter()
+    generate_workbook(excel_path, **params)
+    generate_time = time.perf_counter() - start
+
+    # 読み込み
+    start = time.perf_counter()
+    data = read_excel_data(excel_path, sheet_name)
+    read_time = time.perf_counter() - start
+
+    # モデルの作成 (日によらない部分)
+    start = time.perf_counter()
+    maker = MILPMaker(
+        data["availabilities"],
+        data["capabilities"],
+        data["fulltime"],
+        data["weights"],
+        data["num_required"],
+        solver=solver,
+        profile=True,
+    )
+    template_time = time.perf_counter() - start
+
+    # 日ごとの モデル作成 / 求解 / 解の抽出 (試行は1回)
+    for day in list(data["availabilities"].values())[0]:
+        maker.solve_for_day(day, num_trials=1, seed=0)
+    days = maker.profiler.pop_records()
+
+    # 実際の処理と同じ条件での求解 (試行回数・並列数を含む)
+    profiler = SolveProfiler()
+    start = time.perf_counter()
+    # 書き込みと分けて計測するため, 全ての行を先に求める
+    schedule_list = list(
+        solve_schedule(
+            data,
+            num_trials,
+            num_jobs=num_jobs,
+            maker_options={"solver": solver},
+            profiler=profiler,
+        )
+    )
+    solve_schedule_time = time.perf_counter() - start
+
+    # 書き込み
+    start = time.perf_counter()
+    write_schedule_to_excel(excel_path, sheet_name, schedule_list, data, work_dir)
+    write_time = time.perf_counter() - start
+
+    return {
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pulp": pulp.__version__,
+            "solver": maker.solver.name,
+        },
+        "params": {
+            **params,
+            "num_trials": num_trials,
+            "num_jobs": num_jobs,
+        },
+        "model": {
+            "variables": len(maker.variables),
+            "rows": len(maker.problem.constraints),
+        },
+        "stages": {
+            "generate": generate_time,
+            "read": read_time,
+            "build": template_time + sum(d["build_s"] for d in days),
+            "solve": sum(d["solve_s"] for d in days),
+            "extract": sum(d["extract_s"] for d in days),
+            "solve_schedule": solve_schedule_time,
+            "write": write_time,
+        },
+        "days": days,
+        "trials": profiler.records,
+    }
+
+
+def print_summary(result: Dict, baseline: Optional[Dict] = None):
+    """各段階の時間を表示する (baseline を指定した場合は比較も表示する)"""
+    header = f"{'stage':<16}{'seconds':>10}"
+    if baseline:
+        header += f"{'baseline':>10}{'ratio':>8}"
+    print(header)
+    for stage, seconds in result["stages"].items():
+        line = f"{stage:<16}{seconds:>10.3f}"
+        if baseline and stage in baseline["stages"]:
+            before = baseline["stages"][stage]
+            ratio = seconds / before if before else float("nan")
+            line += f"{before:>10.3f}{ratio:>8.2f}"
+        print(line)
+
+
+def setup_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="MILP の各段階の時間を計測します。")
+    parser.add_argument("--employees", type=int, default=200)
+    parser.add_argument("--roles", type=int, default=10)
+    parser.add_argument("--days", type=int, default=26)
+    parser.add_argument("--availability_density", type=float, default=0.8)
+    parser.add_argument("--capability_density", type=float, default=0.6)
+    parser.add_argument("--fulltime_ratio", type=float, default=0.2)
+    parser.add_argument("--shortage_roles", type=float, default=0.5)
+    parser.add_argument("--no_medical", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-n", "--num_trials", type=int, default=1)
+    parser.add_argument("-j", "--jobs", type=int, default=1)
+    parser.add_argument("--solver", choices=SOLVER_NAMES, default="auto")
+    parser.add_argument(
+        "-o", "--output", help="結果を保存する JSON ファイル", default=None
+    )
+    parser.add_argument("--baseline", help="比較する過去の結果の JSON ファイル")
+    parser.add_argument("-l", "--loglevel", default="WARNING")
+    return parser
+
+
+if __name__ == "__main__":
+    args = setup_parser().parse_args()
+    setup_logger("shift_scheduler", args.loglevel)
+
+    params = {
+        "num_employees": args.employees,
+        "num_roles": args.roles,
+        "num_days": args.days,
+        "availability_density": args.availability_density,
+        "capability_density": args.capability_density,
+        "fulltime_ratio": args.fulltime_ratio,
+        "shortage_roles": args.shortage_roles,
+        "medical": not args.no_medical,
+        "seed": args.seed,
+    }
+    with tempfile.TemporaryDirectory() as work_dir:
+        result = run_benchmark(
+            params, args.num_trials, args.jobs, args.solver, work_dir
+        )
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_summary(result, baseline)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"結果を保存しました: {args.output}")
@@ -0,0 +1,134 @@
+# 新しいインタプリタでモジュールを読み込む時間を -X importtime で計測します。
+import argparse
+import datetime
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+if str(Path(__file__).parents[1]) not in sys.path:
+    sys.path.append(str(Path(__file__).parents[1]))
+
+from benchmark.run_benchmark import _git_revision
+
+SRC_DIR = Path(__file__).parents[1]
+# run_gui: GUI の起動時に読み込むもの, schedule_solver: 最初の実行で読み込むもの
+DEFAULT_MODULES = ["run_gui", "gui.screen.main_screen", "schedule_solver"]
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """
+    -X importtime の出力を [{"module", "self_us", "cumulative_us", "depth"}] に変換する。
+    depth はインデントの深さ (0 が直接 import したもの)。
+    """
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        records.append(
+            {
+                "module": name.strip(),
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+                "depth": depth,
+            }
+        )
+    return records
+
+
+def measure_import(module: str, repeat: int = 5, top: int = 10) -> Dict:
+    """
+    新しいインタプリタで module を repeat 回読み込み, 起動を含めた時間の中央値と,
+    最後の1回のパッケージごとの読み込み時間 (self の合計) の上位 top 件を返す。
+    """
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR))
+    command = [sys.executable, "-X", "importtime", "-c", f"import {module}"]
+    wall_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        completed = subprocess.run(
+            command, cwd=SRC_DIR, env=env, capture_output=True, text=True
+        )
+        wall_times.append(time.perf_counter() - start)
+        if completed.returncode != 0:
+            error = completed.stderr.strip().splitlines()[-1]
+            return {"module": module, "error": error}
+
+    records = parse_importtime(completed.stderr)
+    by_package: Dict[str, int] = defaultdict(int)
+    for r in records:
+        by_package[r["module"].split(".")[0]] += r["self_us"]
+    own = [r for r in records if r["module"] == module]
+    return {
+        "module": module,
+        "wall_seconds": statistics.median(wall_times),
+        "import_seconds": own[-1]["cumulative_us"] / 1e6 if own else None,
+        "packages": dict(
+            sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+        ),
+    }
+
+
+def run_startup_benchmark(modules: List[str], repeat: int, top: int) -> Dict:
+    return {
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "python": sys.version.split()[0],
+        "results": [measure_import(m, repeat, top) for m in modules],
+    }
+
+
+def print_summary(result: Dict, baseline: Optional[Dict] = None):
+    """モジュールごとの読み込み時間と, 時間のかかるパッケージを表示する"""
+    before = {r["module"]: r for r in (baseline or {}).get("results", [])}
+    for r in result["results"]:
+        if "error" in r:
+            print(f"{r['module']}: 読み込めません ({r['error']})")
+            continue
+        line = f"{r['module']}: 起動を含めて {r['wall_seconds']:.3f}s"
+        if r["import_seconds"] is not None:
+            line += f", import {r['import_seconds']:.3f}s"
+        old = before.get(r["module"])
+        if old and "wall_seconds" in old:
+            line += f" (baseline {old['wall_seconds']:.3f}s)"
+        print(line)
+        for package, us in r["packages"].items():
+            print(f"    {package:<30}{us / 1000:>10.1f} ms")
+
+
+def setup_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="モジュールの読み込み時間 (起動時間) を計測します。"
+    )
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("--top", help="表示するパッケージの数", type=int, default=10)
+    parser.add_argument(
+        "-o", "--output", help="結果を保存する JSON ファイル", default=None
+    )
+    parser.add_argument("--baseline", help="比較する過去の結果の JSON ファイル")
+    return parser
+
+
+if __name__ == "__main__":
+    args = setup_parser().parse_args()
+    result = run_startup_benchmark(args.modules, args.repeat, args.top)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_summary(result, baseline)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"結果を保存しました: {args.output}")
@@ -0,0 +1,197 @@
+# ExcelReader が読み込める形式の, 任意の規模のシフト表を生成します。
+import argparse
+import datetime
+import random
+from typing import List
+
+import xlsxwriter
+
+# sample_data.xlsx と同じ役職 (受付と胃カメラはフルタイムの制約で使う)
+BASE_ROLES = [
+    "受付",
+    "血圧",
+    "採血",
+    "計測",
+    "婦人科",
+    "5F血圧",
+    "5F計測",
+    "5F採血",
+    "外来",
+    "胃カメラ",
+]
+WEEKDAYS = ["月", "火", "水", "木", "金", "土", "日"]
+
+
+def make_roles(num_roles: int) -> List[str]:
+    if num_roles < 2:
+        raise ValueError("num_roles must be at least 2 (受付 and 胃カメラ).")
+    roles = BASE_ROLES[: min(num_roles, len(BASE_ROLES))]
+    if "胃カメラ" not in roles:
+        roles[-1] = "胃カメラ"
+    roles += [f"役職{i}" for i in range(len(roles) + 1, num_roles + 1)]
+    return roles
+
+
+def make_days(num_days: int, year: int = 2024, month: int = 12) -> List[str]:
+    """
+    日曜日を除いた "9日（月）" 形式の日付を num_days 個返す。
+    翌月以降の日付は "1/6日（月）" のように月を付けて区別する。
+    """
+    days = []
+    date = datetime.date(year, month, 1)
+    while len(days) < num_days:
+        weekday = WEEKDAYS[date.weekday()]
+        if weekday != "日":
+            prefix = "" if date.month == month else f"{date.month}/"
+            days.append(f"{prefix}{date.day}日（{weekday}）")
+        date += datetime.timedelta(days=1)
+    return days
+
+
+def generate_workbook(
+    path: str,
+    sheet_name: str = "12月",
+    num_employees: int = 30,
+    num_roles: int = 10,
+    num_days: int = 22,
+    availability_density: float = 0.8,
+    capability_density: float = 0.6,
+    fulltime_ratio: float = 0.2,
+    shortage_roles: float = 0.5,
+    medical: bool = True,
+    seed: int = 0,
+) -> None:
+    """
+    シフト表のワークブックを生成します。
+
+    Args:
+        path (str): 保存するExcelファイルのパス。
+        sheet_name (str): 希望シフトのシート名。
+        num_employees (int): 実在の従業員の人数。
+        num_roles (int): 役職の数。
+        num_days (int): 日数 (日曜日を除く)。
+        availability_density (float): 出勤可能 (o) の割合。
+        capability_density (float): 割り当て可能 (o) の割合。
+        fulltime_ratio (float): フルタイム従業員の割合。
+        shortage_roles (float): "不足" の疑似従業員を置く役職の割合。
+        medical (bool): "メディカル" の疑似従業員を置くかどうか。
+        seed (int): 乱数シード。
+    """
+    rng = random.Random(seed)
+    roles = make_roles(num_roles)
+    days = make_days(num_days)
+
+    employees = [f"職員{i:03d}" for i in range(1, num_employees + 1)]
+    fulltime = {e: rng.random() < fulltime_ratio for e in employees}
+    # フルタイムが1人もいないと必ず実行不可能になるため, 最初の2人はフルタイム
+    for e in employees[:2]:
+        fulltime[e] = True
+
+    capabilities = {}
+    for e in employees:
+        capabilities[e] = {r: rng.random() < capability_density for r in roles}
+        if fulltime[e]:
+            # フルタイムは受付と胃カメラを担当できる
+            capabilities[e]["受付"] = True
+            capabilities[e]["胃カメラ"] = True
+    availabilities = {
+        e: {day: rng.random() < availability_density for day in days} for e in employees
+    }
+    weights = {e: 1 if fulltime[e] else 0 for e in employees}
+
+    # 疑似従業員 (常に出勤可能)
+    pseudo = []
+    if medical:
+        pseudo.append("メディカル")
+        capabilities["メディカル"] = {r: rng.random() < 0.5 for r in roles}
+        weights["メディカル"] = -1
+    for r in roles:
+        if rng.random() < shortage_roles:
+            name = f"{r}不足"
+            pseudo.append(name)
+            capabilities[name] = {r2: r2 == r for r2 in roles}
+            weights[name] = -100
+    for e in pseudo:
+        fulltime[e] = False
+        availabilities[e] = {day: True for day in days}
+
+    names = employees + pseudo
+    num_required = {
+        weekday: {r: 1 if r in ("受付", "婦人科") else rng.randint(1, 4) for r in roles}
+        for weekday in WEEKDAYS[:6]
+    }
+
+    workbook = xlsxwriter.Workbook(path)
+
+    def ox(flag: bool) -> str:
+        return "o" if flag else "x"
+
+    def write_matrix(name, columns, rows, values):
+        worksheet = workbook.add_worksheet(name)
+        for j, column in enumerate(columns, start=1):
+            worksheet.write(0, j, column)
+        for i, row in enumerate(rows, start=1):
+            worksheet.write(i, 0, row)
+            for j, column in enumerate(columns, start=1):
+                worksheet.write(i, j, values[row][column])
+
+    write_matrix(
+        sheet_name,
+        days,
+        names,
+        {e: {day: ox(availabilities[e][day]) for day in days} for e in names},
+    )
+    write_matrix("人数", roles, WEEKDAYS[:6], num_required)
+
+    # 重みと社員リストはヘッダーなし
+    for name, values in (
+        ("重み", weights),
+        ("社員リスト", {e: ox(fulltime[e]) for e in names}),
+    ):
+        worksheet = workbook.add_worksheet(name)
+        for i, e in enumerate(names):
+            worksheet.write(i, 0, e)
+            worksheet.write(i, 1, values[e])
+
+    write_matrix(
+        "割り当て",
+        roles,
+        names,
+        {e: {r: ox(capabilities[e][r]) for r in roles} for e in names},
+    )
+    workbook.close()
+
+
+def setup_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="ベンチマーク用のシフト表を生成します。"
+    )
+    parser.add_argument("path", help="保存するExcelファイルのパス")
+    parser.add_argument("--sheet_name", default="12月")
+    parser.add_argument("--employees", type=int, default=30)
+    parser.add_argument("--roles", type=int, default=10)
+    parser.add_argument("--days", type=int, default=22)
+    parser.add_argument("--availability_density", type=float, default=0.8)
+    parser.add_argument("--capability_density", type=float, default=0.6)
+    parser.add_argument("--fulltime_ratio", type=float, default=0.2)
+    parser.add_argument("--shortage_roles", type=float, default=0.5)
+    parser.add_argument("--no_medical", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+if __name__ == "__main__":
+    args = setup_parser().parse_args()
+    generate_workbook(
+        args.path,
+        sheet_name=args.sheet_name,
+        num_employees=args.employees,
+        num_roles=args.roles,
+        num_days=args.days,
+        availability_density=args.availability_density,
+        capability_density=args.capability_density,
+        fulltime_ratio=args.fulltime_ratio,
+        shortage_roles=args.shortage_roles,
+        medical=not args.no_medical,
+        seed=args.seed,
+    )
@@ -0,0 +1,144 @@
+# 合成したスケジュールを ExcelWriter で書き込み, 時間とファイルサイズを計測します。
+import argparse
+import datetime
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+if str(Path(__file__).parents[1]) not in sys.path:
+    sys.path.append(str(Path(__file__).parents[1]))
+
+from benchmark.run_benchmark import _git_revision
+from benchmark.synthetic_roster import make_days, make_roles
+from WriteExcel.excel_writer import ExcelWriter
+
+
+def make_schedule_rows(
+    num_employees: int,
+    num_roles: int,
+    num_days: int,
+    num_trials: int,
+    seed: int = 0,
+) -> Tuple[Dict[str, float], Dict[str, bool], Iterator]:
+    """
+    書き込み用のスケジュールの行を作るジェネレータと, 重み・社員リストを返す。
+    各役職には 0 - 3 人を割り当て, 1割程度を "不足" にする。
+    """
+    rng = random.Random(seed)
+    roles = make_roles(num_roles)
+    employees = [f"職員{i:03d}" for i in range(1, num_employees + 1)]
+    weights = {e: rng.choice([0, 1]) for e in employees}
+    fulltime = {e: weights[e] == 1 for e in employees}
+
+    def rows():
+        for day in make_days(num_days):
+            for i in range(num_trials):
+                schedule: Dict[str, List[str]] = {}
+                for r in roles:
+                    workers = rng.sample(employees, rng.randint(0, 3))
+                    if rng.random() < 0.1:
+                        workers.append(f"{r}不足")
+                    schedule[r] = workers
+                yield f"{day}:{i}", schedule
+
+    return weights, fulltime, rows()
+
+
+def run_write_benchmark(params: Dict, work_dir: str) -> Dict:
+    """
+    書き込みのベンチマークを実行し, 結果を辞書で返す。
+
+    Args:
+        params (Dict): make_schedule_rows に渡す引数。
+        work_dir (str): 出力ファイルを置くディレクトリ。
+    """
+    path = Path(work_dir) / "write_benchmark.xlsx"
+    weights, fulltime, rows = make_schedule_rows(**params)
+    # 行の生成は計測に含めない
+    rows = list(rows)
+
+    start = time.perf_counter()
+    ExcelWriter(path, "schedule", weights, fulltime).write_schedule(rows)
+    write_time = time.perf_counter() - start
+
+    # tracemalloc は処理を遅くするため, メモリは別に書き込んで計測する
+    tracemalloc.start()
+    ExcelWriter(path, "schedule", weights, fulltime).write_schedule(rows)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "params": params,
+        "rows": len(rows),
+        "write_seconds": write_time,
+        "file_bytes": path.stat().st_size,
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+def print_summary(result: Dict, baseline: Dict = None):
+    """計測値を表示する (baseline を指定した場合は比較も表示する)"""
+    header = f"{'metric':<20}{'value':>14}"
+    if baseline:
+        header += f"{'baseline':>14}{'ratio':>8}"
+    print(header)
+    for key, spec in (
+        ("write_seconds", ">14.3f"),
+        ("file_bytes", ">14,d"),
+        ("peak_memory_bytes", ">14,d"),
+    ):
+        value = result[key]
+        line = f"{key:<20}{value:{spec}}"
+        if baseline and key in baseline:
+            before = baseline[key]
+            ratio = value / before if before else float("nan")
+            line += f"{before:{spec}}{ratio:>8.2f}"
+        print(line)
+
+
+def setup_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="ExcelWriter の書き込み時間とファイルサイズを計測します。"
+    )
+    parser.add_argument("--employees", type=int, default=60)
+    parser.add_argument("--roles", type=int, default=10)
+    parser.add_argument("--days", type=int, default=26)
+    parser.add_argument("-n", "--num_trials", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "-o", "--output", help="結果を保存する JSON ファイル", default=None
+    )
+    parser.add_argument("--baseline", help="比較する過去の結果の JSON ファイル")
+    return parser
+
+
+if __name__ == "__main__":
+    args = setup_parser().parse_args()
+    params = {
+        "num_employees": args.employees,
+        "num_roles": args.roles,
+        "num_days": args.days,
+        "num_trials": args.num_trials,
+        "seed": args.seed,
+    }
+    with tempfile.TemporaryDirectory() as work_dir:
+        result = run_write_benchmark(params, work_dir)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_summary(result, baseline)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"結果を保存しました: {args.output}")
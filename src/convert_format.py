@@ -0,0 +1,98 @@
+# 入力のワークブックとスケジュールを, Excel (.xlsx) と Parquet の形式の間で変換します。
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+from batch_solver import read_workbook
+from Parquet.parquet_io import (
+    read_schedule_excel,
+    read_schedules,
+    write_inputs,
+    write_inputs_to_excel,
+    write_schedules,
+)
+from ReadExcel.excel_reader import ExcelReader
+from schedule_solver import read_master_data
+from utils.logger import setup_logger
+from WriteExcel.excel_writer import ExcelWriter
+
+logger = logging.getLogger("shift_scheduler")
+
+
+def setup_parser() -> argparse.ArgumentParser:
+    """引数パーサーを作成して設定する関数"""
+    parser = argparse.ArgumentParser(
+        description=(
+            "入力のワークブック (inputs) または解いたスケジュール (schedule) を, "
+            "Excel と Parquet の間で変換します。変換の向きは source の形式で決まります。"
+        )
+    )
+    parser.add_argument("kind", choices=["inputs", "schedule"])
+    parser.add_argument(
+        "source",
+        help=(
+            "inputs: .xlsx または Parquet のディレクトリ, "
+            "schedule: .xlsx または .parquet のファイル"
+        ),
+    )
+    parser.add_argument("-o", "--output", help="出力先のパス", required=True)
+    parser.add_argument(
+        "--sheets",
+        help="inputs を Parquet に変換するシート (省略した場合はマスタ以外の全てのシート)",
+        nargs="+",
+        default=None,
+    )
+    parser.add_argument(
+        "--master",
+        help=(
+            "schedule を Parquet に変換するとき, 重みと社員リストを読み込む"
+            "入力のワークブック (Excel に戻すときの文字色に使う)"
+        ),
+        default=None,
+    )
+    parser.add_argument("-l", "--loglevel", help="ログレベル", default="INFO")
+    return parser
+
+
+def convert_inputs(source: str, output: str, sheets=None):
+    if Path(source).is_dir():
+        write_inputs_to_excel(source, output)
+        return
+    availabilities, master = {}, None
+    for sheet_name, data, _, _ in read_workbook(source, sheets, cache=None):
+        master = {key: value for key, value in data.items() if key != "availabilities"}
+        availabilities[sheet_name] = data["availabilities"]
+    if master is None:
+        raise ValueError(f"{source} に希望シフトのシートがありません")
+    write_inputs(output, master, availabilities)
+
+
+def convert_schedule(source: str, output: str, master_path=None):
+    if Path(source).suffix == ".parquet":
+        metadata, rows = read_schedules(source)
+        ExcelWriter(
+            output, metadata["sheet_name"], metadata["weights"], metadata["fulltime"]
+        ).write_schedule(rows)
+        logger.info(f"スケジュールを書き込んだファイル: {output}")
+        return
+    weights, fulltime = None, None
+    if master_path is not None:
+        with ExcelReader(master_path) as reader:
+            master = read_master_data(reader)
+        weights, fulltime = master["weights"], master["fulltime"]
+    sheet_name, rows = read_schedule_excel(source)
+    write_schedules(output, rows, sheet_name, weights, fulltime)
+
+
+if __name__ == "__main__":
+    args = setup_parser().parse_args()
+    logger = setup_logger("shift_scheduler", args.loglevel)
+    try:
+        if args.kind == "inputs":
+            convert_inputs(args.source, args.output, args.sheets)
+        else:
+            convert_schedule(args.source, args.output, args.master)
+    except Exception as e:
+        logger.error(f"変換できませんでした: {e}")
+        sys.exit(1)
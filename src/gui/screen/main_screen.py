@@ -1,17 +1,35 @@
+import importlib
 import logging
 import sys
+import threading
+import time
 from pathlib import Path
 
 import flet as ft
 
-from schedule_solver import main
+from ReadExcel.parse_cache import ParseCache
 
 if str(Path(__file__).parents[2]) not in sys.path:
     sys.path.append(str(Path(__file__).parents[2]))
-from utils.config import load_config
+from utils.config import cache_dir_path, load_config
+from utils.progress import SolveProgress
 
 logger = logging.getLogger("shift_scheduler")
 
+# 進捗の表示を更新する最短の間隔 (秒)
+PROGRESS_UPDATE_INTERVAL = 0.2
+
+
+def _preload_solver():
+    """
+    ソルバーと Excel の読み書き (pandas, PuLP, xlsxwriter) を読み込む。
+    起動を速くするため, 画面を表示した後に別のスレッドで読み込む
+    (読み込み中に実行された場合は, 読み込みが終わるまで待つ)。
+    """
+    start = time.perf_counter()
+    importlib.import_module("schedule_solver")
+    logger.debug(f"ソルバーを読み込みました ({time.perf_counter() - start:.2f}s)")
+
 
 class MainScreen:
     def __init__(self, page: ft.Page):
@@ -31,43 +49,115 @@ class MainScreen:
         label = ft.Text("", size=20)
         text_field = ft.TextField(label="シート名を入力してください")
         loading_spinner = ft.ProgressRing(visible=False)  # ローディングスピナー
+        progress_bar = ft.ProgressBar(width=400, value=0, visible=False)
+        progress_label = ft.Text("", size=14)
+        # 実行中の求解の進捗 (中止ボタンから中止を要求する)
+        running = {"progress": None}
+        last_update = {"time": 0.0}
 
         # ヘルパー関数
         def update_label(message: str):
             label.value = message
             self.page.update()
 
-        # ハンドラ: 実行ボタン
-        def on_submit(_):
-            if submit_button.disabled:
+        def on_progress(progress: SolveProgress):
+            # 求解を行うスレッドから呼ばれる
+            # 試行ごとに画面を更新すると重くなるため, 日が終わったとき以外は間引く
+            now = time.monotonic()
+            if (
+                progress.trial is not None
+                and now - last_update["time"] < PROGRESS_UPDATE_INTERVAL
+            ):
                 return
-            submit_button.disabled = True
-            sheet_name = text_field.value
-            update_label(f"入力: {sheet_name}")
-            loading_spinner.visible = True
+            last_update["time"] = now
+
+            message = f"{progress.days_done} / {progress.total_days} 日"
+            if progress.trial is not None:
+                message += f" (解いている日: {progress.day} 試行 {progress.trial + 1})"
+            progress_label.value = message
+            if progress.total_days:
+                progress_bar.value = progress.days_done / progress.total_days
             self.page.update()
 
+        def run_solver(sheet_name: str, progress: SolveProgress):
+            # 画面が固まらないよう, 別のスレッドで実行する
             try:
+                # 起動時には読み込まず, 最初の実行で読み込む
+                from schedule_solver import (
+                    main,
+                    maker_options_from_config,
+                    monthly_options_from_config,
+                )
+
                 config = load_config()
-                main(
+                output_path = main(
                     config["excel_path"],
                     sheet_name,
                     config["num_trials"],
                     config["output_dir"],
+                    num_jobs=config.get("num_jobs", 1),
+                    seed=config.get("seed", 0),
+                    maker_options=maker_options_from_config(config),
+                    cache=ParseCache(
+                        cache_dir_path(config),
+                        config.get("cache_max_mb", 64) * 1024 * 1024,
+                    ),
+                    incremental=config.get("incremental", True),
+                    monthly_options=monthly_options_from_config(config),
+                    profile=config.get("profile", False),
+                    progress=progress,
+                    run_time_limit=config.get("run_time_limit"),
+                    dedup=config.get("dedup", True),
                 )
-                update_label(
-                    f"処理が正常に終了しました.\n\
-出力: {config["output_dir"] + "/" + sheet_name + "_schedule.xlsx"}"
-                )
+                if progress.cancelled:
+                    update_label(
+                        "処理を中止しました. 途中までの結果を書き込みました.\n"
+                        f"出力: {output_path}"
+                    )
+                else:
+                    update_label(f"処理が正常に終了しました.\n出力: {output_path}")
             except Exception as ex:
                 error_message = f"エラー: {ex}"
                 update_label(error_message)
                 logger.error("エラーが発生しました", exc_info=True)
             finally:
+                running["progress"] = None
                 loading_spinner.visible = False
+                progress_bar.visible = False
                 submit_button.disabled = False
+                cancel_button.disabled = True
                 self.page.update()
 
+        # ハンドラ: 実行ボタン
+        def on_submit(_):
+            if submit_button.disabled:
+                return
+            submit_button.disabled = True
+            cancel_button.disabled = False
+            sheet_name = text_field.value
+            update_label(f"入力: {sheet_name}")
+            loading_spinner.visible = True
+            progress_bar.value = 0
+            progress_bar.visible = True
+            progress_label.value = ""
+            self.page.update()
+
+            progress = SolveProgress(on_update=on_progress)
+            running["progress"] = progress
+            threading.Thread(
+                target=run_solver, args=(sheet_name, progress), daemon=True
+            ).start()
+
+        # ハンドラ: 中止ボタン
+        def on_cancel(_):
+            progress = running["progress"]
+            if progress is None or progress.cancelled:
+                return
+            logger.info("中止が要求されました。")
+            progress.cancel()
+            cancel_button.disabled = True
+            update_label("中止しています. 解いている日が終わるまでお待ちください.")
+
         # ハンドラ: 設定画面遷移ボタン
         def go_to_settings(_):
             # 循環参照を避けるため、ここでインポート
@@ -79,9 +169,18 @@ class MainScreen:
 
         # ボタン定義
         submit_button = ft.ElevatedButton("実行", on_click=on_submit)
+        cancel_button = ft.ElevatedButton("中止", on_click=on_cancel, disabled=True)
         settings_button = ft.ElevatedButton("設定画面へ", on_click=go_to_settings)
 
         # ページ構成
         self.page.add(
-            text_field, submit_button, settings_button, loading_spinner, label
+            text_field,
+            submit_button,
+            cancel_button,
+            settings_button,
+            loading_spinner,
+            progress_bar,
+            progress_label,
+            label,
         )
+        threading.Thread(target=_preload_solver, daemon=True).start()
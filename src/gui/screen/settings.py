@@ -1,4 +1,5 @@
 import logging
+import os
 import sys
 from pathlib import Path
 from typing import Tuple
@@ -106,6 +107,47 @@ class SettingsScreen:
         num_of_trials_field.on_change = on_change
         return num_of_trials_field
 
+    # 並列数の設定
+    def _num_of_jobs(self) -> ft.Dropdown:
+        num_of_jobs_field = ft.Dropdown(
+            label="並列数",
+            value=str(self.config.get("num_jobs", 1)),
+            item_height=48.0,
+            options=[
+                ft.dropdown.Option(
+                    str(i),
+                    text_style=ft.TextStyle(size=15),
+                )
+                for i in range(1, (os.cpu_count() or 1) + 1)
+            ],
+        )
+
+        def on_change(e):
+            if e.control.value.isdigit():
+                logger.info(f"並列数を設定します: {e.control.value}")
+                self.config["num_jobs"] = int(e.control.value)
+                self._change_settings()
+            else:
+                logger.info("並列数は整数でなければなりません")
+
+        num_of_jobs_field.on_change = on_change
+        return num_of_jobs_field
+
+    # プロファイルの出力の設定
+    def _profile(self) -> ft.Checkbox:
+        profile_checkbox = ft.Checkbox(
+            label="処理時間とソルバーの統計を出力する",
+            value=self.config.get("profile", False),
+        )
+
+        def on_change(e):
+            logger.info(f"プロファイルの出力を設定します: {e.control.value}")
+            self.config["profile"] = e.control.value
+            self._change_settings()
+
+        profile_checkbox.on_change = on_change
+        return profile_checkbox
+
     def _change_settings(self):
         logger.debug(f"設定を保存します: {self.config}")
         save_config(self.config)
@@ -130,6 +172,8 @@ class SettingsScreen:
         excel_path_field, excel_select_button = self._excel_path()
         output_dir_field, outputdir_select_button = self._output_dir()
         num_of_trials_field = self._num_of_trials()
+        num_of_jobs_field = self._num_of_jobs()
+        profile_checkbox = self._profile()
 
         self.page.add(
             back_button,
@@ -141,4 +185,7 @@ class SettingsScreen:
             outputdir_select_button,
             ft.Divider(),
             num_of_trials_field,
+            num_of_jobs_field,
+            ft.Divider(),
+            profile_checkbox,
         )
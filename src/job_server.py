@@ -0,0 +1,475 @@
+# 複数の利用者から Excel ファイルを受け付け, 1台のマシンで順番にシフトを解くジョブサーバーです。
+import argparse
+import asyncio
+import logging
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import FileResponse
+
+from MILP.solver_backend import SOLVER_NAMES
+from schedule_solver import main as solve_workbook
+from utils.logger import setup_logger
+from utils.progress import SolveProgress
+
+logger = logging.getLogger("shift_scheduler")
+
+# 終了した (結果を取得できる, または失敗した) ジョブの状態
+FINISHED_STATES = ("done", "failed", "cancelled")
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+# 保持期間を過ぎたジョブを削除する間隔 (秒)
+EVICT_INTERVAL = 60.0
+# Excel のシート名に使えない文字 (シート名は出力のファイル名になるため, パスの区切りも拒否する)
+INVALID_SHEET_NAME_CHARS = set("\\/?*[]:")
+
+
+def is_valid_sheet_name(sheet_name: str) -> bool:
+    return (
+        0 < len(sheet_name) <= 31
+        and not INVALID_SHEET_NAME_CHARS & set(sheet_name)
+        and "\0" not in sheet_name
+    )
+
+
+@dataclass
+class Job:
+    """
+    受け付けた1つのシートの求解。
+    状態は queued -> running -> done / failed / cancelled と変わる。
+    """
+
+    job_id: str
+    filename: str
+    sheet_name: str
+    work_dir: Path
+    num_trials: int = 1
+    seed: int = 0
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    output_path: Optional[Path] = None
+    error: Optional[str] = None
+    # 解き終わった日 (解き終わった順)
+    finished_days: List[str] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.progress = SolveProgress(self._on_progress)
+
+    @property
+    def excel_path(self) -> Path:
+        return self.work_dir / "input.xlsx"
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def _on_progress(self, progress: SolveProgress):
+        # 求解を行うスレッドから呼ばれる
+        if progress.trial is None and progress.days_done > len(self.finished_days):
+            self.finished_days.append(progress.day)
+
+    def progress_dict(self) -> Dict:
+        return {
+            "total_days": self.progress.total_days,
+            "days_done": self.progress.days_done,
+            "day": self.progress.day,
+            "trial": self.progress.trial,
+            "finished_days": list(self.finished_days),
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "filename": self.filename,
+            "sheet_name": self.sheet_name,
+            "num_trials": self.num_trials,
+            "seed": self.seed,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "result_available": self.output_path is not None,
+            "progress": self.progress_dict(),
+        }
+
+
+class JobManager:
+    """
+    ジョブの待ち行列と, それを解くワーカーを管理する。
+    同時に解くジョブは workers 個まで, 待ち行列は max_queue 個までとし,
+    終了したジョブは retention 秒, 最大 max_retained 個まで結果を保持する。
+    求解は schedule_solver.main を GUI と同じく別のスレッドで呼び出す
+    (solve_options は main にそのまま渡す)。
+    """
+
+    def __init__(
+        self,
+        work_dir: str,
+        solve_options: Optional[Dict] = None,
+        workers: int = 1,
+        max_queue: int = 16,
+        retention: float = 3600.0,
+        max_retained: int = 100,
+    ):
+        self.work_dir = Path(work_dir)
+        self.solve_options = solve_options or {}
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retention = retention
+        self.max_retained = max_retained
+        self.jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._queue: Optional[asyncio.Queue] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        """ワーカーを起動する (イベントループの中で呼ぶ)"""
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        # 取り消したジョブも取り出されるまでは残るため, 待っているジョブの数は
+        # submit で数えて制限する
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="solver"
+        )
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._evict_periodically()))
+        logger.info(
+            f"ジョブサーバーを開始しました (ワーカー {self.workers}, "
+            f"待ち行列 {self.max_queue}, 作業ディレクトリ {self.work_dir})"
+        )
+
+    async def stop(self):
+        """待っているジョブを中止し, 解いているジョブが途中までの結果を書き込むのを待つ"""
+        for job in list(self.jobs.values()):
+            if not job.finished:
+                self.cancel(job.job_id)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await asyncio.to_thread(self._executor.shutdown)
+
+    def submit(
+        self,
+        content: bytes,
+        filename: str,
+        sheet_name: str,
+        num_trials: int = 1,
+        seed: int = 0,
+    ) -> Job:
+        """
+        ジョブを待ち行列に追加する。
+        待ち行列がいっぱいの場合は asyncio.QueueFull を,
+        シート名がファイル名に使えない場合は ValueError を送出する。
+        """
+        if not is_valid_sheet_name(sheet_name):
+            raise ValueError(f"シート名に使えない文字が含まれています: {sheet_name!r}")
+        self.evict()
+        with self._lock:
+            num_queued = sum(job.status == "queued" for job in self.jobs.values())
+        if num_queued >= self.max_queue:
+            raise asyncio.QueueFull
+        job_id = uuid.uuid4().hex
+        job = Job(
+            job_id,
+            filename,
+            sheet_name,
+            self.work_dir / job_id,
+            num_trials=num_trials,
+            seed=seed,
+        )
+        job.work_dir.mkdir(parents=True)
+        job.excel_path.write_bytes(content)
+        with self._lock:
+            self.jobs[job_id] = job
+        self._queue.put_nowait(job)
+        logger.info(f"ジョブ {job_id} を受け付けました: {filename} / {sheet_name}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self) -> List[Job]:
+        with self._lock:
+            return sorted(self.jobs.values(), key=lambda job: job.created_at)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        待っているジョブは取り消し, 解いているジョブには中止を要求する
+        (途中までの結果を書き込んで cancelled になる)。
+        終了したジョブは結果を削除する。
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+        with self._lock:
+            status = job.status
+            if status == "queued":
+                job.status = "cancelled"
+                job.finished_at = time.time()
+        if status == "running":
+            job.progress.cancel()
+        elif job.finished and status != "queued":
+            self._remove(job)
+        return job
+
+    def evict(self, now: Optional[float] = None) -> List[str]:
+        """保持期間を過ぎた, または保持数を超えた終了済みのジョブを削除し, その ID を返す"""
+        now = time.time() if now is None else now
+        with self._lock:
+            finished = sorted(
+                (job for job in self.jobs.values() if job.finished),
+                key=lambda job: job.finished_at,
+            )
+        expired = {
+            job.job_id: job
+            for job in finished
+            if now - job.finished_at > self.retention
+        }
+        for job in finished[: max(0, len(finished) - self.max_retained)]:
+            expired[job.job_id] = job
+        for job in expired.values():
+            self._remove(job)
+        if expired:
+            logger.info(f"{len(expired)} 件のジョブの結果を削除しました。")
+        return list(expired)
+
+    def _remove(self, job: Job):
+        with self._lock:
+            self.jobs.pop(job.job_id, None)
+        shutil.rmtree(job.work_dir, ignore_errors=True)
+
+    async def _evict_periodically(self):
+        while True:
+            await asyncio.sleep(EVICT_INTERVAL)
+            self.evict()
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status == "queued":
+                    await loop.run_in_executor(self._executor, self._run, job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job: Job):
+        # ワーカーのスレッドで実行する
+        with self._lock:
+            # 待っている間に取り消されたジョブは解かない
+            if job.status != "queued":
+                return
+            job.status = "running"
+            job.started_at = time.time()
+        logger.info(f"ジョブ {job.job_id} を開始します。")
+        try:
+            job.output_path = solve_workbook(
+                str(job.excel_path),
+                job.sheet_name,
+                job.num_trials,
+                str(job.work_dir),
+                seed=job.seed,
+                progress=job.progress,
+                **self.solve_options,
+            )
+            job.status = "cancelled" if job.progress.cancelled else "done"
+        except Exception as e:
+            logger.error(f"ジョブ {job.job_id} が失敗しました", exc_info=True)
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+        logger.info(
+            f"ジョブ {job.job_id} が終了しました ({job.status}, "
+            f"{job.finished_at - job.started_at:.2f}s)"
+        )
+
+
+def create_app(manager: JobManager, max_upload_mb: int = 32) -> FastAPI:
+    """manager のジョブを操作する API を作成する"""
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await manager.start()
+        yield
+        await manager.stop()
+
+    app = FastAPI(title="Shift Scheduler", lifespan=lifespan)
+
+    def find(job_id: str) -> Job:
+        job = manager.get(job_id)
+        if job is None:
+            raise HTTPException(404, f"ジョブ {job_id} がありません")
+        return job
+
+    @app.post("/jobs", status_code=202)
+    async def submit_job(
+        request: Request,
+        sheet_name: str,
+        num_trials: int = Query(1, ge=1),
+        seed: int = 0,
+        filename: str = "input.xlsx",
+    ):
+        """本文に Excel ファイル (.xlsx) をそのまま送り, ジョブを追加する"""
+        if not is_valid_sheet_name(sheet_name):
+            raise HTTPException(
+                400, f"シート名に使えない文字が含まれています: {sheet_name}"
+            )
+        too_large = HTTPException(413, f"ファイルが {max_upload_mb} MB を超えています")
+        max_bytes = max_upload_mb * 1024 * 1024
+        # 本文を読む前に Content-Length で, 読みながら実際の大きさで確かめる
+        length = request.headers.get("content-length")
+        if length is not None and length.isdigit() and int(length) > max_bytes:
+            raise too_large
+        content = bytearray()
+        async for chunk in request.stream():
+            content += chunk
+            if len(content) > max_bytes:
+                raise too_large
+        if not content.startswith(b"PK"):
+            raise HTTPException(400, "本文に Excel ファイル (.xlsx) を送ってください")
+        try:
+            job = manager.submit(bytes(content), filename, sheet_name, num_trials, seed)
+        except asyncio.QueueFull:
+            raise HTTPException(
+                503, "待ち行列がいっぱいです。しばらくしてから送ってください"
+            )
+        return job.to_dict()
+
+    @app.get("/jobs")
+    async def list_jobs():
+        return [job.to_dict() for job in manager.list_jobs()]
+
+    @app.get("/jobs/{job_id}")
+    async def get_job(job_id: str):
+        return find(job_id).to_dict()
+
+    @app.get("/jobs/{job_id}/progress")
+    async def get_progress(job_id: str):
+        job = find(job_id)
+        return {"job_id": job_id, "status": job.status, **job.progress_dict()}
+
+    @app.get("/jobs/{job_id}/result")
+    async def get_result(job_id: str):
+        job = find(job_id)
+        if job.output_path is None:
+            raise HTTPException(
+                409, f"ジョブ {job_id} の結果はまだありません ({job.status})"
+            )
+        return FileResponse(
+            job.output_path, media_type=XLSX_MEDIA_TYPE, filename=job.output_path.name
+        )
+
+    @app.delete("/jobs/{job_id}")
+    async def cancel_job(job_id: str):
+        """待っている・解いているジョブを中止する (終了したジョブは結果を削除する)"""
+        find(job_id)
+        return manager.cancel(job_id).to_dict()
+
+    return app
+
+
+def setup_parser() -> argparse.ArgumentParser:
+    """引数パーサーを作成して設定する関数"""
+    parser = argparse.ArgumentParser(
+        description="Excel ファイルを受け付けてシフトスケジュールを作成するジョブサーバーを起動します。"
+    )
+    parser.add_argument("--host", help="待ち受けるアドレス", default="127.0.0.1")
+    parser.add_argument("--port", help="待ち受けるポート", type=int, default=8000)
+    parser.add_argument("-l", "--loglevel", help="ログレベル", default="INFO")
+    parser.add_argument(
+        "-d",
+        "--work_dir",
+        help="受け付けたファイルと結果を保存するディレクトリ",
+        default="output/jobs",
+    )
+    parser.add_argument(
+        "-w", "--workers", help="同時に解くジョブの数", type=int, default=1
+    )
+    parser.add_argument(
+        "--max_queue", help="待ち行列に入れられるジョブの数", type=int, default=16
+    )
+    parser.add_argument(
+        "--retention",
+        help="終了したジョブの結果を保持する時間 (秒)",
+        type=float,
+        default=3600.0,
+    )
+    parser.add_argument(
+        "--max_retained", help="結果を保持するジョブの数", type=int, default=100
+    )
+    parser.add_argument(
+        "--max_upload_mb",
+        help="受け付けるファイルの最大サイズ (MB)",
+        type=int,
+        default=32,
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="1つのジョブで並列に解く日数 (プロセス数)",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--trial_mode",
+        help="試行の方法 (enumerate: 異なる解を列挙, seed: 乱数シードのみ変更)",
+        choices=["enumerate", "seed"],
+        default="enumerate",
+    )
+    parser.add_argument(
+        "--solver",
+        help="ソルバー (auto: highspy があれば HiGHS, なければ CBC)",
+        choices=SOLVER_NAMES,
+        default="auto",
+    )
+    parser.add_argument(
+        "--time_limit", help="1日あたりの制限時間 (秒)", type=float, default=None
+    )
+    parser.add_argument(
+        "--run_time_limit",
+        help="1つのジョブの制限時間 (秒). 超えた日は暫定解を使う",
+        type=float,
+        default=None,
+    )
+    parser.add_argument(
+        "--gap", help="目標の相対ギャップ (例: 0.01)", type=float, default=None
+    )
+    return parser
+
+
+if __name__ == "__main__":
+    args = setup_parser().parse_args()
+    logger = setup_logger("shift_scheduler", args.loglevel)
+
+    manager = JobManager(
+        args.work_dir,
+        {
+            "num_jobs": args.jobs,
+            "maker_options": {
+                "trial_mode": args.trial_mode,
+                "solver": args.solver,
+                "time_limit": args.time_limit,
+                "gap": args.gap,
+            },
+            "run_time_limit": args.run_time_limit,
+        },
+        workers=args.workers,
+        max_queue=args.max_queue,
+        retention=args.retention,
+        max_retained=args.max_retained,
+    )
+    uvicorn.run(create_app(manager, args.max_upload_mb), host=args.host, port=args.port)
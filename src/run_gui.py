@@ -1,4 +1,5 @@
 import argparse
+import multiprocessing
 
 import flet as ft
 
@@ -15,6 +16,8 @@ def main():
 
 
 if __name__ == "__main__":
+    # PyInstaller で固めた実行ファイルから並列処理のワーカーを起動するため
+    multiprocessing.freeze_support()
 
     parser = argparse.ArgumentParser(description="GUIアプリケーションを起動します")
     parser.add_argument(
@@ -1,15 +1,45 @@
 import argparse
 import logging
+import multiprocessing
+import queue
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, wait
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
-from MILP.milp_maker import MILPMaker
+from MILP.milp_maker import MILPMaker, Schedule
+from MILP.monthly_milp_maker import HORIZONS, MonthlyMILPMaker
+from MILP.solution_store import SolutionStore, common_fingerprint, day_fingerprint
+from MILP.solver_backend import SOLVER_NAMES
 from ReadExcel.excel_reader import ExcelReader
-from utils.logger import setup_logger
+from ReadExcel.parse_cache import ParseCache
+from utils.logger import setup_logger, setup_worker_logger, start_queue_listener
+from utils.profiler import SolveProfiler
+from utils.progress import SolveProgress, WorkerProgress
 from WriteExcel.excel_writer import ExcelWriter
 
 logger = logging.getLogger("shift_scheduler")
 
+# 設定ファイルから MILPMaker にそのまま渡すオプション
+MAKER_OPTION_KEYS = (
+    "trial_mode",
+    "solver",
+    "time_limit",
+    "gap",
+    "warm_start",
+    "diagnose",
+    "presolve",
+)
+# 設定ファイルから MonthlyMILPMaker にそのまま渡すオプション
+MONTHLY_OPTION_KEYS = ("max_shifts", "fairness_weight", "horizon")
+
+# ワーカープロセスごとに一度だけ作成する MILPMaker
+_worker_maker: Optional[MILPMaker] = None
+# 親プロセスに試行の開始を送り, 中止の要求を受け取る (GUI から解く場合)
+_worker_progress: Optional[WorkerProgress] = None
+
 
 def setup_parser() -> argparse.ArgumentParser:
     """引数パーサーを作成して設定する関数"""
@@ -19,94 +49,646 @@ def setup_parser() -> argparse.ArgumentParser:
     parser.add_argument("-n", "--num_trials", help="試行回数", type=int, default=1)
     parser.add_argument("-l", "--loglevel", help="ログレベル", default="INFO")
     parser.add_argument("-o", "--output_dir", help="出力ディレクトリ", default="output")
+    parser.add_argument(
+        "-j", "--jobs", help="並列に解く日数 (プロセス数)", type=int, default=1
+    )
+    parser.add_argument("--seed", help="乱数シード", type=int, default=0)
+    parser.add_argument(
+        "--trial_mode",
+        help="試行の方法 (enumerate: 異なる解を列挙, seed: 乱数シードのみ変更)",
+        choices=["enumerate", "seed"],
+        default="enumerate",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        help="読み込み結果のキャッシュを保存するディレクトリ",
+        default=None,
+    )
+    parser.add_argument(
+        "--cache_max_mb", help="キャッシュの最大サイズ (MB)", type=int, default=64
+    )
+    parser.add_argument(
+        "--parquet",
+        help="スケジュールを Excel と同じ場所に Parquet でも書き出す",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--incremental",
+        help="入力が前回と同じ日は前回の解を再利用する",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--monthly",
+        help="全ての日を1つのモデルとしてまとめて解く (試行回数は1回)",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--max_shifts",
+        help="1人あたりの出勤日数の上限 (--monthly のとき)",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--fairness_weight",
+        help="胃カメラの担当回数の偏りに対する罰金 (--monthly のとき)",
+        type=float,
+        default=0.0,
+    )
+    parser.add_argument(
+        "--horizon",
+        help="full: 全期間を一度に解く, weekly: 週ごとに順に解く (--monthly のとき)",
+        choices=HORIZONS,
+        default="full",
+    )
+    parser.add_argument(
+        "--solver",
+        help="ソルバー (auto: highspy があれば HiGHS, なければ CBC)",
+        choices=SOLVER_NAMES,
+        default="auto",
+    )
+    parser.add_argument(
+        "--time_limit",
+        help="1日あたりの制限時間 (秒). 超えた場合はそれまでの最良の解 (暫定解) を使う",
+        type=float,
+        default=None,
+    )
+    parser.add_argument(
+        "--run_time_limit",
+        help="実行全体の制限時間 (秒). 並列に解く日も含めて共有する",
+        type=float,
+        default=None,
+    )
+    parser.add_argument(
+        "--gap",
+        help="目標の相対ギャップ (例: 0.01). 達した時点の解を暫定解として使う",
+        type=float,
+        default=None,
+    )
+    parser.add_argument(
+        "--no_dedup",
+        help="出勤可能性と必要人数が同じ日も, 日ごとに解く",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--no_diagnose",
+        help="解がない日の原因 (満たせない制約と従業員) を調べない",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--no_presolve",
+        help="解く前に, 必要人数と割り当て可能な人数から決まる割り当てを固定しない",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--warm_start",
+        help="前回の解 (なければ似た日の解) を初期解としてソルバーに渡す",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--profile",
+        help="各段階の時間とソルバーの統計を出力ファイルと同じ場所に書き出す",
+        action="store_true",
+    )
     return parser
 
 
-def read_excel_data(excel_path: str, sheet_name: str) -> Dict:
-    """Excelファイルからデータを読み込む関数"""
-    logger.info("Excelファイルからデータを読み込みます。")
-    reader = ExcelReader(excel_path)
-    # 希望シフトデータを読み込む
-    availabilities = reader.read_availabilities(sheet_name)
-    # 割り当て可能な役職データを読み込む
-    capabilities = reader.read_capabilities("割り当て")
-    # 社員リストを読み込む
-    fulltime = reader.read_fulltime("社員リスト")
-    # 重みデータを読み込む
-    weights = reader.read_weights("重み")
-    # 曜日ごとの必要人数データを読み込む
-    num_required = reader.read_number_of_needed_employees("人数")
+# 全ての月のシートで共通のマスタのシート名
+MASTER_SHEETS = ("割り当て", "社員リスト", "重み", "人数")
+
 
+def read_master_data(reader: ExcelReader) -> Dict:
+    """全ての月で共通のマスタ (役職適性, 社員リスト, 重み, 必要人数) を読み込む関数"""
     return {
-        "availabilities": availabilities,
-        "capabilities": capabilities,
-        "fulltime": fulltime,
-        "weights": weights,
-        "num_required": num_required,
+        # 割り当て可能な役職データを読み込む
+        "capabilities": reader.read_capabilities("割り当て"),
+        # 社員リストを読み込む
+        "fulltime": reader.read_fulltime("社員リスト"),
+        # 重みデータを読み込む
+        "weights": reader.read_weights("重み"),
+        # 曜日ごとの必要人数データを読み込む
+        "num_required": reader.read_number_of_needed_employees("人数"),
     }
 
 
-def solve_schedule(data: Dict, num_trials: int) -> List:
-    """MILPを使用してシフトスケジュールを解決する関数"""
-    logger.info("MILPを使用してシフトスケジュールを解決します。")
-    maker = MILPMaker(
+def read_excel_data(
+    excel_path: str,
+    sheet_name: str,
+    cache: Optional[ParseCache] = None,
+    master: Optional[Dict] = None,
+) -> Dict:
+    """
+    Excelファイルからデータを読み込む関数
+    master (read_master_data の結果) を指定した場合, マスタのシートは読み込まない。
+    excel_path がディレクトリの場合, convert_format.py で書き出した Parquet の入力を読み込む。
+    """
+    if Path(excel_path).is_dir():
+        # pyarrow は任意の依存なので, 使うときだけインポートする
+        from Parquet.parquet_io import read_inputs
+
+        logger.info("Parquet の入力を読み込みます。")
+        return read_inputs(excel_path, sheet_name, master=master)
+
+    logger.info("Excelファイルからデータを読み込みます。")
+    # ワークブックは一度だけ開き, 全シートの読み込みで共有する
+    # キャッシュに全て残っている場合はワークブックを開かない
+    with ExcelReader(excel_path, cache=cache) as reader:
+        # 希望シフトデータを読み込む
+        availabilities = reader.read_availabilities(sheet_name)
+        if master is None:
+            master = read_master_data(reader)
+
+    if cache is not None:
+        logger.info(f"キャッシュ: ヒット {cache.hits} 件, ミス {cache.misses} 件")
+
+    return {"availabilities": availabilities, **master}
+
+
+def _day_seed(seed: int, day: str) -> int:
+    """日付ごとの乱数シードを返す関数 (並列数や実行順序に依存しない)"""
+    return zlib.crc32(f"{seed}:{day}".encode("utf-8"))
+
+
+def maker_options_from_config(config: Dict) -> Dict:
+    """設定ファイルから MILPMaker に渡すオプションを取り出す関数"""
+    return {key: config[key] for key in MAKER_OPTION_KEYS if key in config}
+
+
+def monthly_options_from_config(config: Dict) -> Optional[Dict]:
+    """設定ファイルから MonthlyMILPMaker に渡すオプションを取り出す関数"""
+    if not config.get("monthly", False):
+        return None
+    return {key: config[key] for key in MONTHLY_OPTION_KEYS if key in config}
+
+
+def _create_maker(
+    data: Dict, maker_options: Optional[Dict] = None, profile: bool = False
+) -> MILPMaker:
+    return MILPMaker(
         data["availabilities"],
         data["capabilities"],
         data["fulltime"],
         data["weights"],
         data["num_required"],
+        profile=profile,
+        **(maker_options or {}),
     )
-    schedule_list = []
-    days = list(data["availabilities"].values())[0].keys()
 
+
+def _init_worker(
+    data: Dict,
+    maker_options: Optional[Dict],
+    profile: bool,
+    log_level: int,
+    log_queue,
+    progress_channel=None,
+) -> None:
+    """
+    ワーカープロセスの初期化関数
+    progress_channel は (試行の開始を送るキュー, 中止の要求のイベント) の組。
+    """
+    global _worker_maker, _worker_progress
+    setup_worker_logger("shift_scheduler", log_level, log_queue)
+    _worker_maker = _create_maker(data, maker_options, profile)
+    _worker_progress = (
+        WorkerProgress(*progress_channel) if progress_channel is not None else None
+    )
+
+
+def _solve_day_in_worker(
+    day: str,
+    num_trials: int,
+    seed: int,
+    deadline: Optional[float],
+    previous: Optional[Dict[str, List[str]]],
+) -> Tuple[List[Schedule], List[Dict]]:
+    """その日のスケジュールと, 計測値 (profile=True のとき) を返す"""
+    schedules = _worker_maker.solve_for_day(
+        day,
+        num_trials=num_trials,
+        seed=seed,
+        progress=_worker_progress,
+        deadline=deadline,
+        previous=previous,
+    )
+    profiler = _worker_maker.profiler
+    return schedules, profiler.pop_records() if profiler is not None else []
+
+
+def _iter_days_in_parallel(
+    data: Dict,
+    days: List[str],
+    num_trials: int,
+    num_jobs: int,
+    seed: int,
+    maker_options: Optional[Dict],
+    profiler: Optional[SolveProfiler] = None,
+    progress: Optional[SolveProgress] = None,
+    deadline: Optional[float] = None,
+    previous: Optional[Dict[str, Dict[str, List[str]]]] = None,
+) -> Iterator[List[Schedule]]:
+    """
+    プロセスプールで各日を並列に解き, 日付順に結果を返すジェネレータ
+    中止が要求された場合, まだ始まっていない日は解かずに終了し, 解いている日も
+    次の試行に進まないようにする。
+    deadline (実行全体の制限時刻) は全てのワーカーで共有する。
+    previous は日ごとの前回の実行のスケジュール (初期解に使う)。
+    """
+    log_queue = multiprocessing.Queue()
+    listener = start_queue_listener("shift_scheduler", log_queue)
+    # ワーカーの試行の開始を受け取り, 中止の要求を伝える
+    channel = None
+    if progress is not None:
+        channel = (multiprocessing.Queue(), multiprocessing.Event())
+    executor = ProcessPoolExecutor(
+        max_workers=num_jobs,
+        initializer=_init_worker,
+        initargs=(
+            data,
+            maker_options,
+            profiler is not None,
+            logger.getEffectiveLevel(),
+            log_queue,
+            channel,
+        ),
+    )
+    finished = False
+    try:
+        futures = [
+            executor.submit(
+                _solve_day_in_worker,
+                day,
+                num_trials,
+                _day_seed(seed, day),
+                deadline,
+                (previous or {}).get(day),
+            )
+            for day in days
+        ]
+        # 投入順 (日付順) に, 解き終わった日から結果を返す
+        for future in futures:
+            # 中止の要求にすぐ応じられるよう, 短い間隔で待つ
+            while not future.done():
+                if progress is not None:
+                    if progress.cancelled:
+                        channel[1].set()
+                        return
+                    _forward_trials(progress, channel[0])
+                wait([future], timeout=0.2)
+            if progress is not None:
+                _forward_trials(progress, channel[0])
+            schedules, records = future.result()
+            if profiler is not None:
+                profiler.extend(records)
+            yield schedules
+        finished = True
+    finally:
+        # 途中で終了した場合 (中止・close), 始まっていない日を取り消し,
+        # 解いている日の終了は待たずに戻る
+        executor.shutdown(wait=finished, cancel_futures=True)
+        listener.stop()
+
+
+def _forward_trials(progress: SolveProgress, events) -> None:
+    # ワーカーから届いた試行の開始を, 届いた順に通知する
+    while True:
+        try:
+            day, trial = events.get_nowait()
+        except queue.Empty:
+            return
+        progress.trial_started(day, trial)
+
+
+def _iter_days(
+    data: Dict,
+    days: List[str],
+    num_trials: int,
+    num_jobs: int,
+    seed: int,
+    maker_options: Optional[Dict],
+    profiler: Optional[SolveProfiler] = None,
+    progress: Optional[SolveProgress] = None,
+    deadline: Optional[float] = None,
+    previous: Optional[Dict[str, Dict[str, List[str]]]] = None,
+) -> Iterator[List[Schedule]]:
+    """
+    指定した日を解き, 日付順に結果を返すジェネレータ
+    中止が要求された場合, 残りの日は解かずに終了する。
+    """
+    if not days:
+        return
+    num_jobs = max(1, min(num_jobs, len(days)))
+
+    if num_jobs > 1:
+        logger.info(f"{num_jobs} プロセスで並列に解きます。")
+        yield from _iter_days_in_parallel(
+            data,
+            days,
+            num_trials,
+            num_jobs,
+            seed,
+            maker_options,
+            profiler,
+            progress,
+            deadline,
+            previous,
+        )
+        return
+
+    maker = _create_maker(data, maker_options, profile=profiler is not None)
     for day in days:
+        if progress is not None and progress.cancelled:
+            return
         # 各日のスケジュールを解決
         logger.debug(f"{day}のスケジュールを解決中...")
-        schedules = maker.solve_for_day(day, num_trials=num_trials)
-        for i, schedule in enumerate(schedules):
-            # 役職の順序を整える
-            schedule = {
-                role: schedule[role]
-                for role in data["capabilities"][list(data["availabilities"].keys())[0]]
-            }
-            logger.debug(f"Day {day}:{i} のスケジュール:")
-            for role, employee in schedule.items():
-                logger.debug(f"  {role}: {employee}")
-            schedule_list.append((f"{day}:{i}", schedule))
+        schedules = maker.solve_for_day(
+            day,
+            num_trials=num_trials,
+            seed=_day_seed(seed, day),
+            progress=progress,
+            deadline=deadline,
+            previous=(previous or {}).get(day),
+        )
+        if profiler is not None:
+            profiler.extend(maker.profiler.pop_records())
+        yield schedules
+
 
-    logger.info("スケジュールの解決が完了しました。")
-    return schedule_list
+def solve_schedule(
+    data: Dict,
+    num_trials: int,
+    num_jobs: int = 1,
+    seed: int = 0,
+    maker_options: Optional[Dict] = None,
+    store: Optional[SolutionStore] = None,
+    monthly_options: Optional[Dict] = None,
+    profiler: Optional[SolveProfiler] = None,
+    progress: Optional[SolveProgress] = None,
+    run_time_limit: Optional[float] = None,
+    dedup: bool = True,
+) -> Iterator[Tuple[str, Schedule]]:
+    """
+    MILPを使用してシフトスケジュールを解決するジェネレータ
+    日付順に, その日を解き終わった時点で (日:試行, スケジュール) を返すため,
+    全ての日の結果をメモリに保持せずに書き込める。
+    store を指定した場合, 入力が前回と同じ日は前回の解を再利用する。
+    monthly_options を指定した場合, 全ての日を1つのモデルとして解く。
+    profiler を指定した場合, 日・試行ごとの計測値を記録する。
+    progress を指定した場合, 進捗を通知し, 中止が要求されたらそれまでの日だけを返す。
+    run_time_limit (秒) を指定した場合, 全ての日で共有する制限時間とし,
+    超えた日は暫定解 (Schedule.anytime が True) を返す。暫定解は store に保存しない。
+    dedup=True のとき, 出勤可能性と必要人数が同じ日は一度だけ解き, 同じ結果を使う。
+    """
+    logger.info("MILPを使用してシフトスケジュールを解決します。")
+    days = list(list(data["availabilities"].values())[0].keys())
+    roles = list(data["capabilities"][list(data["availabilities"].keys())[0]])
+    deadline = time.time() + run_time_limit if run_time_limit else None
+    if progress is not None:
+        progress.start(len(days))
+
+    if monthly_options is not None:
+        # 日をまたぐ制約があるため, 前回の解の再利用と日ごとの並列化は行わない
+        maker = MonthlyMILPMaker(
+            data["availabilities"],
+            data["capabilities"],
+            data["fulltime"],
+            data["weights"],
+            data["num_required"],
+            solver=(maker_options or {}).get("solver", "auto"),
+            profile=profiler is not None,
+            gap=(maker_options or {}).get("gap"),
+            diagnose=(maker_options or {}).get("diagnose", True),
+            **monthly_options,
+        )
+        results = maker.solve(days, deadline=deadline)
+        if profiler is not None:
+            profiler.extend(maker.profiler.pop_records())
+        for day in days:
+            yield from _schedule_rows(roles, day, [results[day]])
+            if progress is not None:
+                progress.day_done(day)
+        logger.info("スケジュールの解決が完了しました。")
+        return
+
+    # その日のモデルを決める入力のハッシュ (同じ入力の日をまとめ, 前回の解と比べる)
+    common = common_fingerprint(
+        data, {"num_trials": num_trials, "seed": seed, **(maker_options or {})}
+    )
+    fingerprints = {day: day_fingerprint(data, day, common) for day in days}
+
+    reused = {}
+    if store is not None:
+        for day in days:
+            stored = store.get(day, fingerprints[day])
+            if stored is not None:
+                reused[day] = stored
+        logger.info(
+            f"前回の解を再利用: {len(reused)} 日, 再計算: {len(days) - len(reused)} 日"
+        )
+
+    pending = [day for day in days if day not in reused]
+    # 入力 (出勤可能性と必要人数) が同じ日は, 最初の日だけを解いて結果を使い回す
+    representatives: Dict[str, str] = {}
+    if dedup:
+        for day in pending:
+            representatives.setdefault(fingerprints[day], day)
+        unique = list(representatives.values())
+    else:
+        unique = pending
+    if dedup and pending:
+        logger.info(
+            f"同じ入力の日をまとめました: {len(pending)} 日 -> {len(unique)} 通り "
+            f"(dedup ratio {len(pending) / len(unique):.2f}x)"
+        )
+    # 入力が変わった日も, 前回の解を初期解として使う
+    previous = None
+    if store is not None and (maker_options or {}).get("warm_start"):
+        previous = {day: store.previous(day) for day in unique}
+    solved = _iter_days(
+        data,
+        unique,
+        num_trials,
+        num_jobs,
+        seed,
+        maker_options,
+        profiler,
+        progress,
+        deadline,
+        previous,
+    )
+    # 解いた日の結果 {入力のハッシュ: [スケジュール]} (同じ入力の日に使い回す)
+    solved_by_fingerprint: Dict[str, List[Schedule]] = {}
+    try:
+        for day in days:
+            if progress is not None and progress.cancelled:
+                break
+            schedules = reused.get(day)
+            if schedules is None:
+                schedules = solved_by_fingerprint.get(fingerprints[day])
+                if schedules is None:
+                    # unique は日付順で, 同じ入力の日より先に来るため,
+                    # 次に解き終わる日がこの日になる (中止された場合は None)
+                    schedules = next(solved, None)
+                    if schedules is None:
+                        break
+                    if dedup:
+                        solved_by_fingerprint[fingerprints[day]] = schedules
+                # 暫定解と解がない日は次回に解き直す (原因を調べ直す) ため保存しない
+                # (原因を特定できなかった日の diagnosis は空のリスト,
+                # diagnose=False のときは None になるため, 未割当かどうかで判定する)
+                if store is not None and not any(
+                    s.anytime or s.diagnosis is not None or s.unassigned
+                    for s in schedules
+                ):
+                    store.put(day, fingerprints[day], schedules)
+            yield from _schedule_rows(roles, day, schedules)
+            if progress is not None:
+                progress.day_done(day)
+    finally:
+        # 並列に解いている場合はプロセスプールを終了する
+        solved.close()
+        # 中止した場合も, それまでに解いた日は保存する
+        if store is not None:
+            store.save(days)
+
+    if progress is not None and progress.cancelled:
+        logger.warning(
+            f"中止しました: {progress.days_done} / {progress.total_days} 日を解きました。"
+        )
+    else:
+        logger.info("スケジュールの解決が完了しました。")
+
+
+def _schedule_rows(
+    roles: List[str], day: str, schedules: List[Dict]
+) -> Iterator[Tuple[str, Schedule]]:
+    """その日の [スケジュール] を書き込み用の行に変換するジェネレータ"""
+    for i, schedule in enumerate(schedules):
+        # 役職の順序を整える (前回の解から読み込んだ dict は暫定解ではない)
+        schedule = Schedule(
+            {role: schedule.get(role, []) for role in roles},
+            anytime=getattr(schedule, "anytime", False),
+            diagnosis=getattr(schedule, "diagnosis", None),
+        )
+        logger.debug(f"Day {day}:{i} のスケジュール:")
+        for role, employee in schedule.items():
+            logger.debug(f"  {role}: {employee}")
+        yield f"{day}:{i}", schedule
+
+
+def _recorded(rows: Iterable, recorded: List) -> Iterator:
+    """rows をそのまま返しながら, recorded に追加するジェネレータ"""
+    for row in rows:
+        recorded.append(row)
+        yield row
 
 
 def write_schedule_to_excel(
     excel_path: str,
     sheet_name: str,
-    schedule_list: List,
+    schedule_list: Iterable[Tuple[str, Dict[str, List[str]]]],
     data: Dict[str, Dict],
     output_dir: str,
-):
-    """解決されたスケジュールを新しいExcelファイルに書き込む関数"""
+) -> Path:
+    """
+    解決されたスケジュールを新しいExcelファイルに書き込む関数
+    schedule_list は1行ずつ書き込むため, solve_schedule のジェネレータをそのまま渡せる。
+    """
     logger.info("スケジュールをExcelファイルに書き込みます。")
     output_path = Path(output_dir) / f"{sheet_name}_schedule.xlsx"
     ewriter = ExcelWriter(output_path, sheet_name, data["weights"], data["fulltime"])
     ewriter.write_schedule(schedule_list)
     logger.info(f"スケジュールを書き込んだファイル: {output_path}")
+    return output_path
 
 
-def main(excel_path: str, sheet_name: str, num_trials: int, output_dir: str):
-    """メイン関数"""
+def main(
+    excel_path: str,
+    sheet_name: str,
+    num_trials: int,
+    output_dir: str,
+    num_jobs: int = 1,
+    seed: int = 0,
+    maker_options: Optional[Dict] = None,
+    cache: Optional[ParseCache] = None,
+    incremental: bool = False,
+    monthly_options: Optional[Dict] = None,
+    profile: bool = False,
+    progress: Optional[SolveProgress] = None,
+    run_time_limit: Optional[float] = None,
+    dedup: bool = True,
+    parquet: bool = False,
+) -> Path:
+    """
+    メイン関数
+    progress を指定した場合, 進捗を通知し, 中止が要求されたらそれまでの日を書き込む。
+    run_time_limit (秒) を指定した場合, 全ての日で共有する制限時間とする。
+    dedup=True のとき, 入力が同じ日は一度だけ解く。
+    parquet=True のとき, スケジュールを .parquet のファイルにも書き出す。
+    書き込んだファイルのパスを返す。
+    """
     logger.info("処理を開始します。")
 
+    # profile=True のとき, 各段階の時間とソルバーの統計を記録する
+    profiler = SolveProfiler() if profile else None
+
+    def stage(name: str):
+        return profiler.stage(name) if profiler is not None else nullcontext()
+
     # Excelファイルからのデータ読み込み
-    data = read_excel_data(excel_path, sheet_name)
+    with stage("read"):
+        data = read_excel_data(excel_path, sheet_name, cache=cache)
 
-    # シフトスケジュールの解決
-    schedule_list = solve_schedule(data, num_trials)
+    # 前回の解 (出力ファイルと同じディレクトリに保存する)
+    store = None
+    if incremental:
+        store = SolutionStore(Path(output_dir) / f"{sheet_name}_schedule.state.json")
+
+    # シフトスケジュールの解決 (解き終わった日から順に返される)
+    schedule_list = solve_schedule(
+        data,
+        num_trials,
+        num_jobs=num_jobs,
+        seed=seed,
+        maker_options=maker_options,
+        store=store,
+        monthly_options=monthly_options,
+        profiler=profiler,
+        progress=progress,
+        run_time_limit=run_time_limit,
+        dedup=dedup,
+    )
+    if parquet:
+        # Excel に書き込んだ行を Parquet に書き出すために残す
+        rows: List[Tuple[str, Schedule]] = []
+        schedule_list = _recorded(schedule_list, rows)
 
     # 解決されたスケジュールをExcelファイルに書き込み
-    write_schedule_to_excel(excel_path, sheet_name, schedule_list, data, output_dir)
+    # 求解と書き込みは交互に進むため, 時間はまとめて計測する
+    with stage("solve_write"):
+        output_path = write_schedule_to_excel(
+            excel_path, sheet_name, schedule_list, data, output_dir
+        )
+
+    if parquet:
+        from Parquet.parquet_io import write_schedules
 
-    logger.info("処理が完了しました。")
+        write_schedules(
+            output_path.with_suffix(".parquet"),
+            rows,
+            sheet_name,
+            data["weights"],
+            data["fulltime"],
+        )
+
+    if profiler is not None:
+        profiler.log_summary()
+        profiler.write(output_path)
+
+    if progress is not None and progress.cancelled:
+        logger.info("処理を中止しました。途中までの結果を書き込みました。")
+    else:
+        logger.info("処理が完了しました。")
+    return output_path
 
 
 if __name__ == "__main__":
@@ -115,9 +697,39 @@ if __name__ == "__main__":
 
     logger = setup_logger("shift_scheduler", args.loglevel)
 
+    cache = None
+    if args.cache_dir:
+        cache = ParseCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+
     main(
         args.excel_path,
         args.sheet_name,
         args.num_trials,
         args.output_dir,
+        num_jobs=args.jobs,
+        seed=args.seed,
+        maker_options={
+            "trial_mode": args.trial_mode,
+            "solver": args.solver,
+            "time_limit": args.time_limit,
+            "gap": args.gap,
+            "warm_start": args.warm_start,
+            "diagnose": not args.no_diagnose,
+            "presolve": not args.no_presolve,
+        },
+        cache=cache,
+        incremental=args.incremental,
+        monthly_options=(
+            {
+                "max_shifts": args.max_shifts,
+                "fairness_weight": args.fairness_weight,
+                "horizon": args.horizon,
+            }
+            if args.monthly
+            else None
+        ),
+        profile=args.profile,
+        run_time_limit=args.run_time_limit,
+        dedup=not args.no_dedup,
+        parquet=args.parquet,
     )
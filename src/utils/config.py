@@ -26,6 +26,32 @@ def _make_config() -> dict:
         "excel_path": "",
         "output_dir": "",
         "num_trials": 1,
+        "num_jobs": 1,
+        "seed": 0,
+        "trial_mode": "enumerate",
+        "solver": "auto",
+        # 空の場合は cache_dir_path() の既定の場所を使う
+        "cache_dir": "",
+        "cache_max_mb": 64,
+        "incremental": True,
+        "monthly": False,
+        "max_shifts": None,
+        "fairness_weight": 0.0,
+        "horizon": "full",
+        # 各段階の時間とソルバーの統計を出力フォルダに書き出す
+        "profile": False,
+        # 1日あたり・実行全体の制限時間 (秒) と目標の相対ギャップ (null は制限なし)
+        "time_limit": None,
+        "run_time_limit": None,
+        "gap": None,
+        # 前回の解 (なければ似た日の解) を初期解としてソルバーに渡す
+        "warm_start": False,
+        # 出勤可能性と必要人数が同じ日は一度だけ解く
+        "dedup": True,
+        # 解がない日の原因 (満たせない制約と従業員) を調べる
+        "diagnose": True,
+        # 解く前に, 必要人数と割り当て可能な人数から決まる割り当てを固定する
+        "presolve": True,
     }
     return config
 
@@ -51,6 +77,11 @@ def load_config() -> dict:
         raise
 
 
+def cache_dir_path(config: dict) -> str:
+    """読み込み結果のキャッシュを保存するディレクトリを返します。"""
+    return config.get("cache_dir") or _resource_path("cache")
+
+
 def save_config(config: dict) -> None:
     """
     設定ファイルを保存する。
@@ -1,8 +1,10 @@
 import logging
+import logging.handlers
 import sys
 
 import colorlog
 
+
 # Logger の設定
 def setup_logger(logger_name: str, log_level: int) -> logging.Logger:
     logger = logging.getLogger(logger_name)
@@ -29,3 +31,25 @@ def setup_logger(logger_name: str, log_level: int) -> logging.Logger:
     logger.addHandler(handler)
     logger.debug("Logger set up with log level: %s", log_level)
     return logger
+
+
+def start_queue_listener(logger_name: str, queue) -> logging.handlers.QueueListener:
+    """
+    ワーカープロセスから送られたログを, メインプロセスのハンドラで出力します。
+    1 レコードずつ出力されるため, 並列実行でもログの行が混ざりません。
+    """
+    logger = logging.getLogger(logger_name)
+    listener = logging.handlers.QueueListener(
+        queue, *logger.handlers, respect_handler_level=True
+    )
+    listener.start()
+    return listener
+
+
+def setup_worker_logger(logger_name: str, log_level: int, queue) -> logging.Logger:
+    """ワーカープロセスのログをキュー経由でメインプロセスに送るよう設定します。"""
+    logger = logging.getLogger(logger_name)
+    logger.handlers = [logging.handlers.QueueHandler(queue)]
+    logger.setLevel(log_level)
+    logger.propagate = False
+    return logger
@@ -0,0 +1,104 @@
+import csv
+import json
+import logging
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List
+
+logger = logging.getLogger("shift_scheduler")
+
+# 日・試行ごとの計測値の項目 (CSV の列の順番)
+TRIAL_FIELDS = [
+    "day",
+    "trial",
+    "build_s",
+    "solve_s",
+    "extract_s",
+    "variables",
+    "rows",
+    "free_variables",
+    "solver",
+    "status",
+    "anytime",
+    "warm_start",
+    "warm_start_accepted",
+    "objective",
+    "nodes",
+    "gap",
+]
+
+
+class SolveProfiler:
+    """
+    日・試行ごとのモデル作成・求解・解の抽出の時間, モデルの規模, ソルバーの結果と,
+    処理全体の各段階 (読み込み, 求解, 書き込み) の時間を集めます。
+    """
+
+    def __init__(self):
+        self.records: List[Dict] = []
+        self.stages: Dict[str, float] = {}
+
+    def record(self, **fields):
+        """日・試行ごとの計測値を追加します。"""
+        self.records.append({field: fields.get(field) for field in TRIAL_FIELDS})
+
+    def pop_records(self) -> List[Dict]:
+        """集めた計測値を取り出します (ワーカープロセスから返すときに使う)。"""
+        records, self.records = self.records, []
+        return records
+
+    def extend(self, records: List[Dict]):
+        self.records.extend(records)
+
+    @contextmanager
+    def stage(self, name: str):
+        """with ブロックの実行時間を処理全体の段階として記録します。"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (
+                time.perf_counter() - start
+            )
+
+    def log_summary(self, top: int = 3):
+        for name, seconds in self.stages.items():
+            logger.info(f"[profile] {name}: {seconds:.3f}s")
+        offered = [r for r in self.records if r["warm_start"] is not None]
+        if offered:
+            accepted = sum(bool(r["warm_start_accepted"]) for r in offered)
+            logger.info(f"[profile] warm start accepted: {accepted} / {len(offered)}")
+        slowest = sorted(self.records, key=lambda r: r["solve_s"] or 0.0, reverse=True)[
+            :top
+        ]
+        for r in slowest:
+            logger.info(
+                f"[profile] slow: {r['day']}[{r['trial']}] "
+                f"solve {r['solve_s']:.3f}s ({r['status']}, {r['rows']} rows)"
+            )
+
+    def write_jsonl(self, path: str):
+        """計測値を JSON Lines で書き出します。"""
+        with open(path, "w", encoding="utf-8") as f:
+            for name, seconds in self.stages.items():
+                line = {"type": "stage", "stage": name, "seconds": seconds}
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+            for r in self.records:
+                f.write(json.dumps({"type": "trial", **r}, ensure_ascii=False) + "\n")
+
+    def write_csv(self, path: str):
+        """日・試行ごとの計測値を CSV で書き出します。"""
+        # Excel で文字化けしないよう BOM 付きで書き出す
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=TRIAL_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.records)
+
+    def write(self, output_path: Path):
+        """出力ファイルと同じ場所に .profile.jsonl と .profile.csv を書き出します。"""
+        jsonl_path = output_path.with_suffix(".profile.jsonl")
+        csv_path = output_path.with_suffix(".profile.csv")
+        self.write_jsonl(jsonl_path)
+        self.write_csv(csv_path)
+        logger.info(f"プロファイルを書き込んだファイル: {jsonl_path}, {csv_path}")
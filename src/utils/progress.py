@@ -0,0 +1,68 @@
+import threading
+from typing import Callable, Optional
+
+
+class SolveProgress:
+    """
+    求解の進捗 (解き終わった日数 / 全日数, 解いている日と試行) を通知し,
+    別のスレッドからの中止の要求を受け付けます。
+
+    on_update は進捗が変わるたびに求解を行うスレッドから呼ばれます。
+    並列に解く場合, ワーカープロセスの試行の開始は WorkerProgress から送られ,
+    求解を行うスレッドが結果を待つ間に通知します。
+    """
+
+    def __init__(self, on_update: Optional[Callable[["SolveProgress"], None]] = None):
+        self.total_days = 0
+        self.days_done = 0
+        self.day: Optional[str] = None
+        self.trial: Optional[int] = None
+        self._on_update = on_update
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        """残りの求解を中止するよう要求します (解いている途中の試行は最後まで解く)。"""
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def start(self, total_days: int):
+        self.total_days = total_days
+        self.days_done = 0
+        self._notify()
+
+    def trial_started(self, day: str, trial: int):
+        self.day = day
+        self.trial = trial
+        self._notify()
+
+    def day_done(self, day: str):
+        self.day = day
+        self.trial = None
+        self.days_done += 1
+        self._notify()
+
+    def _notify(self):
+        if self._on_update is not None:
+            self._on_update(self)
+
+
+class WorkerProgress:
+    """
+    ワーカープロセスで SolveProgress の代わりに MILPMaker.solve_for_day に渡します。
+    試行の開始を (日, 試行) として events に送り, 親プロセスが cancel_event を
+    セットしたら中止の要求として扱います。
+    """
+
+    def __init__(self, events, cancel_event):
+        self._events = events
+        self._cancel_event = cancel_event
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def trial_started(self, day: str, trial: int):
+        self._events.put((day, trial))
@@ -0,0 +1,45 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# スクリプトと同じく src を import のパスに加える
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+
+@pytest.fixture
+def roster(tmp_path):
+    """合成したシフト表を書き出し, (パス, シート名) を返す関数"""
+    from benchmark.synthetic_roster import generate_workbook
+
+    def make(**params):
+        path = str(tmp_path / "roster.xlsx")
+        generate_workbook(path, **params)
+        return path, "12月"
+
+    return make
+
+
+@pytest.fixture
+def tiny_data():
+    """
+    read_excel_data と同じ形式の小さな入力。
+    2日（火）は受付を担当できる A が休みのため解がない。
+    """
+    roles = ["受付", "胃カメラ", "採血"]
+    capabilities = {
+        "A": {"受付": True, "胃カメラ": False, "採血": False},
+        "B": {"受付": False, "胃カメラ": True, "採血": True},
+        "C": {"受付": False, "胃カメラ": False, "採血": True},
+    }
+    return {
+        "availabilities": {
+            "A": {"1日（月）": True, "2日（火）": False},
+            "B": {"1日（月）": True, "2日（火）": True},
+            "C": {"1日（月）": True, "2日（火）": True},
+        },
+        "capabilities": capabilities,
+        "fulltime": {"A": True, "B": True, "C": False},
+        "weights": {"A": 1, "B": 1, "C": 0},
+        "num_required": {weekday: {r: 1 for r in roles} for weekday in ("月", "火")},
+    }
@@ -0,0 +1,28 @@
+import openpyxl
+
+from batch_solver import BatchResult, format_summary, read_workbook
+
+
+def test_master_read_time_is_kept_when_first_sheet_is_skipped(roster):
+    path, sheet_name = roster()
+    workbook = openpyxl.load_workbook(path)
+    workbook.create_sheet("メモ", 0)["A1"] = "希望シフトのシートではない"
+    workbook.save(path)
+
+    items = list(read_workbook(path, None, cache=None))
+
+    assert [item[0] for item in items] == [sheet_name]
+    assert items[0][3] > 0
+
+
+def test_summary_reports_master_read_time_on_its_own_line():
+    results = [
+        BatchResult("a.xlsx", "12月", read_seconds=0.5, master_seconds=1.25),
+        BatchResult("a.xlsx", "1月", read_seconds=0.5),
+    ]
+
+    lines = format_summary(results).splitlines()
+
+    master = [line for line in lines if "(マスタ)" in line]
+    assert len(master) == 1 and master[0].split()[-1] == "1.25"
+    assert "読み込み 2.25s" in lines[-1]
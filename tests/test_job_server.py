@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import job_server
+from job_server import JobManager, create_app
+
+XLSX = b"PK\x03\x04 not really a workbook"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """ワーカー 1, 待ち行列 1 のサーバー (求解は release が set されるまで終わらない)"""
+    release = threading.Event()
+
+    def solve(excel_path, sheet_name, num_trials, output_dir, **kwargs):
+        release.wait(10)
+
+    monkeypatch.setattr(job_server, "solve_workbook", solve)
+    manager = JobManager(str(tmp_path / "jobs"), max_queue=1)
+    with TestClient(create_app(manager, max_upload_mb=1)) as client:
+        yield client
+        release.set()
+
+
+def submit(client, sheet_name="12月", content=XLSX):
+    return client.post("/jobs", params={"sheet_name": sheet_name}, content=content)
+
+
+@pytest.mark.parametrize("sheet_name", ["../escape", "a/b", "a\\b", "a:b", ""])
+def test_rejects_sheet_names_that_are_not_file_names(client, sheet_name, tmp_path):
+    response = submit(client, sheet_name)
+
+    assert response.status_code == 400
+    assert not (tmp_path / "escape_schedule.xlsx").exists()
+
+
+def test_rejects_large_upload_before_reading_the_body(client):
+    def body():
+        yield XLSX
+        raise AssertionError("本文を読んではいけない")
+
+    response = client.post(
+        "/jobs",
+        params={"sheet_name": "12月"},
+        content=body(),
+        headers={"Content-Length": str(2 * 1024 * 1024)},
+    )
+
+    assert response.status_code == 413
+
+
+def test_rejects_large_upload_without_content_length(client):
+    response = client.post(
+        "/jobs",
+        params={"sheet_name": "12月"},
+        content=(XLSX if i == 0 else b"0" * 65536 for i in range(40)),
+    )
+
+    assert response.status_code == 413
+
+
+def test_cancelled_queued_job_frees_its_slot(client):
+    running = submit(client).json()["job_id"]
+    while client.get(f"/jobs/{running}").json()["status"] != "running":
+        time.sleep(0.01)
+    queued = submit(client).json()["job_id"]
+    assert submit(client).status_code == 503
+
+    assert client.delete(f"/jobs/{queued}").json()["status"] == "cancelled"
+
+    assert submit(client).status_code == 202
@@ -0,0 +1,71 @@
+import pytest
+
+from MILP.milp_maker import MILPMaker
+
+
+@pytest.mark.parametrize("solver", ["highs", "cbc"])
+def test_variable_names_do_not_collide(solver):
+    # "p_x" の役職 "y" と "p" の役職 "x_y" は, 名前をつなぐと同じ "p_x_y" になる
+    roles = ["受付", "胃カメラ", "y", "x_y"]
+    capabilities = {
+        "A": {"受付": True, "胃カメラ": False, "y": False, "x_y": False},
+        "B": {"受付": False, "胃カメラ": True, "y": False, "x_y": False},
+        "p_x": {"受付": False, "胃カメラ": False, "y": True, "x_y": False},
+        "p": {"受付": False, "胃カメラ": False, "y": False, "x_y": True},
+        # presolve で割り当てが決まらないよう, 重みの低い候補を加える
+        "q": {"受付": False, "胃カメラ": False, "y": True, "x_y": True},
+    }
+    day = "2日（月）"
+    maker = MILPMaker(
+        availability={e: {day: True} for e in capabilities},
+        role_compatibility=capabilities,
+        fulltime={"A": True, "B": True, "p_x": False, "p": False, "q": False},
+        weights={"A": 1, "B": 1, "p_x": 1, "p": 1, "q": 0},
+        num_required={"月": {r: 1 for r in roles}},
+        solver=solver,
+    )
+
+    (schedule,) = maker.solve_for_day(day)
+
+    assert schedule.diagnosis is None
+    assert dict(schedule) == {
+        "受付": ["A"],
+        "胃カメラ": ["B"],
+        "y": ["p_x"],
+        "x_y": ["p"],
+    }
+
+
+def test_infeasible_day_is_solved_once(tiny_data):
+    maker = MILPMaker(
+        tiny_data["availabilities"],
+        tiny_data["capabilities"],
+        tiny_data["fulltime"],
+        tiny_data["weights"],
+        tiny_data["num_required"],
+        trial_mode="seed",
+        diagnose=False,
+    )
+
+    schedules = maker.solve_for_day("2日（火）", num_trials=3)
+
+    assert len(schedules) == 1
+    assert schedules[0].unassigned
+
+
+@pytest.mark.parametrize("solver", ["highs", "cbc"])
+def test_gap_target_does_not_flag_optimal_days_as_anytime(tiny_data, solver):
+    maker = MILPMaker(
+        tiny_data["availabilities"],
+        tiny_data["capabilities"],
+        tiny_data["fulltime"],
+        tiny_data["weights"],
+        tiny_data["num_required"],
+        solver=solver,
+        gap=0.01,
+    )
+
+    (schedule,) = maker.solve_for_day("1日（月）")
+
+    assert not schedule.unassigned
+    assert schedule.anytime is False
@@ -0,0 +1,74 @@
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+from MILP.milp_maker import MILPMaker
+from MILP.monthly_milp_maker import MonthlyMILPMaker
+from schedule_solver import read_excel_data
+
+SAMPLE = str(Path(__file__).resolve().parents[1] / "data" / "sample_data.xlsx")
+
+
+@pytest.mark.parametrize("max_shifts", [5, 6, 7])
+def test_weekly_horizon_solves_when_full_horizon_does(max_shifts):
+    data = read_excel_data(SAMPLE, "12月")
+    days = list(next(iter(data["availabilities"].values())))
+    args = (
+        data["availabilities"],
+        data["capabilities"],
+        data["fulltime"],
+        data["weights"],
+        data["num_required"],
+    )
+
+    results = {
+        horizon: MonthlyMILPMaker(*args, max_shifts=max_shifts, horizon=horizon).solve(
+            days
+        )
+        for horizon in ("full", "weekly")
+    }
+
+    for schedules in results.values():
+        assert all(s["受付"] != ["未割当"] for s in schedules.values())
+    shifts = Counter(
+        e
+        for schedule in results["weekly"].values()
+        for employees in schedule.values()
+        for e in employees
+        if not MILPMaker.is_pseudo_employee(e)
+    )
+    assert max(shifts.values()) <= max_shifts
+
+
+def _tiny_args(data):
+    return (
+        data["availabilities"],
+        data["capabilities"],
+        data["fulltime"],
+        data["weights"],
+        data["num_required"],
+    )
+
+
+def test_full_horizon_leaves_only_infeasible_days_unassigned(tiny_data):
+    maker = MonthlyMILPMaker(*_tiny_args(tiny_data), horizon="full")
+    schedules = maker.solve(["1日（月）", "2日（火）"])
+
+    assert not schedules["1日（月）"].unassigned
+    assert schedules["1日（月）"].diagnosis is None
+    assert schedules["2日（火）"].unassigned
+    assert "RoleAssignment_受付" in [
+        c.constraint for c in schedules["2日（火）"].diagnosis
+    ]
+
+
+def test_too_tight_max_shifts_is_diagnosed(tiny_data):
+    maker = MonthlyMILPMaker(*_tiny_args(tiny_data), max_shifts=0, horizon="full")
+    schedules = maker.solve(["1日（月）", "2日（火）"])
+
+    assert schedules["1日（月）"].unassigned
+    assert [c.constraint for c in schedules["1日（月）"].diagnosis] == ["MaxShifts"]
+    assert "RoleAssignment_受付" in [
+        c.constraint for c in schedules["2日（火）"].diagnosis
+    ]
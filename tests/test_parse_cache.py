@@ -0,0 +1,36 @@
+import xlsxwriter
+
+from ReadExcel.parse_cache import ParseCache
+
+
+def write_book(path, cell_format=None, extra_formats=0):
+    workbook = xlsxwriter.Workbook(str(path))
+    # 使わない書式を先に登録し, 書式の番号だけをずらす
+    for i in range(extra_formats):
+        workbook.add_format({"font_size": 9 + i})
+    fmt = workbook.add_format(cell_format) if cell_format is not None else None
+    worksheet = workbook.add_worksheet("12月")
+    worksheet.write(0, 0, "Day")
+    worksheet.write(1, 0, 45000, fmt)
+    workbook.close()
+    return str(path)
+
+
+def test_number_format_change_changes_the_key(tmp_path):
+    cache = ParseCache(tmp_path / "cache")
+    number = write_book(tmp_path / "number.xlsx", {"num_format": "0"})
+    date = write_book(tmp_path / "date.xlsx", {"num_format": "yyyy-mm-dd"})
+
+    assert cache.key(number, "12月", "sheet") != cache.key(date, "12月", "sheet")
+
+
+def test_style_only_changes_keep_the_key(tmp_path):
+    cache = ParseCache(tmp_path / "cache")
+    plain = write_book(tmp_path / "plain.xlsx", {"num_format": "yyyy-mm-dd"})
+    styled = write_book(
+        tmp_path / "styled.xlsx",
+        {"num_format": "yyyy-mm-dd", "bold": True, "font_color": "red"},
+        extra_formats=3,
+    )
+
+    assert cache.key(plain, "12月", "sheet") == cache.key(styled, "12月", "sheet")
@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+from MILP.solution_store import SolutionStore
+from schedule_solver import _iter_days, read_excel_data, solve_schedule
+from utils.progress import SolveProgress
+
+
+def test_parallel_cancel_returns_without_solving_remaining_days(roster):
+    path, sheet_name = roster(num_employees=300, num_days=24)
+    data = read_excel_data(path, sheet_name)
+    days = list(next(iter(data["availabilities"].values())))
+    progress = SolveProgress()
+
+    # 全ての日を解くと CBC で 10 秒ほどかかる
+    solved = _iter_days(data, days, 5, 2, 0, {"solver": "cbc"}, progress=progress)
+    next(solved)
+    progress.cancel()
+    start = time.perf_counter()
+    remaining = list(solved)
+    elapsed = time.perf_counter() - start
+
+    assert len(remaining) <= 1
+    # 残りの日を解き終わるのを待たずに戻る
+    assert elapsed < 3.0
+
+
+def test_parallel_solve_forwards_trials_from_workers(tiny_data):
+    days = list(next(iter(tiny_data["availabilities"].values())))
+    trials = []
+    progress = SolveProgress(
+        on_update=lambda p: p.trial is not None and trials.append((p.day, p.trial))
+    )
+
+    list(_iter_days(tiny_data, days, 2, 2, 0, None, progress=progress))
+
+    assert ("1日（月）", 0) in trials
+
+
+@pytest.mark.parametrize("diagnose", [True, False])
+def test_days_without_solution_are_not_stored(tiny_data, tmp_path, diagnose):
+    store = SolutionStore(tmp_path / "state.json")
+
+    rows = dict(
+        solve_schedule(tiny_data, 1, store=store, maker_options={"diagnose": diagnose})
+    )
+
+    assert rows["2日（火）:0"].unassigned
+    assert store.previous("1日（月）") is not None
+    assert store.previous("2日（火）") is None
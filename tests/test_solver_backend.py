@@ -0,0 +1,23 @@
+from MILP.solver_backend import CbcBackend
+
+
+def test_cbc_log_without_gap_line_is_proven_optimal():
+    log = "Result - Optimal solution found\n\nEnumerated nodes:               0\n"
+
+    assert CbcBackend._parse_log(log) == {"nodes": 0, "gap": 0.0}
+
+
+def test_cbc_log_stopped_on_gap_reports_the_gap():
+    log = (
+        "Result - Optimal solution found (within gap tolerance)\n\n"
+        "Objective value:                52572.00000000\n"
+        "Upper bound:                    53351.052\n"
+        "Gap:                            -0.01\n"
+        "Enumerated nodes:               12\n"
+    )
+
+    assert CbcBackend._parse_log(log) == {"nodes": 12, "gap": 0.01}
+
+
+def test_cbc_log_without_result_has_unknown_gap():
+    assert CbcBackend._parse_log("") == {"nodes": None, "gap": None}